@@ -0,0 +1,276 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Animations of band alignments that change over a parameter sweep.
+
+The layout of every frame is computed first. The figure is then drawn once
+and, for each frame, only the bars, arrows and labels are moved and the label
+text changed, rather than the whole plot being drawn again::
+
+    frames = get_sweep_frames(data, ip=ips, ea=eas)
+    with AlignmentSweep(frames, dpi=100) as sweep:
+        sweep.save_animation('strain.gif', fps=10)
+
+Animations are written as GIF or animated PNG files using Pillow, or each
+frame can be saved to a numbered file.
+"""
+
+from .plotting import style_context, gradient_image, _arrow_head_length
+from .figure import AlignmentFigure
+
+
+def get_sweep_frames(data, **values):
+    """Get the frames of a sweep from arrays of compound properties.
+
+    Args:
+        data (list): A list of compound dicts. Properties that are not swept
+            keep their values in every frame.
+        **values: An ``(F, N)`` array of the value of a property for each of
+            the ``N`` compounds in each of ``F`` frames, or an ``(F,)`` array
+            of values shared by all compounds, e.g. ``ip=ips``.
+
+    Returns:
+        A list of ``F`` compound lists, one per frame.
+    """
+    import numpy as np
+
+    arrays = dict((key, np.asarray(value)) for key, value in values.items())
+    nframes = set(len(array) for array in arrays.values())
+    if len(nframes) != 1:
+        raise ValueError('the swept properties must have the same number of '
+                         'frames')
+
+    frames = []
+    for i in range(nframes.pop()):
+        frame = [dict(compound) for compound in data]
+        for key, array in arrays.items():
+            row = np.broadcast_to(array[i], (len(data),)).tolist()
+            for compound, value in zip(frame, row):
+                compound[key] = value
+        frames.append(frame)
+    return frames
+
+
+def _rectangles(bars, bar_width):
+    from matplotlib.patches import Rectangle
+
+    return [Rectangle((left, top), bar_width, bottom - top)
+            for left, top, bottom in bars]
+
+
+def _set_gradient_image(artist, x_edges, y_edges, image):
+    # pcolorfast draws an AxesImage when the pixels are evenly spaced (only
+    # one compound) and a PcolorImage otherwise
+    from matplotlib.image import PcolorImage
+
+    if isinstance(artist, PcolorImage):
+        artist.set_data(x_edges, y_edges, image)
+    else:
+        artist.set_data(image)
+        artist.set_extent((x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+
+
+def _compatible(layout, other):
+    # frames can only be drawn by updating the same artists if they draw
+    # the same number of each, in the same layers
+    import numpy as np
+
+    return (layout.kind == other.kind and
+            layout.bars.shape == other.bars.shape and
+            layout.labels.shape == other.labels.shape and
+            np.array_equal(layout.arrow_heads, other.arrow_heads) and
+            np.array_equal(layout.edge_zorders, other.edge_zorders) and
+            np.array_equal(layout.fades[:, 3], other.fades[:, 3]))
+
+
+class AlignmentSweep(AlignmentFigure):
+    """A band alignment plot animated over several states of its compounds.
+
+    The energy range is fitted to every frame, unless it is given, so the
+    axes stay still during the animation.
+
+    Args:
+        frames (list): A list of compound lists, one per frame, e.g. as
+            returned by :func:`get_sweep_frames`. Each frame must have the
+            same compounds in the same order, and the same faded compounds.
+        dpi (int): Dots-per-inch of the animation.
+        **kwargs: Plotting options, as for :func:`bapt.get_alignment_plot`.
+
+    Attributes:
+        layouts (list): The layout of each frame.
+        frame (int): The index of the frame shown by the figure.
+    """
+
+    def __init__(self, frames, dpi=100, **kwargs):
+        from .layout import get_layout
+        from .profiling import mark
+
+        frames = list(frames)
+        if not frames:
+            raise ValueError('there are no frames to animate')
+
+        layouts = [get_layout(frame, **kwargs) for frame in frames]
+        if len(set(layout.ylim for layout in layouts)) > 1:
+            limits = {}
+            if not kwargs.get('emin'):
+                limits['emin'] = min(layout.ylim[0] for layout in layouts)
+            if layouts[0].kind == 'offset' and not kwargs.get('emax'):
+                limits['emax'] = max(layout.ylim[1] for layout in layouts)
+            kwargs.update(limits)
+            layouts = [get_layout(frame, **kwargs) for frame in frames]
+        if not all(_compatible(layouts[0], layout) for layout in layouts):
+            raise ValueError('every frame must plot the same compounds with '
+                             'the same settings')
+        mark('plot:layout')
+
+        self.layouts = layouts
+        self.frame = 0
+        self._draw(layouts[0], dpi)
+
+    def __len__(self):
+        return len(self.layouts)
+
+    def draw_frame(self, index):
+        """Update the plot to show a frame.
+
+        Args:
+            index (int): The index of the frame.
+        """
+        self._check_open()
+        layout = self.layouts[index]
+        artists = self._artists
+        bars = layout.bars.tolist()
+        bar_width = layout.bar_width
+
+        if layout.gradients:
+            if artists['bars'] is not None:
+                _set_gradient_image(artists['bars'], *gradient_image(
+                    [b + [f] for b, f in zip(bars, layout.bar_fills)],
+                    bar_width=bar_width))
+        else:
+            artists['bars'].set_paths(_rectangles(bars, bar_width))
+            artists['bars'].set_facecolors(layout.bar_fills)
+
+        zorders = layout.edge_zorders.tolist()
+        for collection, zorder in zip(artists['edges'], sorted(set(zorders))):
+            layer = [i for i, z in enumerate(zorders) if z == zorder]
+            collection.set_paths(_rectangles([bars[i] for i in layer],
+                                             bar_width))
+            collection.set_edgecolors([layout.edge_colours[i]
+                                       for i in layer])
+
+        length = _arrow_head_length
+        for (line, start, end), (x, y, dx, dy) in zip(
+                artists['arrows'], layout.arrows.tolist()):
+            line.set_data([x, x + dx], [y, y + dy])
+            if start is not None:
+                start.set_data(x=x, y=y + length, dx=0, dy=-length)
+            if end is not None:
+                end.set_data(x=x + dx, y=y + dy - length, dx=0, dy=length)
+
+        for label, (x, y, _), text, (ha, va, colour) in zip(
+                artists['labels'], layout.labels.tolist(), layout.label_text,
+                layout.label_style):
+            label.set_position((x, y))
+            label.set_text(text)
+            label.set_horizontalalignment(ha)
+            label.set_verticalalignment(va)
+            label.set_color(colour)
+
+        fades = layout.fades.tolist()
+        for collection, zorder in zip(artists['fades'],
+                                      sorted(set(f[3] for f in fades))):
+            collection.set_paths(_rectangles(
+                [f[:3] for f in fades if f[3] == zorder], bar_width))
+        self.frame = index
+
+    def _get_bbox(self, pad_inches):
+        # the union of the tight bounding boxes of all frames, so that every
+        # frame is the same size
+        from matplotlib.backends.backend_agg import RendererAgg
+        from matplotlib.transforms import Bbox
+
+        width, height = self.figure.bbox.size
+        renderer = RendererAgg(int(width), int(height), self.figure.dpi)
+        bboxes = []
+        for i in range(len(self)):
+            self.draw_frame(i)
+            bboxes.append(self.figure.get_tightbbox(renderer))
+        return Bbox.union(bboxes).padded(pad_inches)
+
+    def _render_frames(self, pad_inches):
+        import io
+        import numpy as np
+        from .export import get_image_size
+
+        bbox = self._get_bbox(pad_inches)
+        width = get_image_size(bbox, dpi=self.dpi)[0]
+        images = []
+        for i in range(len(self)):
+            self.draw_frame(i)
+            buf = io.BytesIO()
+            self.figure.savefig(buf, format='rgba', dpi=self.dpi,
+                                bbox_inches=bbox)
+            pixels = np.frombuffer(buf.getvalue(), dtype=np.uint8)
+            images.append(pixels.reshape(-1, width, 4))
+        return images
+
+    def save_animation(self, filename, fps=10, loop=0, pad_inches=0.1):
+        """Save the sweep as an animated GIF or PNG file.
+
+        Args:
+            filename (str): The output file name. The format is taken from
+                the extension, either ``.gif`` or ``.png`` (or ``.apng``).
+            fps (float): Frames per second.
+            loop (int): The number of times the animation repeats. Defaults
+                to repeating forever.
+            pad_inches (float): The padding around the plot in inches.
+        """
+        from PIL import Image
+        from .export import get_format
+
+        fmt = get_format(filename)
+        if fmt not in ('gif', 'png', 'apng'):
+            raise ValueError('animations can only be saved as GIF or PNG '
+                             'files, not {}'.format(fmt))
+
+        self._check_open()
+        frame = self.frame
+        with style_context(self._fonts):
+            frames = self._render_frames(pad_inches)
+            self.draw_frame(frame)
+
+        # GIF frames have no partial transparency, and the figure is opaque
+        mode = 'RGB' if fmt == 'gif' else 'RGBA'
+        images = [Image.fromarray(f[..., :3] if mode == 'RGB' else f, mode)
+                  for f in frames]
+        images[0].save(filename, format='GIF' if fmt == 'gif' else 'PNG',
+                       save_all=True, append_images=images[1:],
+                       duration=int(round(1000. / fps)), loop=loop)
+
+    def save_frames(self, pattern, pad_inches=0.1):
+        """Save each frame of the sweep to a numbered file.
+
+        Args:
+            pattern (str): The output file name, with a format field for the
+                frame number, e.g. ``'frames/sweep_{:03d}.png'``. The format
+                is taken from the extension.
+            pad_inches (float): The padding around the plot in inches.
+
+        Returns:
+            The list of files written.
+        """
+        self._check_open()
+        frame = self.frame
+        filenames = []
+        with style_context(self._fonts):
+            bbox = self._get_bbox(pad_inches)
+            for i in range(len(self)):
+                self.draw_frame(i)
+                filename = pattern.format(i)
+                self.figure.savefig(filename, dpi=self.dpi, bbox_inches=bbox)
+                filenames.append(filename)
+            self.draw_frame(frame)
+        return filenames
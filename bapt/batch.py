@@ -0,0 +1,169 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Render many config files using a pool of warm worker processes.
+"""
+
+import os
+import glob
+import time
+import signal
+
+from multiprocessing import Pool, cpu_count
+
+
+def expand_files(patterns, manifest=None):
+    """Expand config file names, glob patterns and a manifest into a job list.
+
+    Args:
+        patterns (list): File names or glob patterns.
+        manifest (str): Path to a manifest file. Each non-empty line contains
+            a config file name and, optionally, the output file name separated
+            by whitespace. Lines starting with ``#`` are ignored.
+
+    Returns:
+        A list of ``(filename, output)`` tuples. The output is None if it
+        was not specified in the manifest.
+    """
+    jobs = []
+    for pattern in patterns or []:
+        matches = sorted(glob.glob(pattern))
+        # keep unmatched names so that the missing file is reported as failed
+        jobs.extend((f, None) for f in (matches if matches else [pattern]))
+
+    if manifest:
+        base_dir = os.path.dirname(manifest)
+        with open(manifest, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                toks = line.split(None, 1)
+                filename = os.path.join(base_dir, toks[0])
+                output = toks[1].strip() if len(toks) > 1 else None
+                jobs.append((filename, output))
+    return jobs
+
+
+def get_output_filename(filename, output_dir=None, fmt='pdf'):
+    """Get the output file name for a config file.
+
+    Args:
+        filename (str): Path to the config file.
+        output_dir (str): Directory to write to. Defaults to the directory
+            containing the config file.
+        fmt (str): The output file format (extension).
+
+    Returns:
+        The output file path.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    directory = output_dir if output_dir else os.path.dirname(filename)
+    return os.path.join(directory, '{}.{}'.format(stem, fmt))
+
+
+def render_file(filename, output_file, properties=None, dpi=400, cache=None):
+    """Render a single config file.
+
+    Args:
+        filename (str): Path to the config file.
+        output_file (str): Path to the output image.
+        properties (dict): Default plotting options. Options in the settings
+            section of the config file take precedence.
+        dpi (int): Dots-per-inch for file output.
+        cache (RenderCache): A cache of rendered figures. If the figure is
+            found in the cache it is not redrawn.
+    """
+    from . import read_config, add_band_offsets
+    from .figure import AlignmentFigure
+    from .tabular import is_tabular
+
+    data, settings = read_config(filename,
+                                 cache_dir=cache.directory if cache else None)
+    if not is_tabular(filename):
+        add_band_offsets(data)
+
+    properties = dict(properties) if properties else {}
+    properties.update(settings)
+
+    if cache:
+        from .cache import get_cache_key
+
+        fmt = os.path.splitext(output_file)[1][1:]
+        key = get_cache_key(data, properties, fmt, dpi=dpi)
+        if cache.get(key, output_file):
+            return
+
+    with AlignmentFigure(data, dpi=dpi, **properties) as figure:
+        figure.save(output_file)
+
+    if cache:
+        cache.put(key, output_file)
+
+
+def _init_worker():
+    # Ctrl-C is handled by the parent process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from importlib import import_module
+
+    # pay for the matplotlib import and font lookup once per worker, rather
+    # than in the first render
+    import_module('matplotlib.figure')
+    import_module('matplotlib.backends.backend_agg')
+
+    from matplotlib import font_manager
+    from .plotting import style_context
+
+    with style_context():
+        font_manager.findfont(
+            font_manager.FontProperties(family=['sans-serif']))
+
+
+def _render_job(job):
+    filename, output_file, properties, dpi, cache = job
+    start = time.time()
+    try:
+        render_file(filename, output_file, properties=properties, dpi=dpi,
+                    cache=cache)
+        error = None
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    return filename, output_file, error, time.time() - start
+
+
+def render_batch(jobs, properties=None, dpi=400, processes=None, cache=None):
+    """Render many config files in parallel.
+
+    Args:
+        jobs (list): A list of ``(filename, output)`` tuples, or of
+            ``(filename, output, dpi)`` tuples to give each file its own dpi.
+        properties (dict): Default plotting options applied to every file.
+        dpi (int): Dots-per-inch for file output, for jobs without a dpi.
+        processes (int): Number of worker processes. Defaults to the number
+            of cores.
+        cache (RenderCache): A cache of rendered figures shared by the
+            workers.
+
+    Yields:
+        A ``(filename, output, error, time)`` tuple for each job as it
+        finishes. ``error`` is None if the file was rendered successfully.
+    """
+    tasks = [(job[0], job[1], properties, job[2] if len(job) > 2 else dpi,
+              cache) for job in jobs]
+    if not tasks:
+        return
+
+    processes = processes if processes else cpu_count()
+    processes = max(1, min(processes, len(tasks)))
+
+    pool = Pool(processes, initializer=_init_worker)
+    try:
+        for result in pool.imap_unordered(_render_job, tasks):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
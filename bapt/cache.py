@@ -0,0 +1,143 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+On-disk cache of rendered figures, keyed on the plotted data and settings.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+default_cache_size = 256  # MB
+
+
+def _normalise(obj):
+    # colormaps are not JSON serialisable, so they are replaced by their
+    # name and a hash of their lookup table
+    if hasattr(obj, 'N') and callable(obj):
+        import numpy as np
+
+        lut = np.round(obj(np.linspace(0, 1, obj.N)), 6)
+        return {'colormap': obj.name, 'N': obj.N,
+                'lut': hashlib.sha1(lut.tobytes()).hexdigest()}
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError('cannot hash object of type {}'.format(type(obj)))
+
+
+def get_cache_key(data, properties, fmt, dpi=400):
+    """Get the cache key for a figure.
+
+    The key is a hash of the compound data (including the derived band
+    offsets), the plotting options, the output format and dpi, and the bapt
+    and matplotlib versions.
+
+    Args:
+        data (list): A list of compound dicts.
+        properties (dict): The plotting options.
+        fmt (str): The output file format (extension).
+        dpi (int): Dots-per-inch for file output.
+
+    Returns:
+        The key as a hexadecimal string.
+    """
+    import matplotlib
+    from . import __version__
+
+    payload = {'data': data, 'properties': properties, 'format': fmt.lower(),
+               'dpi': dpi, 'bapt': __version__,
+               'matplotlib': matplotlib.__version__}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                           default=_normalise)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class RenderCache(object):
+    """A size-bounded, least recently used cache of rendered figures.
+
+    Args:
+        directory (str): The cache directory. Created if it does not exist.
+        max_size (float): The maximum total size of the cache in MB. The
+            least recently used figures are evicted when it is exceeded.
+    """
+
+    def __init__(self, directory, max_size=default_cache_size):
+        self.directory = directory
+        self.max_size = max_size * 1024 * 1024
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, '{}.{}'.format(key, fmt.lower()))
+
+    def get(self, key, output_file):
+        """Write a cached figure to the output file.
+
+        The figure is copied, so later writes to the output file can't change
+        the cached figure.
+
+        Args:
+            key (str): The cache key.
+            output_file (str): The path to write the figure to.
+
+        Returns:
+            True if the figure was found in the cache, otherwise False.
+        """
+        fmt = os.path.splitext(output_file)[1][1:]
+        path = self._path(key, fmt)
+        if not os.path.exists(path):
+            return False
+
+        # copied next to the output file and then moved into place, so that
+        # the output is never left half written
+        tmp_path = '{}.{}.tmp'.format(output_file, os.getpid())
+        try:
+            os.utime(path, None)  # mark as recently used
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, output_file)
+        except (IOError, OSError):
+            # evicted by another process while we were using it
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def put(self, key, output_file):
+        """Store a rendered figure in the cache.
+
+        Args:
+            key (str): The cache key.
+            output_file (str): The path of the rendered figure.
+        """
+        fmt = os.path.splitext(output_file)[1][1:]
+        path = self._path(key, fmt)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        shutil.copyfile(output_file, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used figures until within the size."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
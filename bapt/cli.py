@@ -2,10 +2,17 @@
 # Copyright (c) Alex Ganose
 # Distributed under the terms of the MIT License.
 
+import os
 import sys
+import time
 import argparse
 
-from . import read_config, get_plot, get_plot_novac
+_start_time = time.time()
+
+from . import read_config, add_band_offsets, get_alignment_plot
+from .export import get_format, get_output_files, get_save_dpi
+from .profiling import mark
+from .tabular import is_tabular
 
 __author__ = "Alex Ganose"
 __version__ = "0.1"
@@ -66,16 +73,175 @@ def main():
                         help='Set the colour for the compound name.')
     parser.add_argument('--fade-cb', action='store_true', dest='fade_cb',
                         help='Apply a fade to the conduction band segments.')
-    parser.add_argument('--dpi', default=400,
+    parser.add_argument('--dpi', type=int, default=400,
                         help='Dots-per-inch for file output.')
+    parser.add_argument('--raster-dpi', dest='raster_dpi', type=int,
+                        default=None,
+                        help='Dots-per-inch of the gradient bars in vector ' +
+                        'output (pdf, svg). Text and edges stay vector. ' +
+                        'Lower values give smaller files (defaults to ' +
+                        '--dpi).')
+    parser.add_argument('--formats', default=None,
+                        help='Comma separated list of output formats, e.g. ' +
+                        'png,pdf,svg. The plot is drawn once and saved in ' +
+                        'each format, named after --output.')
     parser.add_argument('--no-gradient', action='store_false', dest='gradients',
                         help='Plot the boxes as solid colours.')
+    parser.add_argument('--full-detail', action='store_const', const=False,
+                        dest='detail', default=None,
+                        help='Draw every label, arrow and gradient, even ' +
+                        'when the bars are too narrow for them to be read.')
+    parser.add_argument('--preview', nargs='?', type=int, const=100,
+                        default=None, metavar='DPI',
+                        help='Render a quick draft at a low dpi (defaults ' +
+                        'to 100) for checking a plot while editing it. ' +
+                        'The figure is only drawn once and gradients are ' +
+                        'not smoothed.')
+    parser.add_argument('--tiled', action='store_true',
+                        help='Rasterize PNG output in tiles using a pool of ' +
+                        'worker processes, for poster-size plots. Memory ' +
+                        'use is bounded by the size of a band of rows.')
+    parser.add_argument('--direct-svg', action='store_true', dest='direct_svg',
+                        help='Write plots without gradients straight to SVG, ' +
+                        'without going through matplotlib. Much faster ' +
+                        'when generating many figures.')
     parser.add_argument('--photocat', action='store_true',
                          help='Plot water redox potentials')       
+    parser.add_argument('--batch', nargs='+', default=None, metavar='FILE',
+                        help='Render many config files (or glob patterns) ' +
+                        'using a pool of worker processes.')
+    parser.add_argument('--manifest', default=None,
+                        help='File listing config files to render in batch ' +
+                        'mode, one per line, optionally followed by the ' +
+                        'output file name.')
+    parser.add_argument('--output-dir', dest='output_dir', default=None,
+                        help='Directory for batch mode output files ' +
+                        '(defaults to the directory of each config file).')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of batch mode or --tiled worker ' +
+                        'processes (defaults to the number of cores).')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='Directory used to cache rendered figures. ' +
+                        'Figures with unchanged data and settings are ' +
+                        'copied from the cache instead of being redrawn.')
+    parser.add_argument('--cache-size', dest='cache_size', type=float,
+                        default=None,
+                        help='Maximum size of the figure cache in MB ' +
+                        '(defaults to 256 MB).')
+    parser.add_argument('--page-size', dest='page_size', type=int,
+                        default=None,
+                        help='Split the compounds over pages of this many ' +
+                        'compounds with a shared energy scale. PDF output ' +
+                        'is written as one multi-page file, other formats ' +
+                        'as numbered files.')
+    parser.add_argument('--group-by', dest='group_by', default=None,
+                        metavar='KEY',
+                        help='Draw one panel per group of compounds, ' +
+                        'grouped by this compound key or table column, all ' +
+                        'in one figure.')
+    parser.add_argument('--grid-columns', dest='grid_columns', type=int,
+                        default=None,
+                        help='Number of panels in each row of a --group-by ' +
+                        'figure (defaults to a roughly square grid).')
+    parser.add_argument('--share-energy', action='store_true',
+                        dest='share_energy',
+                        help='Plot all --group-by panels with the same ' +
+                        'energy range.')
+    parser.add_argument('--screen', action='store_true',
+                        help='Screen the band offsets of every pair of ' +
+                        'compounds in --filename and list the pairs that ' +
+                        'match the --alignment-type, --min-vbo, ' +
+                        '--max-vbo, --min-cbo and --max-cbo filters.')
+    parser.add_argument('--alignment-type', dest='alignment_type',
+                        default=None, metavar='TYPE',
+                        help='Only list pairs with this alignment type: ' +
+                        'straddling (I), staggered (II) or broken (III).')
+    for band in ('vbo', 'cbo'):
+        for bound in ('min', 'max'):
+            parser.add_argument('--{}-{}'.format(bound, band), type=float,
+                                dest='{}_{}'.format(bound, band),
+                                default=None,
+                                help='The {}imum {} of listed pairs in '
+                                'eV.'.format(bound, band.upper()))
+    parser.add_argument('--top', type=int, default=None,
+                        help='Only list this many pairs, with the largest ' +
+                        '--sort-by offsets.')
+    parser.add_argument('--sort-by', dest='sort_by', default='cbo',
+                        choices=['vbo', 'cbo'],
+                        help='The offset to sort the pairs by (defaults ' +
+                        'to cbo).')
+    parser.add_argument('--ascending', action='store_true',
+                        help='Sort the pairs from the smallest offset.')
+    parser.add_argument('--pairs', default=None, metavar='FILE',
+                        help='Write the listed pairs to a CSV file rather ' +
+                        'than the terminal.')
+    parser.add_argument('--matrices', default=None, metavar='FILE',
+                        help='Write the VBO, CBO and alignment type of ' +
+                        'every pair as matrices, to FILE with _vbo, _cbo ' +
+                        'and _type added to the name. Use a .npy ' +
+                        'extension for NumPy arrays, otherwise CSV.')
+    parser.add_argument('--plot-pairs', action='store_true',
+                        dest='plot_pairs',
+                        help='Plot each listed pair as a panel of one ' +
+                        'figure, saved to --output.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and re-render the config file ' +
+                        'whenever it changes. Requires --filename.')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run a local server that renders figures ' +
+                        'from JSON requests.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address for the server to listen on ' +
+                        '(defaults to 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='Port for the server to listen on ' +
+                        '(defaults to 8000).')
+    parser.add_argument('--socket', default=None,
+                        help='Unix socket for the server to listen on ' +
+                        'instead of a port.')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='Server timeout for rendering a figure in ' +
+                        'seconds (defaults to 30).')
+    parser.add_argument('--max-pending', dest='max_pending', type=int,
+                        default=None,
+                        help='Maximum number of requests the server queues ' +
+                        'before rejecting new ones.')
+    parser.add_argument('--max-dpi', dest='max_dpi', type=float,
+                        default=600,
+                        help='Maximum dpi of the figures rendered by the ' +
+                        'server (defaults to 600).')
+    parser.add_argument('--max-size', dest='max_size', type=float,
+                        default=50,
+                        help='Maximum width and height in inches of the ' +
+                        'figures rendered by the server (defaults to 50).')
+    parser.add_argument('--timing', action='store_true',
+                        help='Report the time taken by each startup and ' +
+                        'rendering stage.')
+    parser.add_argument('--profile', nargs='?', const='-', default=None,
+                        metavar='FILE',
+                        help='Write a JSON profile of the render, with the ' +
+                        'time taken by each stage and the number of ' +
+                        'artists drawn, to FILE (or the terminal).')
     args = parser.parse_args()
+    timings = [('parse arguments', time.time())]
+
+    batch = args.batch or args.manifest
+
+    if args.serve:
+        from .server import serve
+
+        serve(host=args.host, port=args.port, socket_path=args.socket,
+              processes=args.processes, timeout=args.timeout,
+              max_pending=args.max_pending, max_dpi=args.max_dpi,
+              max_size=args.max_size)
+        return
 
     emsg = None
-    if not args.filename and not (args.name or args.ip or args.ea or args.band_gap or args.cbo or args.vbo):
+    if batch and (args.filename or args.name or args.ip or args.ea or args.band_gap or args.cbo or args.vbo):
+        emsg = "ERROR: batch mode and filename/name/ip/ea/cbo/vbo specified simultaneously."
+    elif batch:
+        pass
+    elif not args.filename and not (args.name or args.ip or args.ea or args.band_gap or args.cbo or args.vbo):
         emsg = "ERROR: no arguments specified."
     elif not args.filename and not (args.ip or args.ea) and \
             not (args.name and args.band_gap and (args.cbo or args.vbo)):
@@ -87,20 +253,95 @@ def main():
         emsg = "ERROR: cbo and vbo specified simultaneously."
     elif args.filename and (args.name or args.ip or args.ea or args.band_gap or args.cbo or args.vbo):
         emsg = "ERROR: filename and name/ip/ea/cbo/vbo specified simultaneously."
+    elif args.watch and not args.filename:
+        emsg = "ERROR: --watch can only be used with --filename."
+    elif args.group_by and not args.filename:
+        emsg = "ERROR: --group-by can only be used with --filename."
+    elif args.screen and not args.filename:
+        emsg = "ERROR: --screen can only be used with --filename."
+
+    # each of these replaces the normal save, and none use the render cache
+    output_modes = [flag for flag, value in (
+        ('--page-size', args.page_size), ('--preview', args.preview),
+        ('--tiled', args.tiled), ('--direct-svg', args.direct_svg)) if value]
+    modes = [flag for flag, value in (
+        ('--batch' if args.batch else '--manifest', batch),
+        ('--watch', args.watch),
+        ('--group-by', args.group_by), ('--screen', args.screen)) if value]
+    if emsg:
+        pass
+    elif len(output_modes) > 1:
+        emsg = "ERROR: {} cannot be used together.".format(
+            ' and '.join(output_modes))
+    elif output_modes and args.cache_dir:
+        emsg = "ERROR: --cache-dir cannot be used with {}.".format(
+            output_modes[0])
+    elif len(modes) > 1:
+        emsg = "ERROR: {} cannot be used together.".format(' and '.join(modes))
+    elif modes and output_modes:
+        emsg = "ERROR: {} cannot be used with {}.".format(output_modes[0],
+                                                          modes[0])
+    elif (batch or args.watch) and args.formats:
+        emsg = "ERROR: --formats cannot be used with {}.".format(modes[0])
+    elif args.watch and args.cache_dir:
+        emsg = "ERROR: --cache-dir cannot be used with --watch."
 
     if emsg:
         print(emsg)
         sys.exit()
+    timings.append(('validate arguments', time.time()))
 
     output_file = args.output
 
+    if batch:
+        sys.exit(_run_batch(args))
+
+    if args.screen:
+        _run_screen(args, output_file, timings)
+        if args.timing:
+            _report_timings(timings)
+        return
+
+    if args.watch:
+        from importlib import import_module
+        from .watch import watch
+
+        # matplotlib is imported before watching, so that the first change
+        # is not held up by it
+        import_module('matplotlib.figure')
+
+        print("Watching {} for changes (Ctrl-C to stop).".format(
+            args.filename))
+        watch(args.filename, output_file, properties=_get_properties(args),
+              dpi=get_save_dpi(get_format(output_file), dpi=args.dpi,
+                               raster_dpi=args.raster_dpi))
+        return
+
+    if args.profile:
+        from .profiling import Profiler, profile
+
+        profiler = Profiler()
+        with profile(profiler):
+            profiler.restart(_start_time)
+            profiler.mark('startup')
+            _render(args, output_file, timings, profiler=profiler)
+        _write_profile(profiler, args.profile)
+    else:
+        _render(args, output_file, timings)
+
+    if args.timing:
+        _report_timings(timings)
+
+
+def _render(args, output_file, timings, profiler=None):
+    if args.group_by:
+        _render_grid(args, output_file, timings)
+        return
+
     if args.filename:
-        data, settings = read_config(args.filename)
-        for item in data:
-            if 'cbo' in item:
-                item['vbo'] = data[0]['band_gap'] - item['band_gap'] + item['cbo']
-            if 'vbo' in item:
-                item['cbo'] = -data[0]['band_gap'] + item['band_gap'] + item['vbo']
+        data, settings = read_config(args.filename, cache_dir=args.cache_dir)
+        if not is_tabular(args.filename):
+            add_band_offsets(data)
 
     else:
         for k, v in {'cbo': args.cbo, 'vbo': args.vbo}.items():
@@ -108,32 +349,282 @@ def main():
                 data = [{'name': name, 'band_gap': band_gap, k: c_or_v_bo} for name, band_gap, c_or_v_bo in
                         zip(args.name.split(','), map(float, args.band_gap.split(',')),
                             [0] + list(map(float, v.split(','))))]
-                for item in data:
-                    if k == 'cbo':
-                        item['vbo'] = data[0]['band_gap'] - item['band_gap'] + item['cbo']
-                    if k == 'vbo':
-                        item['cbo'] = -data[0]['band_gap'] + item['band_gap'] + item['vbo']
+                add_band_offsets(data)
         if args.ip:
             data = [{'name': name, 'ip': ip, 'ea': ea} for name, ip, ea in
                     zip(args.name.split(','), map(float, args.ip.split(',')),
                         map(float, args.ea.split(',')))]
 
         settings = {}
+    timings.append(('load data', time.time()))
+    mark('parse')
+
+    properties = _get_properties(args)
+    properties.update(settings)
+    output_files = get_output_files(
+        output_file, args.formats.split(',') if args.formats else None)
+    dpis = dict((f, get_save_dpi(get_format(f), dpi=args.dpi,
+                                 raster_dpi=args.raster_dpi))
+                for f in output_files)
+    if profiler:
+        profiler.info.update({'input': args.filename, 'output': output_files,
+                              'compounds': len(data), 'dpi': args.dpi})
+
+    if args.page_size:
+        from .paging import save_pages
+
+        _use_headless_backend(output_files[0])
+        files = []
+        for filename in output_files:
+            files += save_pages(data, filename, page_size=args.page_size,
+                                dpi=dpis[filename], **properties)
+        timings.append(('plot and save pages', time.time()))
+        mark('render:pages')
+        print("Wrote {} pages to {}.".format(
+            -(-len(data) // args.page_size), ', '.join(files)
+            if len(files) < 4 else files[0] + ', ..., ' + files[-1]))
+        return
+
+    if args.preview:
+        from .figure import AlignmentFigure
+
+        with AlignmentFigure(data, dpi=args.preview, draft=True,
+                             **properties) as figure:
+            timings.append(('plot', time.time()))
+            figure.save(output_files)
+        timings.append(('save', time.time()))
+        mark('render:preview')
+        return
+
+    if args.tiled:
+        from .layout import get_layout
+        from .tiling import save_tiled_png
+
+        if any(get_format(f) != 'png' for f in output_files):
+            print("ERROR: --tiled requires a png output file.")
+            sys.exit()
+        layout = get_layout(data, **properties)
+        timings.append(('layout', time.time()))
+        mark('plot:layout')
+        save_tiled_png(layout, output_files[0], dpi=args.dpi,
+                       processes=args.processes)
+        timings.append(('plot and save', time.time()))
+        mark('render:tiled')
+        return
+
+    if args.direct_svg:
+        from .svg import save_svg
+
+        if any(get_format(f) != 'svg' for f in output_files) or \
+                properties.get('gradients', True):
+            print("ERROR: --direct-svg requires an svg output file and plots "
+                  "without gradients.")
+            sys.exit()
+        save_svg(data, output_files[0], **properties)
+        timings.append(('plot and save', time.time()))
+        mark('render:direct svg')
+        return
+
+    cache = _get_cache(args)
+    if cache:
+        from .cache import get_cache_key
+
+        keys = dict((f, get_cache_key(data, properties, get_format(f),
+                                      dpi=dpis[f])) for f in output_files)
+        missing = [f for f in output_files if not cache.get(keys[f], f)]
+        timings.append(('check cache', time.time()))
+        mark('cache')
+        if profiler:
+            profiler.info['cache'] = 'miss' if missing else 'hit'
+        if not missing:
+            return
+
+    from importlib import import_module
+
+    # imported on its own, so that its cost is reported separately from
+    # plotting
+    _use_headless_backend(output_files[0])
+    import_module('matplotlib.pyplot')
+    timings.append(('import matplotlib', time.time()))
+    mark('import matplotlib')
+
+    plt = get_alignment_plot(data, **properties)
+    timings.append(('plot', time.time()))
+
+    if profiler:
+        for filename in output_files:
+            profiler.save(plt.gcf(), filename, dpi=dpis[filename])
+    else:
+        from .export import save_figure
+
+        save_figure(plt.gcf(), output_files, dpi=args.dpi,
+                    raster_dpi=args.raster_dpi)
+    timings.append(('save', time.time()))
+
+    if cache:
+        for filename in output_files:
+            cache.put(keys[filename], filename)
+        mark('cache')
 
-    properties = vars(args)
+
+def _render_grid(args, output_file, timings):
+    from .grid import read_groups, AlignmentGrid
+
+    groups, settings = read_groups(args.filename, key=args.group_by,
+                                   cache_dir=args.cache_dir)
+    timings.append(('load data', time.time()))
+    mark('parse')
+
+    properties = _get_properties(args)
+    properties.update(settings)
+    output_files = get_output_files(
+        output_file, args.formats.split(',') if args.formats else None)
+
+    with AlignmentGrid(groups, columns=args.grid_columns,
+                       share_energy=args.share_energy, dpi=args.dpi,
+                       **properties) as grid:
+        timings.append(('plot', time.time()))
+        grid.save(output_files, raster_dpi=args.raster_dpi)
+    timings.append(('save', time.time()))
+    mark('render')
+
+
+def _run_screen(args, output_file, timings):
+    from .screening import (screen_pairs, save_pairs, save_offset_matrix,
+                            get_pair_groups)
+
+    data, settings = read_config(args.filename, cache_dir=args.cache_dir)
+    if not is_tabular(args.filename):
+        add_band_offsets(data)
+    timings.append(('load data', time.time()))
+
+    if args.matrices:
+        base, ext = os.path.splitext(args.matrices)
+        for quantity in ('vbo', 'cbo', 'type'):
+            save_offset_matrix(data, '{}_{}{}'.format(base, quantity, ext),
+                               quantity=quantity)
+        timings.append(('save matrices', time.time()))
+
+    pairs = screen_pairs(data, kind=args.alignment_type, min_vbo=args.min_vbo,
+                         max_vbo=args.max_vbo, min_cbo=args.min_cbo,
+                         max_cbo=args.max_cbo, top=args.top,
+                         sort_by=args.sort_by, ascending=args.ascending)
+    timings.append(('screen', time.time()))
+
+    if args.pairs:
+        save_pairs(pairs, args.pairs)
+        print("Wrote {} pairs to {}.".format(len(pairs), args.pairs))
+    else:
+        print("{:<20} {:<20} {:>8} {:>8}  {}".format('a', 'b', 'vbo', 'cbo',
+                                                     'type'))
+        for pair in pairs:
+            print("{a:<20} {b:<20} {vbo:8.2f} {cbo:8.2f}  {type}".format(
+                **pair))
+
+    if args.plot_pairs and pairs:
+        from .grid import AlignmentGrid
+
+        properties = _get_properties(args)
+        properties.update(settings)
+        output_files = get_output_files(
+            output_file, args.formats.split(',') if args.formats else None)
+        with AlignmentGrid(get_pair_groups(data, pairs), dpi=args.dpi,
+                           **properties) as grid:
+            grid.save(output_files, raster_dpi=args.raster_dpi)
+        timings.append(('plot and save', time.time()))
+
+
+def _write_profile(profiler, filename):
+    if filename == '-':
+        print(profiler.to_json())
+    else:
+        with open(filename, 'w') as f:
+            f.write(profiler.to_json() + '\n')
+
+
+def _get_cache(args):
+    if not args.cache_dir:
+        return None
+
+    from .cache import RenderCache, default_cache_size
+
+    size = args.cache_size if args.cache_size else default_cache_size
+    return RenderCache(args.cache_dir, max_size=size)
+
+
+def _use_headless_backend(output_file):
+    # a non-interactive backend avoids loading any GUI toolkit
+    import matplotlib
+
+    pdf = output_file.lower().endswith('.pdf')
+    matplotlib.use('pdf' if pdf else 'agg')
+
+
+def _report_timings(timings):
+    last = _start_time
+    for stage, end in timings:
+        sys.stderr.write('{:<20} {:8.1f} ms\n'.format(stage,
+                                                      (end - last) * 1000))
+        last = end
+    sys.stderr.write('{:<20} {:8.1f} ms\n'.format(
+        'total', (last - _start_time) * 1000))
+
+
+def _get_properties(args):
+    properties = dict(vars(args))
     remove_keys = ('filename', 'ip', 'ea', 'band_gap', 'cbo',
-                   'vbo', 'name', 'output', 'dpi')
+                   'vbo', 'name', 'output', 'dpi', 'batch', 'manifest',
+                   'output_dir', 'processes', 'timing', 'cache_dir',
+                   'cache_size', 'watch', 'page_size', 'direct_svg', 'serve',
+                   'host', 'port', 'socket', 'timeout', 'max_pending',
+                   'max_dpi', 'max_size', 'profile', 'raster_dpi',
+                   'formats', 'group_by', 'grid_columns', 'share_energy',
+                   'screen',
+                   'alignment_type', 'min_vbo', 'max_vbo', 'min_cbo',
+                   'max_cbo', 'top', 'sort_by', 'ascending', 'pairs',
+                   'matrices', 'plot_pairs', 'preview', 'tiled')
     for key in remove_keys:
         properties.pop(key, None)
-    properties.update(settings)
+    return properties
 
-    if 'vbo' in data[0]:  # no vacuum alignment
-        [properties.pop(key, None) for key in ['photocat_hlines', 'photocat']]
-        plt = get_plot_novac(data, **properties)
-    else:
-        [properties.pop(key, None) for key in ['hide_cbo', 'hide_vbo']]
-        plt = get_plot(data, **properties)
-    plt.savefig(output_file, dpi=400, bbox_inches='tight')
+
+def _run_batch(args):
+    from .batch import expand_files, get_output_filename, render_batch
+
+    fmt = args.output.rsplit('.', 1)[-1] if '.' in args.output else 'pdf'
+    jobs = []
+    for filename, output in expand_files(args.batch, manifest=args.manifest):
+        if not output:
+            output = get_output_filename(filename, output_dir=args.output_dir,
+                                         fmt=fmt)
+        elif args.output_dir:
+            output = os.path.join(args.output_dir, output)
+        # manifest outputs can each be in a different format
+        jobs.append((filename, output,
+                     get_save_dpi(get_format(output), dpi=args.dpi,
+                                  raster_dpi=args.raster_dpi)))
+
+    if not jobs:
+        print("ERROR: no config files found.")
+        return 1
+
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    nfailed = 0
+    for filename, output, error, elapsed in render_batch(
+            jobs, properties=_get_properties(args), dpi=args.dpi,
+            processes=args.processes, cache=_get_cache(args)):
+        if error:
+            nfailed += 1
+            print("FAILED {}: {}".format(filename, error))
+        else:
+            print("OK     {} -> {} ({:.2f} s)".format(filename, output,
+                                                      elapsed))
+
+    print("{} of {} files rendered successfully.".format(
+        len(jobs) - nfailed, len(jobs)))
+    return 1 if nfailed else 0
 
 
 if __name__ == "__main__":
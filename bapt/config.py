@@ -0,0 +1,244 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Fast loading of yaml config files.
+
+Config files are parsed with the libyaml C parser when PyYAML was built with
+it. The document is built directly from the parser events, so the node tree
+of the whole file, which takes several times the memory of the loaded data,
+is never held in memory.
+
+Parsed configs can also be stored in a cache directory. A cached config is
+used while the file's modification time and size are unchanged, or, if they
+have changed, while the hash of its contents is unchanged.
+"""
+
+import os
+import pickle
+import hashlib
+
+_merge_tag = 'tag:yaml.org,2002:merge'
+_no_key = object()
+_merge_key = object()
+_collection_tags = (None, '!', 'tag:yaml.org,2002:map',
+                    'tag:yaml.org,2002:seq')
+
+
+def get_yaml_loader():
+    """Get the fastest safe yaml loader available.
+
+    Returns:
+        ``yaml.CSafeLoader`` if PyYAML was built with libyaml, otherwise
+        ``yaml.SafeLoader``.
+    """
+    import yaml
+
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class _Unsupported(Exception):
+    # raised for yaml features the event builder leaves to PyYAML
+    pass
+
+
+def _build_document(loader):
+    # Builds the document from the parser events. Scalars are constructed
+    # as they are read and collections are filled in place.
+    from yaml import events
+    from yaml.nodes import ScalarNode
+
+    constructors = loader.yaml_constructors
+    undefined = constructors.get(None)
+    loader.get_event()  # stream start
+    if loader.check_event(events.StreamEndEvent):
+        return None
+    loader.get_event()  # document start
+
+    anchors = {}
+    stack = []  # [container, pending mapping key]
+    root = None
+    while True:
+        event = loader.get_event()
+        if isinstance(event, events.ScalarEvent):
+            tag = event.tag
+            if tag is None or tag == '!':
+                tag = loader.resolve(ScalarNode, event.value, event.implicit)
+            if tag == _merge_tag:
+                value = _merge_key
+            else:
+                node = ScalarNode(tag, event.value, style=event.style)
+                value = constructors.get(tag, undefined)(loader, node)
+        elif isinstance(event, events.AliasEvent):
+            value = anchors[event.anchor]
+        elif isinstance(event, (events.MappingStartEvent,
+                                events.SequenceStartEvent)):
+            if event.tag not in _collection_tags:
+                raise _Unsupported(event.tag)
+            container = {} if isinstance(
+                event, events.MappingStartEvent) else []
+            if event.anchor is not None:
+                anchors[event.anchor] = container
+            stack.append([container, _no_key])
+            continue
+        elif isinstance(event, (events.MappingEndEvent,
+                                events.SequenceEndEvent)):
+            value = stack.pop()[0]
+        else:
+            break
+        if isinstance(event, events.ScalarEvent) and \
+                event.anchor is not None:
+            anchors[event.anchor] = value
+
+        if not stack:
+            root = value
+            continue
+        top = stack[-1]
+        if isinstance(top[0], list):
+            top[0].append(value)
+        elif top[1] is _no_key:
+            if isinstance(value, (dict, list)):
+                # left to PyYAML, which reports the unhashable key
+                raise _Unsupported('unhashable key')
+            top[1] = value
+        elif top[1] is _merge_key:
+            # merged keys don't override the keys of the mapping itself
+            merges = value if isinstance(value, list) else [value]
+            if not all(isinstance(merged, dict) for merged in merges):
+                raise _Unsupported('merge of a non-mapping')
+            for merged in merges:
+                for k, v in merged.items():
+                    top[0].setdefault(k, v)
+            top[1] = _no_key
+        else:
+            top[0][top[1]] = value
+            top[1] = _no_key
+
+    if not loader.check_event(events.StreamEndEvent):
+        raise _Unsupported('multiple documents')
+    return root
+
+
+def load_yaml(filename):
+    """Load a yaml file using the fastest safe loader available.
+
+    Args:
+        filename (str): Path to the yaml file.
+
+    Returns:
+        The loaded document, the same as returned by ``yaml.safe_load``.
+    """
+    import yaml
+
+    loader_class = get_yaml_loader()
+    with open(filename, 'rb') as f:
+        loader = loader_class(f)
+        try:
+            return _build_document(loader)
+        except _Unsupported:
+            pass
+        finally:
+            loader.dispose()
+
+        # tagged collections and multiple documents are rare in config files
+        f.seek(0)
+        return yaml.load(f, Loader=loader_class)
+
+
+def _hash_file(filename):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ConfigCache(object):
+    """A cache of parsed config files.
+
+    Each config is stored as a pickle alongside the modification time, size
+    and content hash of its file.
+
+    Args:
+        directory (str): The cache directory. Created if it does not exist.
+            It can be shared with a :class:`bapt.cache.RenderCache`, whose
+            size limit then also applies to the cached configs.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, filename):
+        key = hashlib.sha256(os.path.abspath(filename).encode('utf-8'))
+        return os.path.join(self.directory,
+                            '{}.config'.format(key.hexdigest()))
+
+    def load(self, filename):
+        """Load a config file, using the cached copy if it is up to date.
+
+        Args:
+            filename (str): Path to the yaml config file.
+
+        Returns:
+            The loaded config.
+        """
+        from . import __version__
+
+        stat = os.stat(filename)
+        path = self._path(filename)
+        entry = None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (IOError, OSError, EOFError, ValueError,
+                pickle.UnpicklingError):
+            pass
+
+        if entry and entry['bapt'] == __version__:
+            os.utime(path, None)  # mark as recently used
+            if (entry['mtime'], entry['size']) == (stat.st_mtime,
+                                                   stat.st_size):
+                return entry['config']
+            digest = _hash_file(filename)
+            if entry['sha256'] == digest:
+                self._write(path, dict(entry, mtime=stat.st_mtime,
+                                       size=stat.st_size))
+                return entry['config']
+        else:
+            digest = _hash_file(filename)
+
+        config = load_yaml(filename)
+        self._write(path, {'bapt': __version__, 'mtime': stat.st_mtime,
+                           'size': stat.st_size, 'sha256': digest,
+                           'config': config})
+        return config
+
+    def _write(self, path, entry):
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def load_config(filename, cache_dir=None):
+    """Load a yaml config file.
+
+    Args:
+        filename (str): Path to the yaml config file.
+        cache_dir (str): A directory for caching parsed configs. Defaults to
+            no caching.
+
+    Returns:
+        The loaded config.
+    """
+    if cache_dir:
+        return ConfigCache(cache_dir).load(filename)
+    return load_yaml(filename)
@@ -0,0 +1,227 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Save one drawn figure in several file formats.
+
+The figure is only plotted once. All raster formats (PNG, JPEG, TIFF and
+WebP) are encoded from a single rasterization of the figure, in background
+threads while the vector formats are written. The output is the same as
+saving each format separately with ``bbox_inches='tight'``.
+
+In vector formats the gradient bars are the only rasterized layer; text,
+arrows and bar edges stay vector. Their resolution can be set separately
+from the dpi of the raster formats, which makes PDF and SVG files smaller
+and faster to write::
+
+    save_figure(fig, ['alignment.png', 'alignment.pdf'], dpi=400,
+                raster_dpi=150)
+"""
+
+import os
+
+raster_formats = ('png', 'jpg', 'jpeg', 'tif', 'tiff', 'webp')
+
+
+def get_format(filename):
+    """Get the format of an output file from its extension.
+
+    Args:
+        filename (str): The file name.
+
+    Returns:
+        The lower case extension, e.g. ``'png'``.
+    """
+    return os.path.splitext(filename)[1][1:].lower()
+
+
+def get_output_files(output_file, formats=None):
+    """Get the output file name for each format.
+
+    Args:
+        output_file (str): The output file name, e.g. ``alignment.pdf``.
+        formats (list): The output formats, e.g. ``['png', 'svg']``. Defaults
+            to the format of ``output_file``.
+
+    Returns:
+        A list of file names with the extension of each format, e.g.
+        ``['alignment.png', 'alignment.svg']``.
+    """
+    if not formats:
+        return [output_file]
+
+    stem = os.path.splitext(output_file)[0]
+    files = []
+    for fmt in formats:
+        filename = '{}.{}'.format(stem, fmt.strip().lstrip('.').lower())
+        if filename not in files:
+            files.append(filename)
+    return files
+
+
+def get_save_dpi(fmt, dpi=400, raster_dpi=None):
+    """Get the dpi to save a format with.
+
+    Args:
+        fmt (str): The output format.
+        dpi (int): Dots-per-inch for raster formats.
+        raster_dpi (int): Dots-per-inch of the rasterized layers in vector
+            formats. Defaults to ``dpi``.
+
+    Returns:
+        The dpi passed to ``savefig``.
+    """
+    if fmt not in raster_formats and raster_dpi:
+        return raster_dpi
+    return dpi
+
+
+def get_tight_bbox(fig, dpi=None, pad_inches=0.1):
+    """Get the tight bounding box of a figure, as used by ``savefig``.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure.
+        dpi (int): The dpi the figure will be saved at, which affects the
+            size of text slightly. Defaults to the figure dpi.
+        pad_inches (float): The padding around the figure in inches.
+
+    Returns:
+        A :obj:`matplotlib.transforms.Bbox` in inches.
+    """
+    from matplotlib.backends.backend_agg import RendererAgg
+
+    figure_dpi = fig.dpi
+    fig.dpi = dpi if dpi else figure_dpi
+    try:
+        width, height = fig.bbox.size
+        renderer = RendererAgg(int(width), int(height), fig.dpi)
+        bbox = fig.get_tightbbox(renderer)
+    finally:
+        fig.dpi = figure_dpi
+    return bbox.padded(pad_inches)
+
+
+def get_image_size(bbox, dpi=400):
+    """Get the size in pixels of the image of a region of a figure.
+
+    The size is truncated to whole pixels as by the Agg canvas, which allows
+    for the rounding errors of sizes that are a whole number of pixels.
+
+    Args:
+        bbox (matplotlib.transforms.Bbox): The region in inches.
+        dpi (int): Dots-per-inch.
+
+    Returns:
+        The ``(width, height)`` of the image in pixels.
+    """
+    return (int(bbox.width * dpi + 1e-8), int(bbox.height * dpi + 1e-8))
+
+
+def render_rgba(fig, dpi=400, pad_inches=0.1):
+    """Rasterize a figure cropped to its tight bounding box.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure.
+        dpi (int): Dots-per-inch.
+        pad_inches (float): The padding around the figure in inches.
+
+    Returns:
+        An ``(height, width, 4)`` array of RGBA pixels.
+    """
+    import io
+    import numpy as np
+
+    bbox = get_tight_bbox(fig, dpi=dpi, pad_inches=pad_inches)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='rgba', dpi=dpi, bbox_inches=bbox)
+
+    width = get_image_size(bbox, dpi=dpi)[0]
+    pixels = np.frombuffer(buf.getvalue(), dtype=np.uint8)
+    return pixels.reshape(-1, width, 4)
+
+
+def _image_format(filename):
+    fmt = get_format(filename)
+    return {'jpg': 'jpeg', 'tif': 'tiff'}.get(fmt, fmt)
+
+
+def save_rgba(image, filenames, dpi=400):
+    """Save an RGBA image in several raster formats.
+
+    The files are encoded in parallel threads.
+
+    Args:
+        image (numpy.ndarray): An ``(height, width, 4)`` array of RGBA
+            pixels, e.g. as returned by :func:`render_rgba`.
+        filenames (list): The output file names. The format of each file is
+            taken from its extension.
+        dpi (int): The dots-per-inch stored in the files.
+
+    Returns:
+        The list of files written.
+    """
+    from multiprocessing.pool import ThreadPool
+    from matplotlib.image import imsave
+
+    pool = ThreadPool(len(filenames))
+    try:
+        results = [pool.apply_async(
+            imsave, (filename, image),
+            {'format': _image_format(filename), 'dpi': dpi})
+            for filename in filenames]
+        for result in results:
+            result.get()
+    finally:
+        pool.close()
+        pool.join()
+    return list(filenames)
+
+
+def save_figure(fig, filenames, dpi=400, raster_dpi=None, pad_inches=0.1):
+    """Save a drawn figure in several formats.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure.
+        filenames (list): The output file names. The format of each file is
+            taken from its extension.
+        dpi (int): Dots-per-inch for raster formats.
+        raster_dpi (int): Dots-per-inch of the rasterized gradient bars in
+            vector formats. Defaults to ``dpi``.
+        pad_inches (float): The padding around the figure in inches.
+
+    Returns:
+        The list of files written.
+    """
+    from multiprocessing.pool import ThreadPool
+    from matplotlib.image import imsave
+
+    raster = [f for f in filenames if get_format(f) in raster_formats]
+    vector = [f for f in filenames if f not in raster]
+
+    if len(raster) == 1:
+        # nothing to share, so let matplotlib save it directly
+        vector = filenames
+        raster = []
+
+    pool, results = None, []
+    if raster:
+        image = render_rgba(fig, dpi=dpi, pad_inches=pad_inches)
+        pool = ThreadPool(len(raster))
+        for filename in raster:
+            results.append(pool.apply_async(
+                imsave, (filename, image),
+                {'format': _image_format(filename), 'dpi': dpi}))
+
+    try:
+        for filename in vector:
+            fig.savefig(filename, bbox_inches='tight', pad_inches=pad_inches,
+                        dpi=get_save_dpi(get_format(filename), dpi=dpi,
+                                         raster_dpi=raster_dpi))
+        for result in results:
+            result.get()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return list(filenames)
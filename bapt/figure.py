@@ -0,0 +1,205 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Band alignment plots drawn without pyplot.
+
+:class:`AlignmentFigure` draws a plot on a figure with its own Agg canvas.
+The figure is not registered with pyplot, the plot style is only applied
+while the figure is drawn and saved, and the figure is released as soon as
+it is closed::
+
+    with AlignmentFigure(data, show_ea=True) as figure:
+        figure.save(['alignment.png', 'alignment.pdf'])
+
+Drafts (``draft=True``) are quicker to draw and save, for previewing a plot
+while it is being edited. Their gradients are sampled at the resolution of
+the figure, without smoothing, and the saved files are cropped to extents
+computed from the layout (see :func:`bapt.layout.get_extents`) rather than
+by drawing the figure an extra time to measure it.
+
+Figures can be made from several threads at once. The layouts are computed
+concurrently but, as matplotlib's rc settings are shared by the whole
+process, only one thread at a time draws or saves a figure.
+"""
+
+from .plotting import style_context, style_axes, draw_layout_axes
+
+
+class AlignmentFigure(object):
+    """A band alignment plot on its own matplotlib figure.
+
+    Args:
+        data (list): A list of compound dicts.
+        dpi (int): Dots-per-inch of the figure, also used when saving.
+        draft (bool): Draw a quick, lower quality draft of the plot.
+        **kwargs: Plotting options, as for :func:`bapt.get_alignment_plot`.
+
+    Attributes:
+        figure (matplotlib.figure.Figure): The figure. ``None`` once closed.
+        axes (matplotlib.axes.Axes): The axes of the plot.
+        layout (bapt.layout.Layout): The layout of the plot.
+    """
+
+    draft = False
+
+    def __init__(self, data, dpi=400, draft=False, **kwargs):
+        from .layout import get_layout
+        from .profiling import mark
+
+        layout = get_layout(data, **kwargs)
+        mark('plot:layout')
+        self.draft = draft
+        self._draw(layout, dpi)
+
+    @classmethod
+    def from_layout(cls, layout, dpi=400, draft=False):
+        """Draw a plot from a layout computed earlier.
+
+        Args:
+            layout (bapt.layout.Layout): The layout of the plot, as returned
+                by :func:`bapt.layout.get_layout`.
+            dpi (int): Dots-per-inch of the figure, also used when saving.
+            draft (bool): Draw a quick, lower quality draft of the plot.
+
+        Returns:
+            An :class:`AlignmentFigure`.
+        """
+        figure = cls.__new__(cls)
+        figure.draft = draft
+        figure._draw(layout, dpi)
+        return figure
+
+    def _draw(self, layout, dpi):
+        import math
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from .layout import _axes_size
+        from .profiling import mark
+
+        resolution = 1000
+        if self.draft:
+            # one row of the gradients per pixel of the axes
+            resolution = int(math.ceil(dpi * _axes_size(
+                layout.width, layout.height, layout.xlim, layout.ylim,
+                aspect='equal' if layout.gradients else 'auto')[1]))
+
+        self.dpi = dpi
+        self.layout = layout
+        self._fonts = [layout.font]
+        with style_context(self._fonts):
+            self.figure = Figure(figsize=(layout.width, layout.height),
+                                 facecolor='w', dpi=dpi)
+            FigureCanvasAgg(self.figure)
+            self.axes = self.figure.add_subplot(1, 1, 1)
+            style_axes(self.axes)
+            mark('plot:figure')
+            self._artists = draw_layout_axes(self.axes, layout,
+                                             resolution=max(resolution, 2))
+            if self.draft and hasattr(self._artists['bars'],
+                                      'set_interpolation'):
+                self._artists['bars'].set_interpolation('nearest')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _check_open(self):
+        if self.figure is None:
+            raise ValueError('the figure has been closed')
+
+    def save(self, filenames, dpi=None, raster_dpi=None, pad_inches=0.1):
+        """Save the plot, cropped to its contents.
+
+        Args:
+            filenames (str or list): The output file name, or a list of file
+                names to save the plot in several formats. The format of each
+                file is taken from its extension.
+            dpi (int): Dots-per-inch for raster formats. Defaults to the dpi
+                of the figure.
+            raster_dpi (int): Dots-per-inch of the rasterized gradient bars in
+                vector formats. Defaults to ``dpi``.
+            pad_inches (float): The padding around the plot in inches.
+
+        Returns:
+            The list of files written.
+        """
+        from .export import save_figure
+
+        self._check_open()
+        if not isinstance(filenames, (list, tuple)):
+            filenames = [filenames]
+        if self.draft:
+            return self._save_draft(filenames, dpi=dpi, raster_dpi=raster_dpi,
+                                    pad_inches=pad_inches)
+        with style_context(self._fonts):
+            return save_figure(self.figure, filenames,
+                               dpi=dpi if dpi else self.dpi,
+                               raster_dpi=raster_dpi, pad_inches=pad_inches)
+
+    def _save_draft(self, filenames, dpi=None, raster_dpi=None,
+                    pad_inches=0.1):
+        from .export import get_format, get_save_dpi
+
+        bbox = self._get_draft_bbox(pad_inches)
+        with style_context(self._fonts):
+            for filename in filenames:
+                self.figure.savefig(filename, bbox_inches=bbox,
+                                    dpi=get_save_dpi(
+                                        get_format(filename),
+                                        dpi=dpi if dpi else self.dpi,
+                                        raster_dpi=raster_dpi))
+        return list(filenames)
+
+    def to_bytes(self, fmt='png', dpi=None, pad_inches=0.1):
+        """Save the plot to memory, cropped to its contents.
+
+        Args:
+            fmt (str): The image format.
+            dpi (int): Dots-per-inch. Defaults to the dpi of the figure.
+            pad_inches (float): The padding around the plot in inches.
+
+        Returns:
+            The image as bytes.
+        """
+        import io
+
+        self._check_open()
+        buf = io.BytesIO()
+        bbox = self._get_draft_bbox(pad_inches) if self.draft else 'tight'
+        with style_context(self._fonts):
+            self.figure.savefig(buf, format=fmt, dpi=dpi if dpi else self.dpi,
+                                bbox_inches=bbox, pad_inches=pad_inches)
+        return buf.getvalue()
+
+    def _get_draft_bbox(self, pad_inches):
+        from matplotlib.transforms import Bbox
+        from .layout import get_extents
+
+        return Bbox.from_extents(*get_extents(self.layout,
+                                              pad_inches=pad_inches))
+
+    def close(self):
+        """Release the figure. The plot can no longer be saved."""
+        if self.figure is not None:
+            self.figure.clear()
+            self.figure = self.axes = self._artists = None
+
+
+def render_alignment(data, fmt='png', dpi=400, **kwargs):
+    """Render a band alignment plot to an image in memory.
+
+    Args:
+        data (list): A list of compound dicts.
+        fmt (str): The image format.
+        dpi (int): Dots-per-inch.
+        **kwargs: Plotting options, as for :func:`bapt.get_alignment_plot`.
+
+    Returns:
+        The image as bytes.
+    """
+    with AlignmentFigure(data, dpi=dpi, **kwargs) as figure:
+        return figure.to_bytes(fmt=fmt)
@@ -0,0 +1,166 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+A process-wide cache of gradient colormaps and their sampled textures.
+
+Configs tend to reuse the same few start and end colours, so the colormaps
+built from them, and the textures sampled from those colormaps for drawing
+gradient bars, are shared between configs rather than rebuilt for each one.
+This matters most for batch processing and the render server, where the
+worker processes render many configs.
+"""
+
+import threading
+import collections
+
+default_cache_size = 256  # entries
+texture_size = 1024
+
+
+class GradientCache(object):
+    """A size-bounded, least recently used cache of gradients.
+
+    The cache can be shared by threads.
+
+    Colormaps are keyed on their start and end colours and number of colours.
+    Textures are keyed on the colormap key and the interpolation used to
+    sample it.
+
+    Args:
+        max_size (int): The maximum number of colormaps and of textures held.
+            The least recently used entries are evicted when it is exceeded.
+    """
+
+    def __init__(self, max_size=default_cache_size):
+        self.max_size = max_size
+        self._colormaps = collections.OrderedDict()
+        self._textures = collections.OrderedDict()
+        self._keys = {}  # id of a cached colormap -> its key
+        self._counts = collections.Counter()
+        self._lock = threading.RLock()
+
+    def get_colormap(self, start, end, N=200):
+        """Get a colormap running linearly between two colours.
+
+        Args:
+            start: The first colour, in any format understood by matplotlib.
+            end: The last colour.
+            N (int): The number of colours in the colormap.
+
+        Returns:
+            A :obj:`matplotlib.colors.LinearSegmentedColormap`.
+        """
+        from matplotlib.colors import LinearSegmentedColormap, to_hex, to_rgba
+
+        key = (to_rgba(start), to_rgba(end), N)
+        with self._lock:
+            if key in self._colormaps:
+                self._counts['colormap_hits'] += 1
+                cmap = self._colormaps.pop(key)
+                self._colormaps[key] = cmap  # mark as recently used
+                return cmap
+
+            self._counts['colormap_misses'] += 1
+            name = '{}-{}'.format(to_hex(key[0], keep_alpha=True),
+                                  to_hex(key[1], keep_alpha=True))
+            cmap = LinearSegmentedColormap.from_list(name, key[:2], N=N)
+            self._colormaps[key] = cmap
+            self._keys[id(cmap)] = key
+            while len(self._colormaps) > self.max_size:
+                _, old = self._colormaps.popitem(last=False)
+                del self._keys[id(old)]
+            return cmap
+
+    def get_texture(self, cmap, interpolation='bicubic'):
+        """Get the colours of a gradient bar sampled along its height.
+
+        Args:
+            cmap (matplotlib.colors.Colormap): The gradient colormap.
+            interpolation (str): The interpolation of the gradient. Only
+                ``'bicubic'``, as used by :func:`bapt.plotting.gbar`, is
+                supported.
+
+        Returns:
+            A ``(texture_size, 4)`` array of RGBA colours, running from the
+            top of the bar to the bottom. Must not be modified.
+        """
+        import numpy as np
+        from .plotting import _gradient_profile
+
+        if interpolation != 'bicubic':
+            raise ValueError('unsupported interpolation: {}'.format(
+                interpolation))
+
+        cmap_key = self._keys.get(id(cmap))
+        if cmap_key is None:
+            # colormaps made elsewhere can't be keyed cheaply, so they are
+            # sampled every time
+            self._counts['texture_uncached'] += 1
+            return cmap(_gradient_profile(np.linspace(0, 1, texture_size)))
+
+        key = cmap_key + (interpolation, texture_size)
+        with self._lock:
+            if key in self._textures:
+                self._counts['texture_hits'] += 1
+                texture = self._textures.pop(key)
+                self._textures[key] = texture
+                return texture
+
+            self._counts['texture_misses'] += 1
+            texture = cmap(_gradient_profile(np.linspace(0, 1, texture_size)))
+            texture.setflags(write=False)
+            self._textures[key] = texture
+            while len(self._textures) > self.max_size:
+                self._textures.popitem(last=False)
+            return texture
+
+    def stats(self):
+        """Get the cache hit and miss counts.
+
+        Returns:
+            A dict of the counts and the number of cached colormaps and
+            textures.
+        """
+        keys = ('colormap_hits', 'colormap_misses', 'texture_hits',
+                'texture_misses', 'texture_uncached')
+        with self._lock:
+            stats = dict((k, self._counts[k]) for k in keys)
+            stats['colormaps'] = len(self._colormaps)
+            stats['textures'] = len(self._textures)
+            return stats
+
+    def clear(self):
+        """Remove all cached gradients and reset the counts."""
+        with self._lock:
+            self._colormaps.clear()
+            self._textures.clear()
+            self._keys.clear()
+            self._counts.clear()
+
+
+gradient_cache = GradientCache()
+
+
+def get_gradient(start, end, N=200):
+    """Get a gradient colormap from the process-wide cache.
+
+    Args:
+        start: The first colour, in any format understood by matplotlib.
+        end: The last colour.
+        N (int): The number of colours in the colormap.
+
+    Returns:
+        A :obj:`matplotlib.colors.LinearSegmentedColormap`.
+    """
+    return gradient_cache.get_colormap(start, end, N=N)
+
+
+def gradient_cache_stats():
+    """Get the hit and miss counts of the process-wide gradient cache.
+
+    Returns:
+        A dict of statistics, as returned by :meth:`GradientCache.stats`.
+    """
+    return gradient_cache.stats()
@@ -0,0 +1,332 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Small multiples: many band alignment plots drawn as panels of one figure.
+
+Each group of compounds, e.g. one per material family, is drawn in its own
+panel at the same size and in the same style as a single plot. The panels
+are drawn on one figure, which is saved once::
+
+    groups, settings = read_groups('families.csv', key='family')
+    with AlignmentGrid(groups, share_energy=True, **settings) as grid:
+        grid.save('families.pdf')
+
+Config files and tables are grouped by a key of each compound, or a column
+of the table. Band offsets are relative to the first compound of each group.
+"""
+
+from .layout import subplot, _axes_size
+from .plotting import style_context, style_axes, draw_layout_axes
+from .figure import AlignmentFigure
+
+
+def get_groups(data, key='group'):
+    """Split compounds into groups by one of their properties.
+
+    Args:
+        data (list): A list of compound dicts.
+        key (str): The compound property to group by.
+
+    Returns:
+        A list of ``(group, data)`` tuples, in the order in which the groups
+        first appear.
+
+    Raises:
+        ValueError: If any compounds are missing the property.
+    """
+    missing = [d.get('name', '') for d in data if d.get(key, '') == '']
+    if missing:
+        raise ValueError('missing {} for compounds: {}'.format(
+            key, ', '.join(str(m) for m in missing)))
+
+    groups = {}
+    order = []
+    for compound in data:
+        if compound[key] not in groups:
+            groups[compound[key]] = []
+            order.append(compound[key])
+        groups[compound[key]].append(compound)
+    return [(group, groups[group]) for group in order]
+
+
+def _get_table_groups(filename, key):
+    import numpy as np
+    from .tabular import (read_table, derive_band_edges, columns_to_data,
+                          _rows)
+
+    columns = read_table(filename)
+    if key not in columns:
+        raise ValueError('no {} column found'.format(key))
+    values = columns[key]
+    missing = values == ''
+    if missing.any():
+        raise ValueError('missing {} in rows {}'.format(key, _rows(missing)))
+
+    groups = []
+    names, first = np.unique(values, return_index=True)
+    for group in names[np.argsort(first)].tolist():
+        mask = values == group
+        group_columns = dict((k, v[mask]) for k, v in columns.items())
+        try:
+            derive_band_edges(group_columns)
+        except ValueError as e:
+            raise ValueError('group {} (rows numbered within the group): '
+                             '{}'.format(group, e))
+        groups.append((group, columns_to_data(group_columns)))
+    return groups
+
+
+def read_groups(filename, key='group', cache_dir=None):
+    """Read compound data split into groups from a config file or table.
+
+    Band offsets are filled in separately for each group, relative to the
+    first compound of the group.
+
+    Args:
+        filename (str): Path to a yaml config file, or a table supported by
+            :func:`bapt.tabular.read_tabular`.
+        key (str): The compound property, or table column, to group by.
+        cache_dir (str): A directory for caching parsed yaml configs.
+
+    Returns:
+        The groups and settings as a tuple of ``(groups, settings)``, where
+        groups is a list of ``(group, data)`` tuples.
+    """
+    from . import read_config, add_band_offsets
+    from .tabular import is_tabular
+
+    if is_tabular(filename):
+        return _get_table_groups(filename, key), {}
+
+    data, settings = read_config(filename, cache_dir=cache_dir)
+    groups = get_groups(data, key=key)
+    for _, group_data in groups:
+        add_band_offsets(group_data)
+    return groups, settings
+
+
+def get_grid_layouts(groups, share_energy=False, **kwargs):
+    """Get the layout of each panel of a grid.
+
+    Args:
+        groups (list): A list of ``(group, data)`` tuples, one per panel.
+        share_energy (bool): Whether all panels have the same energy range.
+        **kwargs: Plotting options, as for :func:`bapt.get_alignment_plot`.
+            An ``emin`` or ``emax`` given here overrides the shared range.
+
+    Returns:
+        A list of :class:`bapt.layout.Layout`, one per panel.
+    """
+    from .layout import get_layout
+    from .paging import get_energy_range
+
+    options = {}
+    if share_energy:
+        if len(set('vbo' in data[0] for _, data in groups)) > 1:
+            raise ValueError('plots with and without vacuum alignment cannot '
+                             'share an energy range')
+        options = get_energy_range([d for _, data in groups for d in data])
+    options.update((k, v) for k, v in kwargs.items()
+                   if v is not None or k not in options)
+    return [get_layout(data, **dict(options)) for _, data in groups]
+
+
+class AlignmentGrid(AlignmentFigure):
+    """Several band alignment plots drawn as the panels of one figure.
+
+    The panels are laid out in rows, left to right, and each is labelled
+    with the name of its group.
+
+    Args:
+        groups (list): A list of ``(group, data)`` tuples, one per panel, as
+            returned by :func:`read_groups`.
+        columns (int): The number of panels in each row. Defaults to a
+            roughly square grid.
+        share_energy (bool): Plot all panels with the same energy range. When
+            the energy axis is shown, only the first panel of each row is
+            labelled.
+        dpi (int): Dots-per-inch of the figure, also used when saving.
+        wspace (float): The space between panels in inches.
+        hspace (float): The space between rows in inches.
+        **kwargs: Plotting options, as for :func:`bapt.get_alignment_plot`.
+
+    Attributes:
+        figure (matplotlib.figure.Figure): The figure. ``None`` once closed.
+        axes (list): The axes of each panel.
+        layouts (list): The layout of each panel.
+    """
+
+    def __init__(self, groups, columns=None, share_energy=False, dpi=400,
+                 wspace=0.5, hspace=0.5, **kwargs):
+        import math
+        from .profiling import mark
+
+        groups = list(groups)
+        if not groups:
+            raise ValueError('there are no groups to plot')
+        self.layouts = get_grid_layouts(groups, share_energy=share_energy,
+                                        **kwargs)
+        mark('plot:layout')
+
+        columns = columns if columns else int(math.ceil(len(groups) ** 0.5))
+        self._draw_grid([str(group) for group, _ in groups], columns,
+                        share_energy, dpi, wspace, hspace)
+
+    def _draw_grid(self, titles, columns, share_energy, dpi, wspace,
+                   hspace):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from .profiling import mark
+
+        # each panel has the same axes size as a plot of its own, but the
+        # cells are fitted to the axes after the aspect ratio of gradient
+        # bars is applied, and the side margins are only kept for the energy
+        # axis and the labels of the reference lines
+        cells = []
+        for layout in self.layouts:
+            box = _axes_size(layout.width, layout.height, layout.xlim,
+                             layout.ylim,
+                             aspect='equal' if layout.gradients else 'auto')
+            margins = (subplot['left'] * layout.width if layout.show_axis
+                       else 0,
+                       (1 - subplot['right']) * layout.width
+                       if len(layout.hlines) else 0,
+                       subplot['bottom'] * layout.height,
+                       (1 - subplot['top']) * layout.height)
+            cells.append((box, margins))
+        rows = [cells[i:i + columns] for i in range(0, len(cells), columns)]
+        row_heights = [max(b[1] + m[2] + m[3] for b, m in row)
+                       for row in rows]
+
+        # the figure has a margin of wspace and hspace on each side, so that
+        # nothing is drawn outside of it (see _render_rgba)
+        width = max(sum(b[0] + m[0] + m[1] for b, m in row) +
+                    wspace * (len(row) + 1) for row in rows)
+        height = sum(row_heights) + hspace * (len(rows) + 1)
+
+        self.dpi = dpi
+        self.layout = self.layouts[0]
+        self._fonts = [self.layout.font]
+        with style_context(self._fonts):
+            self.figure = Figure(figsize=(width, height), facecolor='w',
+                                 dpi=dpi)
+            FigureCanvasAgg(self.figure)
+            mark('plot:figure')
+
+            self.axes = []
+            self._artists = []
+            top = height - hspace
+            for row, row_height in zip(rows, row_heights):
+                left = wspace
+                for column, (box, margins) in enumerate(row):
+                    layout = self.layouts[len(self.axes)]
+                    ax = self.figure.add_axes([
+                        (left + margins[0]) / width,
+                        (top - margins[3] - box[1]) / height,
+                        box[0] / width, box[1] / height])
+                    style_axes(ax)
+                    self._artists.append(draw_layout_axes(ax, layout))
+                    if share_energy and column > 0:
+                        ax.set_ylabel('')
+                        ax.tick_params(labelleft=False)
+                    ax.annotate(titles[len(self.axes)], xy=(0.5, 1),
+                                xycoords='axes fraction',
+                                xytext=(0, 6 + 1.6 * layout.label_size),
+                                textcoords='offset points', ha='center',
+                                va='bottom', size=layout.label_size,
+                                weight='bold')
+                    self.axes.append(ax)
+                    left += box[0] + margins[0] + margins[1] + wspace
+                top -= row_height + hspace
+
+    def _render_rgba(self, dpi, pad_inches):
+        # savefig draws the figure twice to crop it to its contents, once to
+        # find the tight bounding box and once to render it. Grids have many
+        # labels, so they are drawn once and the image is cropped instead
+        import numpy as np
+
+        figure_dpi = self.figure.dpi
+        self.figure.dpi = dpi
+        try:
+            canvas = self.figure.canvas
+            canvas.draw()
+            bbox = self.figure.get_tightbbox(
+                canvas.get_renderer()).padded(pad_inches)
+            image = np.asarray(canvas.buffer_rgba())
+        finally:
+            self.figure.dpi = figure_dpi
+
+        height, width = image.shape[:2]
+        x0 = max(int(np.floor(bbox.x0 * dpi)), 0)
+        x1 = min(int(np.ceil(bbox.x1 * dpi)), width)
+        y0 = max(height - int(np.ceil(bbox.y1 * dpi)), 0)
+        y1 = min(height - int(np.floor(bbox.y0 * dpi)), height)
+        return image[y0:y1, x0:x1].copy(), bbox
+
+    def save(self, filenames, dpi=None, raster_dpi=None, pad_inches=0.1):
+        """Save the grid, cropped to its contents.
+
+        Args:
+            filenames (str or list): The output file name, or a list of file
+                names to save the grid in several formats. The format of each
+                file is taken from its extension.
+            dpi (int): Dots-per-inch for raster formats. Defaults to the dpi
+                of the figure.
+            raster_dpi (int): Dots-per-inch of the rasterized gradient bars in
+                vector formats. Defaults to ``dpi``.
+            pad_inches (float): The padding around the grid in inches.
+
+        Returns:
+            The list of files written.
+        """
+        from .export import get_format, raster_formats, save_rgba
+
+        if not isinstance(filenames, (list, tuple)):
+            filenames = [filenames]
+        raster = [f for f in filenames if get_format(f) in raster_formats]
+        if not raster:
+            return super(AlignmentGrid, self).save(
+                filenames, dpi=dpi, raster_dpi=raster_dpi,
+                pad_inches=pad_inches)
+
+        self._check_open()
+        dpi = dpi if dpi else self.dpi
+        with style_context(self._fonts):
+            image, bbox = self._render_rgba(dpi, pad_inches)
+            for filename in filenames:
+                if filename not in raster:
+                    self.figure.savefig(
+                        filename, bbox_inches=bbox,
+                        dpi=raster_dpi if raster_dpi else dpi)
+        save_rgba(image, raster, dpi=dpi)
+        return list(filenames)
+
+    def to_bytes(self, fmt='png', dpi=None, pad_inches=0.1):
+        """Save the grid to memory, cropped to its contents.
+
+        Args:
+            fmt (str): The image format.
+            dpi (int): Dots-per-inch. Defaults to the dpi of the figure.
+            pad_inches (float): The padding around the grid in inches.
+
+        Returns:
+            The image as bytes.
+        """
+        import io
+        from matplotlib.image import imsave
+        from .export import raster_formats
+
+        if fmt not in raster_formats:
+            return super(AlignmentGrid, self).to_bytes(
+                fmt=fmt, dpi=dpi, pad_inches=pad_inches)
+
+        self._check_open()
+        dpi = dpi if dpi else self.dpi
+        with style_context(self._fonts):
+            image, _ = self._render_rgba(dpi, pad_inches)
+        buf = io.BytesIO()
+        imsave(buf, image, format={'jpg': 'jpeg', 'tif': 'tiff'}.get(fmt, fmt),
+               dpi=dpi)
+        return buf.getvalue()
@@ -0,0 +1,676 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+The geometry of band alignment plots, computed separately from drawing them.
+
+A :class:`Layout` holds the positions of the bars, arrows, labels and fade
+overlays of a plot, and its size and axis limits, as arrays. It is computed
+from the compound data and settings without creating a figure, and can then
+be drawn with matplotlib (:func:`bapt.plotting.draw_layout`), written as SVG
+(:func:`bapt.svg.layout_to_svg`), or stored as JSON and drawn later::
+
+    layout = get_layout(data, **settings)
+    plt = draw_layout(layout)
+    svg = layout_to_svg(Layout.from_dict(layout.to_dict()))
+
+Labels are measured from the font metrics (see
+:func:`bapt.plotting.text_extents`), so no renderer is needed.
+"""
+
+from .plotting import default_fonts
+
+# matplotlib's default axes position, as fractions of the figure size
+subplot = {'left': 0.125, 'bottom': 0.11, 'right': 0.9, 'top': 0.88}
+
+default_vb_colour = '#219ebc'
+default_cb_colour = '#fb8500'
+
+# the narrowest bars, in inches, on which each detail is drawn: compound
+# names, energy labels (ip, ea, band gaps and offsets), dashed arrows,
+# gradients (otherwise flat fills) and fade overlays (otherwise the faded
+# colours are used as the fills)
+default_detail = {'names': 0.3, 'values': 0.6, 'arrows': 0.15,
+                  'gradients': 0.1, 'fades': 0.1}
+
+
+class Layout(object):
+    """The geometry of a band alignment plot.
+
+    Each bar is drawn with a border, so the bars and their borders share the
+    same ``(left, top, bottom)`` rows. The bars of each compound are stored
+    valence band first.
+
+    Args:
+        kind (str): ``'vacuum'`` for vacuum aligned plots or ``'offset'`` for
+            plots of band offsets. Sets the style of the energy axis.
+        width (float): Width of the figure in inches.
+        height (float): Height of the figure in inches.
+        xlim (tuple): The ``(xmin, xmax)`` limits of the axes.
+        ylim (tuple): The ``(emin, emax)`` limits of the axes.
+        bars (numpy.ndarray): An ``(N, 3)`` array of the ``(left, top,
+            bottom)`` of each bar.
+        bar_fills (list): The face colour, or for gradient bars the
+            colormap, of each bar.
+        edge_colours (list): The border colour of each bar.
+        edge_zorders (numpy.ndarray): The border zorder of each bar.
+        arrows (numpy.ndarray): An ``(M, 4)`` array of the ``(x, y, dx,
+            dy)`` of each dashed arrow.
+        arrow_heads (numpy.ndarray): An ``(M, 2)`` boolean array of whether
+            each arrow has a head at its start and end.
+        labels (numpy.ndarray): A ``(K, 3)`` array of the ``(x, y, zorder)``
+            of each label.
+        label_text (list): The text of each label.
+        label_style (list): The ``(ha, va, colour)`` of each label.
+        fades (numpy.ndarray): An ``(F, 4)`` array of the ``(left, top,
+            bottom, zorder)`` of each fade overlay.
+        hlines (numpy.ndarray): The energies of dotted reference lines drawn
+            across the plot.
+        bar_width (float): The width of the bars.
+        gradients (bool): Whether the bars are gradients.
+        label_size (float): The font size of the labels.
+        font (str): The preferred font.
+        show_axis (bool): Whether to show the energy axis.
+        title (str): The title, shown above the plot.
+        xlabel (str): The label below the plot.
+    """
+
+    __slots__ = ('kind', 'width', 'height', 'xlim', 'ylim', 'bars',
+                 'bar_fills', 'edge_colours', 'edge_zorders', 'arrows',
+                 'arrow_heads', 'labels', 'label_text', 'label_style',
+                 'fades', 'hlines', 'bar_width', 'gradients', 'label_size',
+                 'font', 'show_axis', 'title', 'xlabel')
+
+    _arrays = {'bars': (3, float), 'edge_zorders': (None, float),
+               'arrows': (4, float), 'arrow_heads': (2, bool),
+               'labels': (3, float), 'fades': (4, float),
+               'hlines': (None, float)}
+
+    def __init__(self, kind, width, height, xlim, ylim, bars, bar_fills,
+                 edge_colours, edge_zorders, arrows, arrow_heads, labels,
+                 label_text, label_style, fades, hlines=(), bar_width=3,
+                 gradients=True, label_size=15, font=None, show_axis=False,
+                 title='', xlabel=''):
+        import numpy as np
+
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.xlim = tuple(xlim)
+        self.ylim = tuple(ylim)
+        self.bar_fills = list(bar_fills)
+        self.edge_colours = list(edge_colours)
+        self.label_text = list(label_text)
+        self.label_style = [tuple(s) for s in label_style]
+        self.bar_width = bar_width
+        self.gradients = gradients
+        self.label_size = label_size
+        self.font = font
+        self.show_axis = show_axis
+        self.title = title
+        self.xlabel = xlabel
+
+        arrays = dict(bars=bars, edge_zorders=edge_zorders, arrows=arrows,
+                      arrow_heads=arrow_heads, labels=labels, fades=fades,
+                      hlines=hlines)
+        for name, (columns, dtype) in self._arrays.items():
+            array = np.asarray(arrays[name], dtype=dtype)
+            if columns:
+                array = array.reshape(-1, columns)
+            setattr(self, name, array)
+
+    @property
+    def fonts(self):
+        """The fonts used for the labels, most preferred first."""
+        return [self.font] + default_fonts if self.font else default_fonts
+
+    def to_dict(self):
+        """Get the layout as a JSON serializable dict.
+
+        Gradients are stored by their start and end colours.
+
+        Returns:
+            The layout as a dict, which can be loaded with :meth:`from_dict`.
+        """
+        d = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if name in self._arrays:
+                value = value.tolist()
+            elif name == 'bar_fills':
+                value = [_fill_to_dict(fill) for fill in value]
+            elif isinstance(value, tuple):
+                value = list(value)
+            d[name] = value
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        """Load a layout from a dict.
+
+        Args:
+            d (dict): The layout, as returned by :meth:`to_dict`.
+
+        Returns:
+            A :class:`Layout`.
+        """
+        d = dict(d)
+        d['bar_fills'] = [_fill_from_dict(fill) for fill in d['bar_fills']]
+        return cls(**d)
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def _fill_to_dict(fill):
+    from matplotlib.colors import Colormap, to_hex
+
+    if isinstance(fill, Colormap):
+        return {'start': to_hex(fill(0.), keep_alpha=True),
+                'end': to_hex(fill(1.), keep_alpha=True), 'N': fill.N}
+    return list(fill) if isinstance(fill, tuple) else fill
+
+
+def _fill_from_dict(fill):
+    from .gradients import get_gradient
+
+    if isinstance(fill, dict):
+        return get_gradient(fill['start'], fill['end'], N=fill['N'])
+    return fill
+
+
+def _interleave(*columns):
+    # [a0, b0, a1, b1, ...] from the columns [a0, a1, ...], [b0, b1, ...]
+    import numpy as np
+
+    return np.column_stack(columns).reshape(-1)
+
+
+def _get_bar_fills(data, gradients):
+    from .plotting import _default_cmap
+
+    if gradients:
+        keys = ('vb_gradient', 'cb_gradient')
+        defaults = (_default_cmap('vb_cmap'), _default_cmap('cb_cmap'))
+    else:
+        keys = ('vb_colour', 'cb_colour')
+        defaults = (default_vb_colour, default_cb_colour)
+    return [compound.get(key, default) for compound in data
+            for key, default in zip(keys, defaults)]
+
+
+class _Labels(object):
+    # collects labels added in groups (e.g. all the compound names) and
+    # orders them by compound, so that they are drawn compound by compound
+
+    def __init__(self):
+        self._groups = []
+
+    def add(self, index, x, y, text, ha, va, colour, zorder=2):
+        import numpy as np
+
+        index = np.asarray(index)
+        self._groups.append((index, np.broadcast_to(x, index.shape),
+                             np.broadcast_to(y, index.shape), list(text),
+                             (ha, va, colour), zorder))
+
+    def get(self):
+        import numpy as np
+
+        if not self._groups:
+            return np.zeros((0, 3)), [], []
+        index = np.concatenate([g[0] for g in self._groups])
+        group = np.concatenate([np.full(len(g[0]), i)
+                                for i, g in enumerate(self._groups)])
+        order = np.lexsort((group, index))
+        labels = np.column_stack([
+            np.concatenate([g[1] for g in self._groups]),
+            np.concatenate([g[2] for g in self._groups]),
+            np.concatenate([np.full(len(g[0]), float(g[5]))
+                            for g in self._groups])])[order]
+        text = [t for g in self._groups for t in g[3]]
+        style = [g[4] for g in self._groups for _ in g[3]]
+        return (labels, [text[i] for i in order],
+                [style[i] for i in order])
+
+
+def _get_fades(x, fade, fade_cb, ea, emin, emax):
+    # faded compounds are covered entirely, otherwise the conduction band is
+    # covered if fade_cb is set
+    import numpy as np
+
+    covered = fade | fade_cb
+    return np.column_stack([x, np.where(fade, emin, ea),
+                            np.full(len(x), emax),
+                            np.where(fade, 3., 1.)])[covered]
+
+
+def _get_edges(fade, fade_cb, gradients):
+    import numpy as np
+
+    vb = np.where(fade, '#808080', 'k')
+    # only the borders of gradient bars show fade_cb
+    cb = np.where(fade | fade_cb, '#808080', 'k') if gradients else vb
+    zorders = np.where(fade, 4., 5.)
+    return _interleave(vb, cb).tolist(), _interleave(zorders, zorders)
+
+
+def _axes_size(width, height, xlim, ylim, aspect='auto'):
+    # the width and height of the axes in inches, after matplotlib applies
+    # the aspect ratio (gradient bars are drawn with an equal aspect ratio)
+    box_width = (subplot['right'] - subplot['left']) * width
+    box_height = (subplot['top'] - subplot['bottom']) * height
+    if aspect == 'equal':
+        data_ratio = abs(ylim[1] - ylim[0]) / abs(xlim[1] - xlim[0])
+        if box_width * data_ratio > box_height:
+            box_width = box_height / data_ratio
+        else:
+            box_height = box_width * data_ratio
+    return box_width, box_height
+
+
+def _axes_height(width, height, xlim, ylim, aspect='auto'):
+    return _axes_size(width, height, xlim, ylim, aspect=aspect)[1]
+
+
+def get_extents(layout, pad_inches=0.1):
+    """Get the extents of everything drawn in a plot, without drawing it.
+
+    This is the tight bounding box that ``savefig(bbox_inches='tight')``
+    finds by drawing the figure, computed from the layout and the font
+    metrics of the labels instead. Saving with it as ``bbox_inches`` means
+    the figure is only drawn once.
+
+    Args:
+        layout (Layout): The layout of the plot.
+        pad_inches (float): The padding around the plot in inches.
+
+    Returns:
+        The ``(x0, y0, x1, y1)`` of the extents in inches, from the bottom
+        left of the figure.
+    """
+    import numpy as np
+    from matplotlib import rcParams
+    from .plotting import _text_metrics, _ticklabelsize
+
+    fonts = layout.fonts + ['sans-serif']
+    size = layout.label_size
+
+    # the axes are centred in the default subplot box
+    box_width, box_height = _axes_size(
+        layout.width, layout.height, layout.xlim, layout.ylim,
+        aspect='equal' if layout.gradients and len(layout.bars) else 'auto')
+    left = (subplot['left'] * layout.width +
+            ((subplot['right'] - subplot['left']) * layout.width -
+             box_width) / 2)
+    bottom = (subplot['bottom'] * layout.height +
+              ((subplot['top'] - subplot['bottom']) * layout.height -
+               box_height) / 2)
+    right, top = left + box_width, bottom + box_height
+    x0, y0, x1, y1 = left, bottom, right, top
+
+    # labels, in points from their anchor
+    (xmin, xmax), (emin, emax) = layout.xlim, layout.ylim
+    if len(layout.labels):
+        metrics = np.array(_text_metrics(layout.label_text, size,
+                                         fonts=fonts))
+        widths, heights = metrics[:, 0], metrics[:, 1] + metrics[:, 2]
+        x = left + (layout.labels[:, 0] - xmin) / (xmax - xmin) * box_width
+        y = bottom + (layout.labels[:, 1] - emin) / (emax - emin) * box_height
+        ha = np.array([s[0] for s in layout.label_style])
+        va = np.array([s[1] for s in layout.label_style])
+        x = x - widths / 72. * np.select(
+            [ha == 'center', ha == 'right'], [0.5, 1.], 0.)
+        y = y - heights / 72. * np.select(
+            [va == 'center', va == 'top'], [0.5, 1.], 0.)
+        x0, x1 = min(x0, x.min()), max(x1, (x + widths / 72.).max())
+        y0, y1 = min(y0, y.min()), max(y1, (y + heights / 72.).max())
+
+    # the title sits on a baseline above the axes, and the x label hangs
+    # below them
+    (title_width, title_ascent, _), (xlabel_width, xlabel_ascent,
+                                     xlabel_descent) = \
+        _text_metrics([layout.title, layout.xlabel], size, fonts=fonts)
+    centre = (left + right) / 2
+    if layout.title:
+        y1 = max(y1, top + (rcParams['axes.titlepad'] + title_ascent) / 72.)
+    if layout.xlabel:
+        y0 = min(y0, bottom - (rcParams['axes.labelpad'] + xlabel_ascent +
+                               xlabel_descent) / 72.)
+    for text, width in ((layout.title, title_width),
+                        (layout.xlabel, xlabel_width)):
+        if text:
+            x0 = min(x0, centre - width / 144.)
+            x1 = max(x1, centre + width / 144.)
+
+    if layout.show_axis:
+        ticks, labels = _get_yticks(layout)
+        if ticks:
+            metrics = np.array(_text_metrics(labels, _ticklabelsize,
+                                             fonts=fonts))
+            ticks = bottom + (np.array(ticks) - emin) / (emax - emin) * \
+                box_height
+            heights = (metrics[:, 1] + metrics[:, 2]) / 72.
+            tick_left = left - (4 + metrics[:, 0].max()) / 72.
+            y0 = min(y0, (ticks - heights / 2).min())
+            y1 = max(y1, (ticks + heights / 2).max())
+        else:
+            tick_left = left
+        (width, ascent, descent), = _text_metrics(['Energy (eV)'], size,
+                                                  fonts=fonts)
+        x0 = min(x0, tick_left - (rcParams['axes.labelpad'] + ascent +
+                                  descent) / 72.)
+        middle = (bottom + top) / 2
+        y0 = min(y0, middle - width / 144.)
+        y1 = max(y1, middle + width / 144.)
+
+    return (x0 - pad_inches, y0 - pad_inches, x1 + pad_inches,
+            y1 + pad_inches)
+
+
+def _get_yticks(layout):
+    # the labelled energy ticks, as placed by draw_layout_axes
+    from matplotlib.ticker import MaxNLocator, MultipleLocator, \
+        ScalarFormatter
+
+    locator = MaxNLocator(5) if layout.kind == 'vacuum' else \
+        MultipleLocator(1)
+    emin, emax = layout.ylim
+    ticks = [t for t in locator.tick_values(emin, emax)
+             if min(emin, emax) <= t <= max(emin, emax)]
+    formatter = ScalarFormatter()
+    formatter.create_dummy_axis()
+    formatter.axis.set_view_interval(emin, emax)
+    return ticks, formatter.format_ticks(ticks)
+
+
+def _get_minor_yticks(layout):
+    # the unlabelled half eV ticks of offset plots, as placed by
+    # draw_layout_axes, without those under the labelled ticks
+    from matplotlib.ticker import MultipleLocator
+
+    if layout.kind == 'vacuum':
+        return []
+    emin, emax = layout.ylim
+    major = _get_yticks(layout)[0]
+    return [t for t in MultipleLocator(0.5).tick_values(emin, emax)
+            if min(emin, emax) <= t <= max(emin, emax) and
+            all(abs(t - m) > 1e-5 for m in major)]
+
+
+def get_detail(detail=None):
+    """Get the thresholds of the level of detail of dense plots.
+
+    When there are many compounds, the bars are too narrow for their labels
+    and arrows to be read, yet these still take most of the time to draw and
+    most of the space in vector files. Each detail is only drawn if the bars
+    are at least as wide as its threshold, so the cost of a plot grows with
+    its size rather than with the number of compounds.
+
+    Args:
+        detail (dict or bool): The minimum bar width in inches for any of the
+            ``'names'``, ``'values'``, ``'arrows'``, ``'gradients'`` and
+            ``'fades'`` details, overriding those in :data:`default_detail`.
+            Use ``False`` to always draw every detail.
+
+    Returns:
+        A dict of the minimum bar width of each detail.
+    """
+    if detail is False:
+        return dict((key, 0) for key in default_detail)
+
+    thresholds = dict(default_detail)
+    if detail:
+        unknown = sorted(set(detail) - set(default_detail))
+        if unknown:
+            raise ValueError('unknown detail thresholds: {}'.format(
+                ', '.join(unknown)))
+        thresholds.update(detail)
+    return thresholds
+
+
+def _get_shown(detail, width, height, xlim, ylim, bar_width, gradients):
+    # which details are drawn, from the width of the bars on the page. The
+    # axes are wider without gradients, as they no longer keep the aspect
+    # ratio of the data
+    thresholds = get_detail(detail)
+
+    def bar_inches(gradients):
+        box_width = _axes_size(width, height, xlim, ylim,
+                               aspect='equal' if gradients else 'auto')[0]
+        return box_width * bar_width / (xlim[1] - xlim[0])
+
+    gradients = gradients and bar_inches(True) >= thresholds['gradients']
+    inches = bar_inches(gradients)
+    shown = dict((key, inches >= threshold)
+                 for key, threshold in thresholds.items())
+    shown['gradients'] = gradients
+    return shown
+
+
+def _faded(fill):
+    # the colour of a bar seen through a fade overlay (white at half opacity)
+    from matplotlib.colors import Colormap, to_rgba
+    from .gradients import get_gradient
+
+    if isinstance(fill, Colormap):
+        return get_gradient(_faded(fill(0.)), _faded(fill(1.)), N=fill.N)
+    r, g, b, a = to_rgba(fill)
+    return ((r + 1) / 2., (g + 1) / 2., (b + 1) / 2., a)
+
+
+def _fade_fills(fills, fade, fade_cb):
+    # fades the fills of the bars covered by fade overlays, so that the
+    # overlays need not be drawn
+    covered = _interleave(fade, fade | fade_cb).tolist()
+    return [_faded(fill) if c else fill for fill, c in zip(fills, covered)]
+
+
+def _default_width(n, bar_width=3, gap=0.5):
+    # the width of a figure of n bars, in inches, if none is given
+    return (bar_width/2. + gap/2.) * n
+
+
+def get_vacuum_layout(data, height=5, width=None, emin=None, colours=None,
+                      bar_width=3, show_axis=False, label_size=15, gap=0.5,
+                      font=None, show_ea=False, name_colour='w',
+                      fade_cb=False, gradients=True, photocat=False,
+                      detail=None):
+    """Get the layout of a vacuum aligned plot.
+
+    The arguments are the same as those of :func:`bapt.get_plot`. Details
+    are left out of dense plots as set by ``detail`` (see
+    :func:`get_detail`).
+
+    Returns:
+        A :class:`Layout`.
+    """
+    import numpy as np
+
+    n = len(data)
+    width = width if width else _default_width(n, bar_width, gap)
+    emin = emin if emin else -max([d['ip'] for d in data]) - 2
+    end = (n * bar_width) + ((n - 1) * gap)
+    pad = 2. / emin
+    shown = _get_shown(detail, width, height, (0, end), (emin, 0), bar_width,
+                       gradients)
+    gradients = shown['gradients']
+
+    index = np.arange(n)
+    x = index * (bar_width + gap)
+    ip = -np.array([d['ip'] for d in data], dtype=float)
+    ea = -np.array([d['ea'] for d in data], dtype=float)
+    fade = np.array([bool(d.get('fade', False)) for d in data])
+
+    bars = np.column_stack([np.repeat(x, 2), _interleave(ip, ea),
+                            np.tile([emin, 0.], n)])
+    edge_colours, edge_zorders = _get_edges(fade, fade_cb, gradients)
+
+    arrow_x = x + bar_width/6.
+    zeros, ones = np.zeros(n), np.ones(n, dtype=bool)
+    labels = _Labels()
+    if show_ea:
+        arrows = np.column_stack([
+            _interleave(arrow_x, arrow_x), _interleave(ea - pad/3, ip - pad/3),
+            np.zeros(2 * n), _interleave(-ea + 2 * pad/3,
+                                         ea-ip + 2 * pad/3)])
+        arrow_heads = np.column_stack([np.ones(2 * n, dtype=bool),
+                                       _interleave(ones, ~ones)])
+        if shown['values']:
+            labels.add(index, x + bar_width/4., ip - pad/2,
+                       ['{:.1f} eV'.format(d['ip']) for d in data], 'left',
+                       'bottom', 'k')
+            labels.add(index, x + bar_width/4., pad * 2,
+                       ['{:.1f} eV'.format(d['ea']) for d in data], 'left',
+                       'top', 'k')
+    else:
+        arrows = np.column_stack([arrow_x, ip - pad/3, zeros,
+                                  -ip + 2 * pad/3])
+        arrow_heads = np.column_stack([ones, ones])
+        if shown['values']:
+            labels.add(index, x + bar_width/4., pad * 2,
+                       ['{:.1f} eV'.format(d['ip']) for d in data], 'left',
+                       'top', 'k')
+    if not shown['arrows']:
+        arrows, arrow_heads = arrows[:0], arrow_heads[:0]
+    if shown['names']:
+        labels.add(index, x + bar_width/2., ip + pad,
+                   [d['name'] for d in data], 'center', 'top', name_colour)
+
+    hlines = []
+    if photocat:
+        hlines = [-4.44, -5.67]
+        labels.add([n, n], end + 0.1, hlines,
+                   ['[H$^+$/H$_2$]', '[H$_2$O/O$_2$]'], 'left', 'center', 'k',
+                   zorder=3)
+    labels, label_text, label_style = labels.get()
+
+    bar_fills = _get_bar_fills(data, gradients)
+    fades = _get_fades(x, fade, fade_cb, ea, emin, 0.)
+    if not shown['fades']:
+        bar_fills, fades = _fade_fills(bar_fills, fade, fade_cb), fades[:0]
+
+    return Layout('vacuum', width, height, (0, end), (emin, 0), bars,
+                  bar_fills, edge_colours, edge_zorders, arrows, arrow_heads,
+                  labels, label_text, label_style, fades, hlines=hlines,
+                  bar_width=bar_width, gradients=gradients,
+                  label_size=label_size, font=font, show_axis=show_axis,
+                  title='Vacuum Level', xlabel='Valence Band')
+
+
+def get_novac_layout(data, height=5, width=None, emin=None, emax=None,
+                     colours=None, bar_width=3, show_axis=False,
+                     hide_cbo=False, hide_vbo=False, label_size=15, gap=0.5,
+                     font=None, show_ea=False, name_colour='w', fade_cb=False,
+                     gradients=True, detail=None):
+    """Get the layout of a plot of band offsets, without vacuum alignment.
+
+    The arguments are the same as those of :func:`bapt.get_plot_novac`.
+    Details are left out of dense plots as set by ``detail`` (see
+    :func:`get_detail`).
+
+    Returns:
+        A :class:`Layout`.
+    """
+    import numpy as np
+    from .plotting import text_extents
+
+    n = len(data)
+    width = width if width else _default_width(n, bar_width, gap)
+    emin = emin if emin else min([d['vbo'] for d in data]) - 2
+    emax = emax if emax else max([d['vbo'] + d['band_gap'] for d in data]) + 2
+    end = (n * bar_width) + ((n - 1) * gap)
+    pad = - (emax - emin) / 20
+    shown = _get_shown(detail, width, height, (0, end), (emin, emax),
+                       bar_width, gradients)
+    gradients = shown['gradients']
+
+    index = np.arange(n)
+    x = index * (bar_width + gap)
+    band_gap = np.array([d['band_gap'] for d in data], dtype=float)
+    ip = np.array([d['vbo'] for d in data], dtype=float)
+    ea = ip + band_gap
+    fade = np.array([bool(d.get('fade', False)) for d in data])
+
+    bars = np.column_stack([np.repeat(x, 2), _interleave(ip, ea),
+                            np.tile([emin, emax], n)])
+    edge_colours, edge_zorders = _get_edges(fade, fade_cb, gradients)
+
+    arrows = np.column_stack([x + bar_width/6., ip - pad/3, np.zeros(n),
+                              ea-ip + 2 * pad/3])
+    arrow_heads = np.ones((n, 2), dtype=bool)
+    if not shown['arrows']:
+        arrows, arrow_heads = arrows[:0], arrow_heads[:0]
+
+    labels = _Labels()
+    if shown['values']:
+        labels.add(index, x + bar_width/4., ip + band_gap/2,
+                   ['{:.2f} eV'.format(d['band_gap']) for d in data], 'left',
+                   'center', 'k')
+    if shown['names']:
+        labels.add(index, x + bar_width/2., ip + pad / 2,
+                   [d['name'] for d in data], 'center', 'top', name_colour)
+
+    # the offsets are relative to the previous compound, and the valence band
+    # offset is placed just below the compound name
+    if not hide_vbo and n > 1 and shown['values']:
+        fonts = [font] + default_fonts if font else default_fonts
+        name_heights = np.zeros(n - 1)
+        if shown['names']:
+            name_heights = np.array([h for _, h in text_extents(
+                [d['name'] for d in data[1:]], label_size,
+                fonts=fonts + ['sans-serif'])])
+        pts_per_ev = _axes_height(
+            width, height, (0, end), (emin, emax),
+            aspect='equal' if gradients else 'auto') * 72. / (emax - emin)
+        labels.add(index[1:], x[1:] + bar_width/2.,
+                   ip[1:] + pad / 2 - name_heights / pts_per_ev,
+                   ['{:+.2f} eV'.format(b['vbo'] - a['vbo'])
+                    for a, b in zip(data, data[1:])],
+                   'center', 'top', name_colour)
+    if not hide_cbo and n > 1 and shown['values']:
+        labels.add(index[1:], x[1:] + bar_width/2., ea[1:] - pad / 4,
+                   ['{:+.2f} eV'.format(b['cbo'] - a['cbo'])
+                    for a, b in zip(data, data[1:])],
+                   'center', 'bottom', name_colour)
+    labels, label_text, label_style = labels.get()
+
+    bar_fills = _get_bar_fills(data, gradients)
+    fades = _get_fades(x, fade, fade_cb, ea, emin, emax)
+    if not shown['fades']:
+        bar_fills, fades = _fade_fills(bar_fills, fade, fade_cb), fades[:0]
+
+    return Layout('offset', width, height, (0, end), (emin, emax), bars,
+                  bar_fills, edge_colours, edge_zorders, arrows, arrow_heads,
+                  labels, label_text, label_style, fades,
+                  bar_width=bar_width, gradients=gradients,
+                  label_size=label_size, font=font, show_axis=show_axis,
+                  title='Conduction Band', xlabel='Valence Band')
+
+
+def get_layout(data, **kwargs):
+    """Get the layout of a band alignment plot suited to the data.
+
+    Compounds with valence band offsets are laid out without vacuum alignment,
+    like :func:`bapt.get_alignment_plot`. Keyword arguments that do not apply
+    to the type of plot are discarded.
+
+    Args:
+        data (list): A list of compound dicts.
+        **kwargs: Plotting options.
+
+    Returns:
+        A :class:`Layout`.
+    """
+    kwargs.pop('plt', None)
+    if 'vbo' in data[0]:
+        [kwargs.pop(key, None) for key in ['photocat_hlines', 'photocat']]
+        return get_novac_layout(data, **kwargs)
+    else:
+        [kwargs.pop(key, None) for key in ['hide_cbo', 'hide_vbo']]
+        return get_vacuum_layout(data, **kwargs)
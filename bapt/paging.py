@@ -0,0 +1,97 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Split very large compound sets over several pages with a shared energy scale.
+"""
+
+import os
+
+
+def get_energy_range(data):
+    """Get the energy range needed to plot all compounds.
+
+    Args:
+        data (list): A list of compound dicts.
+
+    Returns:
+        The plotting options that fix the energy range, as a dict. This is
+        ``emin`` for vacuum aligned data and ``emin`` and ``emax`` for data
+        with band offsets.
+    """
+    if 'vbo' in data[0]:
+        return {'emin': min([d['vbo'] for d in data]) - 2,
+                'emax': max([d['vbo'] + d['band_gap'] for d in data]) + 2}
+    return {'emin': -max([d['ip'] for d in data]) - 2}
+
+
+def get_page_filename(output_file, page):
+    """Get the file name of a page.
+
+    Args:
+        output_file (str): The output file name, e.g. ``alignment.png``.
+        page (int): The page number, starting from 1.
+
+    Returns:
+        The numbered file name, e.g. ``alignment-001.png``.
+    """
+    stem, ext = os.path.splitext(output_file)
+    return '{}-{:03d}{}'.format(stem, page, ext)
+
+
+def save_pages(data, output_file, page_size=50, dpi=400, **kwargs):
+    """Plot the compounds over several pages and save them.
+
+    All pages share the same energy range, so bars can be compared between
+    pages. Each page is saved and closed before the next one is drawn, so
+    the memory used depends on the page size and not the number of
+    compounds.
+
+    Args:
+        data (list): A list of compound dicts.
+        output_file (str): The output file name. PDF files are written as a
+            single multi-page document, other formats are written as numbered
+            files, e.g. ``alignment-001.png``.
+        page_size (int): The maximum number of compounds per page.
+        dpi (int): Dots-per-inch for file output.
+        **kwargs: Plotting options passed to the plotting function. An
+            ``emin`` or ``emax`` given here overrides the shared range.
+
+    Returns:
+        A list of the files written.
+    """
+    import matplotlib.pyplot as plt
+
+    from . import get_alignment_plot
+
+    options = get_energy_range(data)
+    options.update((k, v) for k, v in kwargs.items()
+                   if v is not None or k not in options)
+
+    pages = [data[i:i + page_size] for i in range(0, len(data), page_size)]
+    pdf = output_file.lower().endswith('.pdf')
+    if pdf:
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        writer = PdfPages(output_file)
+        files = [output_file]
+    else:
+        files = []
+
+    try:
+        for i, page in enumerate(pages):
+            fig = get_alignment_plot(page, **dict(options)).gcf()
+            try:
+                if pdf:
+                    writer.savefig(fig, dpi=dpi, bbox_inches='tight')
+                else:
+                    filename = get_page_filename(output_file, i + 1)
+                    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+                    files.append(filename)
+            finally:
+                plt.close(fig)
+    finally:
+        if pdf:
+            writer.close()
+    return files
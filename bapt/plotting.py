@@ -2,14 +2,15 @@
 # Copyright (c) Alex Ganose
 # Distributed under the terms of the MIT License.
 
-from matplotlib.patches import Rectangle
-from matplotlib.colors import LinearSegmentedColormap
+# matplotlib and numpy are imported when first needed, so that importing
+# bapt (and running bapt -h) stays fast
 
+import threading
+import contextlib
 
 cb_colours = [(247/255., 148/255., 51/255.), (251/255., 216/255., 181/255.)]
 vb_colours = [(23/255., 71/255., 158/255.), (174/255., 198/255., 242/255.)]
-cb_cmap = LinearSegmentedColormap.from_list('cb', cb_colours, N=200)
-vb_cmap = LinearSegmentedColormap.from_list('vb', vb_colours, N=200)
+_default_cmaps = {'cb_cmap': cb_colours, 'vb_cmap': vb_colours}
 
 default_fonts = ['Whitney Pro', 'Helvetica', 'Arial', 'Whitney Book'
                  'Liberation Sans', 'Andale Sans']
@@ -17,34 +18,69 @@ _ticklabelsize = 15
 _labelsize = 18
 _ticksize = 5
 _linewidth = 1.
+_arrow_head_length = 0.25
+_arrow_head_width = 0.2
+_arrow_overhang = 0.15
+_arrow_dashes = (8, 4.3)
 
+_style_lock = threading.RLock()
+
+
+def _default_cmap(name):
+    from .gradients import get_gradient
+
+    return get_gradient(*_default_cmaps[name], N=200)
 
-def pretty_plot(width=5, height=5, plt=None, dpi=400, fonts=None):
-    """Initialise a matplotlib plot with sensible defaults for publication.
 
+def __getattr__(name):
+    # the default colormaps (vb_cmap and cb_cmap) are built on first use
+    if name in _default_cmaps:
+        return _default_cmap(name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def get_rc_params(fonts=None):
+    """Get the matplotlib rc settings used for band alignment plots.
 
     Args:
-        width (float): Width of plot in inches. Defaults to 8 in.
-        height (float): Height of plot in inches. Defaults to 8 in.
-        plt (matplotlib.pyplot): If plt is supplied, changes will be made to an
-            existing plot. Otherwise, a new plot will be created.
-        dpi (int): Sets dot per inch for figure. Defaults to 400.
         fonts (list): A list of preferred fonts. If these are not found the
             default fonts will be used.
 
     Returns:
-        Matplotlib plot object with properly sized fonts.
+        A dict of rc settings.
     """
+    fonts = default_fonts if fonts is None or fonts == [None] else fonts + default_fonts
+    return {'font.family': 'sans-serif', 'font.sans-serif': fonts,
+            'text.usetex': False, 'pdf.fonttype': 42,
+            'mathtext.fontset': 'stixsans', 'legend.handlelength': 2}
 
-    from matplotlib import rc
 
-    if plt is None:
-        import matplotlib.pyplot as plt
-        plt.figure(figsize=(width, height), facecolor="w", dpi=dpi)
-        ax = plt.gca()
+@contextlib.contextmanager
+def style_context(fonts=None):
+    """Apply the plot style for the duration of a with block.
 
-    ax = plt.gca()
+    The rc settings are restored afterwards. As rc settings are shared by the
+    whole process, only one thread at a time can be inside the block; other
+    threads wait for it to finish.
 
+    Args:
+        fonts (list): A list of preferred fonts. If these are not found the
+            default fonts will be used.
+    """
+    from matplotlib import rc_context
+
+    with _style_lock:
+        with rc_context(get_rc_params(fonts)):
+            yield
+
+
+def style_axes(ax):
+    """Set the ticks, spines and label sizes of an axes for publication.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axes.
+    """
     ax.tick_params(width=_linewidth, size=_ticksize)
     ax.tick_params(which='major', size=_ticksize, width=_linewidth,
                    labelsize=_ticklabelsize, pad=4, direction='in',
@@ -59,18 +95,141 @@ def pretty_plot(width=5, height=5, plt=None, dpi=400, fonts=None):
     ax.set_xlabel(ax.get_xlabel(), size=_labelsize)
     ax.set_ylabel(ax.get_ylabel(), size=_labelsize)
 
-    fonts = default_fonts if fonts is None or fonts == [None] else fonts + default_fonts
 
-    rc('font', **{'family': 'sans-serif', 'sans-serif': fonts})
-    rc('text', usetex=False)
-    rc('pdf', fonttype=42)
-    rc('mathtext', fontset='stixsans')
-    rc('legend', handlelength=2)
+def pretty_plot(width=5, height=5, plt=None, dpi=400, fonts=None):
+    """Initialise a matplotlib plot with sensible defaults for publication.
+
+    The style is set in the global rc settings. Use
+    :class:`bapt.figure.AlignmentFigure` to plot without pyplot or global
+    state.
+
+    Args:
+        width (float): Width of plot in inches. Defaults to 8 in.
+        height (float): Height of plot in inches. Defaults to 8 in.
+        plt (matplotlib.pyplot): If plt is supplied, changes will be made to an
+            existing plot. Otherwise, a new plot will be created.
+        dpi (int): Sets dot per inch for figure. Defaults to 400.
+        fonts (list): A list of preferred fonts. If these are not found the
+            default fonts will be used.
+
+    Returns:
+        Matplotlib plot object with properly sized fonts.
+    """
+
+    from matplotlib import rcParams
+
+    if plt is None:
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(width, height), facecolor="w", dpi=dpi)
+
+    style_axes(plt.gca())
+    rcParams.update(get_rc_params(fonts))
     return plt
 
 
+# measured label sizes; cleared when full so long running processes that
+# plot many different labels don't grow without limit
+_text_extent_cache_size = 100000
+_text_extent_cache = {}
+
+
+def _font_ascent_descent(font):
+    # the ascent and descent matplotlib reserves for a line of text, as a
+    # fraction of the font size
+    for table_name, ascent_key, descent_key in [
+            ('OS/2', 'sTypoAscender', 'sTypoDescender'),
+            ('hhea', 'ascent', 'descent')]:
+        table = font.get_sfnt_table(table_name)
+        if table is not None:
+            units_per_em = font.get_sfnt_table('head')['unitsPerEm']
+            return (table[ascent_key] / units_per_em,
+                    -table[descent_key] / units_per_em)
+    return (font.ascender / font.units_per_EM,
+            -font.descender / font.units_per_EM)
+
+
+def _no_hinting():
+    from matplotlib import ft2font
+
+    if hasattr(ft2font, 'LoadFlags'):
+        return ft2font.LoadFlags.NO_HINTING
+    return ft2font.LOAD_NO_HINTING
+
+
+def _text_metrics(strings, size, fonts=None):
+    # the (width, ascent, descent) of single-line labels in points, where the
+    # ascent and descent are measured from the baseline
+    from matplotlib import cbook
+    from matplotlib.font_manager import FontProperties, findfont, get_font
+    from matplotlib.textpath import text_to_path
+
+    family = ['sans-serif'] if fonts is None else fonts
+    prop = FontProperties(family=family, size=size)
+    font_file = findfont(prop)
+
+    if len(_text_extent_cache) > _text_extent_cache_size:
+        _text_extent_cache.clear()
+
+    metrics = []
+    font = font_ascent = font_descent = None
+    for string in strings:
+        key = (font_file, size, string)
+        value = _text_extent_cache.get(key)
+        if value is None:
+            if font_ascent is None:
+                font_ascent, font_descent = _font_ascent_descent(
+                    get_font(font_file))
+            if cbook.is_math_text(string):
+                width, height, descent = \
+                    text_to_path.get_text_width_height_descent(string, prop,
+                                                               ismath=True)
+            else:
+                # as measured by text_to_path, but the font is only looked
+                # up once rather than for every string. The font object is
+                # shared, so its size is set each time
+                if font is None:
+                    font = text_to_path._get_font(prop)
+                font.set_size(text_to_path.FONT_SCALE, text_to_path.DPI)
+                font.set_text(string.replace(r'\$', '$'), 0.0,
+                              flags=_no_hinting())
+                scale = size / text_to_path.FONT_SCALE
+                width, height = [v / 64. * scale
+                                 for v in font.get_width_height()]
+                descent = font.get_descent() / 64. * scale
+            # a line of text is at least as tall as the font allows for
+            value = (width, max(height - descent, font_ascent * size),
+                     max(descent, font_descent * size))
+            _text_extent_cache[key] = value
+        metrics.append(value)
+    return metrics
+
+
+def text_extents(strings, size, fonts=None):
+    """Measure single-line text labels without drawing them.
+
+    The measurements are made from the font metrics and cached on the font
+    file, font size and string, so no renderer is needed and repeated labels
+    are only measured once.
+
+    Args:
+        strings (list): The label strings. Strings containing ``$`` pairs are
+            measured as mathtext.
+        size (float): The font size in points.
+        fonts (list): A list of preferred fonts. Defaults to the fonts set by
+            :func:`pretty_plot`.
+
+    Returns:
+        A list of ``(width, height)`` tuples in points, matching the window
+        extent of the drawn text.
+    """
+    return [(width, ascent + descent) for width, ascent, descent in
+            _text_metrics(strings, size, fonts=fonts)]
+
+
 def cbar(ax, left, top, face_colour, bar_width=3, bottom=0,
          show_edge=True, edge_colour='k', edge_zorder=5):
+    from matplotlib.patches import Rectangle
+
     X = [[.6, .6], [.7, .7]]
     right = left + bar_width
     patch = Rectangle((left, top), bar_width, bottom-top, fill=True,
@@ -84,8 +243,11 @@ def cbar(ax, left, top, face_colour, bar_width=3, bottom=0,
                            zorder=edge_zorder)
         ax.add_patch(border)
 
-def gbar(ax, left, top, bar_width=3, bottom=0, gradient=vb_cmap,
+def gbar(ax, left, top, bar_width=3, bottom=0, gradient=None,
          show_edge=True, edge_colour='k', edge_zorder=5):
+    from matplotlib.patches import Rectangle
+
+    gradient = _default_cmap('vb_cmap') if gradient is None else gradient
     X = [[.6, .6], [.7, .7]]
     right = left + bar_width
     ax.imshow(X, interpolation='bicubic', cmap=gradient,
@@ -99,22 +261,314 @@ def gbar(ax, left, top, bar_width=3, bottom=0, gradient=vb_cmap,
 
 
 def fadebar(ax, left, top, bar_width=3, bottom=0, zorder=3):
+    from matplotlib.patches import Rectangle
+
     fade = Rectangle((left, top), bar_width, bottom-top, alpha=0.5, color='w',
                      clip_on=False, zorder=zorder)
     ax.add_patch(fade)
 
 
+def _gradient_profile(frac):
+    # Reproduces the bicubic (cubic B-spline) resampling imshow applies to the
+    # 2x2 gradient image used by gbar. The two samples sit at a quarter and
+    # three quarters of the bar height and are clamped beyond the edges.
+    import numpy as np
+
+    x = 2 * np.asarray(frac) - 0.5
+    profile = np.zeros_like(x)
+    for k in range(1, 4):
+        t = np.abs(x - k)
+        profile += np.where(t < 1, (4 - 6 * t ** 2 + 3 * t ** 3) / 6,
+                            np.where(t < 2, (2 - t) ** 3 / 6, 0))
+    return profile
+
+
+def gbars(ax, bars, bar_width=3, resolution=1000, aspect='equal'):
+    """Draw many gradient bars as a single composited image.
+
+    The gradients look the same as those drawn by :func:`gbar` but only one
+    image artist is created, no matter how many bars there are.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axis to draw on.
+        bars (list): A list of ``(left, top, bottom, gradient)`` tuples, where
+            gradient is a matplotlib colormap. The gradient starts from the
+            top of the bar.
+        bar_width (float): The width of the bars.
+        resolution (int): The number of pixel rows used to sample the
+            gradients across the full energy range.
+        aspect (str): The aspect ratio of the axis, as used by ``imshow``.
+
+    Returns:
+        The image artist, or None if there are no bars.
+    """
+    if not bars:
+        return None
+
+    x_edges, y_edges, image = gradient_image(bars, bar_width=bar_width,
+                                             resolution=resolution)
+    artist = ax.pcolorfast(x_edges, y_edges, image)
+    ax.set_aspect(aspect)
+    return artist
+
+
+def gradient_image(bars, bar_width=3, resolution=1000):
+    """Composite many gradient bars into one image.
+
+    Args:
+        bars (list): A list of ``(left, top, bottom, gradient)`` tuples, as
+            for :func:`gbars`.
+        bar_width (float): The width of the bars.
+        resolution (int): The number of pixel rows used to sample the
+            gradients across the full energy range.
+
+    Returns:
+        The ``(x_edges, y_edges, image)`` of the image, where the edges are
+        the pixel boundaries in data coordinates and image is an 8-bit RGBA
+        array.
+    """
+    import numpy as np
+    from .gradients import gradient_cache
+
+    lefts = np.array([b[0] for b in bars], dtype=float)
+    tops = np.array([b[1] for b in bars], dtype=float)
+    bottoms = np.array([b[2] for b in bars], dtype=float)
+    rights = lefts + bar_width
+    lows = np.minimum(tops, bottoms)
+    highs = np.maximum(tops, bottoms)
+
+    x_edges = np.unique(np.concatenate([lefts, rights]))
+    y_edges = np.linspace(lows.min(), highs.max(), resolution + 1)
+    row_height = y_edges[1] - y_edges[0]
+    first_cols = np.searchsorted(x_edges, lefts)
+    last_cols = np.searchsorted(x_edges, rights)
+    first_rows = np.searchsorted(y_edges, lows, side='right') - 1
+    last_rows = np.searchsorted(y_edges, highs, side='left')
+
+    # colours are accumulated premultiplied by alpha
+    image = np.zeros((resolution, len(x_edges) - 1, 4))
+    for i, (_, top, bottom, gradient) in enumerate(bars):
+        r0, r1 = max(first_rows[i], 0), min(last_rows[i], resolution)
+        y0, y1 = y_edges[r0:r1], y_edges[r0 + 1:r1 + 1]
+
+        # fraction of each pixel row covered by the bar
+        cover = (np.minimum(y1, highs[i]) - np.maximum(y0, lows[i]))
+        cover = np.clip(cover / row_height, 0, 1)
+        frac = np.clip(((y0 + y1) / 2 - top) / (bottom - top), 0, 1)
+
+        texture = gradient_cache.get_texture(gradient)
+        index = np.rint(frac * (len(texture) - 1)).astype(int)
+        rgba = texture[index]
+        rgba[:, 3] *= cover
+        rgba[:, :3] *= rgba[:, 3:]
+
+        region = image[r0:r1, first_cols[i]:last_cols[i]]
+        region *= 1 - rgba[:, None, 3:]
+        region += rgba[:, None, :]
+
+    alpha = image[..., 3:]
+    np.divide(image[..., :3], alpha, out=image[..., :3], where=alpha > 0)
+
+    # 8-bit images are resampled in 8-bit, which needs far less memory than
+    # float images when very wide figures are saved
+    image = np.round(image * 255).astype(np.uint8)
+    return x_edges, y_edges, image
+
+
+def cbars(ax, bars, bar_width=3):
+    """Draw many solid colour bars as a single patch collection.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axis to draw on.
+        bars (list): A list of ``(left, top, bottom, face_colour)`` tuples.
+        bar_width (float): The width of the bars.
+
+    Returns:
+        The patch collection.
+    """
+    from matplotlib.patches import Rectangle
+    from matplotlib.collections import PatchCollection
+
+    patches = [Rectangle((left, top), bar_width, bottom - top)
+               for left, top, bottom, _ in bars]
+    collection = PatchCollection(patches, facecolors=[b[3] for b in bars],
+                                 edgecolors='none', clip_on=False)
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def bar_edges(ax, bars, bar_width=3):
+    """Draw the borders of many bars using one patch collection per zorder.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axis to draw on.
+        bars (list): A list of ``(left, top, bottom, edge_colour, zorder)``
+            tuples.
+        bar_width (float): The width of the bars.
+
+    Returns:
+        A list of patch collections.
+    """
+    from matplotlib.patches import Rectangle
+    from matplotlib.collections import PatchCollection
+
+    collections = []
+    for zorder in sorted(set(b[4] for b in bars)):
+        layer = [b for b in bars if b[4] == zorder]
+        patches = [Rectangle((left, top), bar_width, bottom - top)
+                   for left, top, bottom, _, _ in layer]
+        collection = PatchCollection(
+            patches, facecolors='none', edgecolors=[b[3] for b in layer],
+            linewidths=_linewidth, clip_on=False, zorder=zorder)
+        ax.add_collection(collection, autolim=False)
+        collections.append(collection)
+    return collections
+
+
+def fadebars(ax, bars, bar_width=3):
+    """Draw many fade overlays using one patch collection per zorder.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axis to draw on.
+        bars (list): A list of ``(left, top, bottom, zorder)`` tuples.
+        bar_width (float): The width of the bars.
+
+    Returns:
+        A list of patch collections.
+    """
+    from matplotlib.patches import Rectangle
+    from matplotlib.collections import PatchCollection
+
+    collections = []
+    for zorder in sorted(set(b[3] for b in bars)):
+        patches = [Rectangle((left, top), bar_width, bottom - top)
+                   for left, top, bottom, z in bars if z == zorder]
+        collection = PatchCollection(patches, facecolors='w', edgecolors='w',
+                                     alpha=0.5, clip_on=False, zorder=zorder)
+        ax.add_collection(collection, autolim=False)
+        collections.append(collection)
+    return collections
+
+
 def dashed_arrow(ax, x, y, dx, dy, colour='k', line_width=_linewidth,
                  start_head=True, end_head=True):
-    length = 0.25
-    width = 0.2
-    ax.plot([x, x + dx], [y, y + dy], c=colour, ls='--', lw=line_width,
-            dashes=(8, 4.3))
+    length = _arrow_head_length
+    width = _arrow_head_width
+    line, = ax.plot([x, x + dx], [y, y + dy], c=colour, ls='--',
+                    lw=line_width, dashes=_arrow_dashes)
+    start = end = None
     if start_head:
-        ax.arrow(x, y + length, 0, -length, head_width=width,
-                 head_length=length, fc=colour, ec=colour, overhang=0.15,
-                 length_includes_head=True, lw=line_width)
+        start = ax.arrow(x, y + length, 0, -length, head_width=width,
+                         head_length=length, fc=colour, ec=colour,
+                         overhang=_arrow_overhang, length_includes_head=True,
+                         lw=line_width)
     if end_head:
-        ax.arrow(x + dx, y + dy - length, 0, length, head_width=width,
-                 head_length=length, fc=colour, ec=colour, overhang=0.15,
-                 length_includes_head=True, lw=line_width)
+        end = ax.arrow(x + dx, y + dy - length, 0, length, head_width=width,
+                       head_length=length, fc=colour, ec=colour,
+                       overhang=_arrow_overhang, length_includes_head=True,
+                       lw=line_width)
+    return line, start, end
+
+
+def draw_layout(layout, plt=None):
+    """Draw a plot layout with matplotlib.
+
+    Args:
+        layout (bapt.layout.Layout): The layout, as returned by
+            :func:`bapt.layout.get_layout`.
+        plt (matplotlib.pyplot): If plt is supplied, the layout is drawn on
+            the existing plot. Otherwise, a new plot will be created.
+
+    Returns:
+        Matplotlib pyplot object containing the plot.
+    """
+    from .profiling import mark
+
+    plt = pretty_plot(width=layout.width, height=layout.height, plt=plt,
+                      fonts=[layout.font])
+    mark('plot:figure')
+    draw_layout_axes(plt.gca(), layout)
+    return plt
+
+
+def draw_layout_axes(ax, layout, resolution=1000):
+    """Draw a plot layout on an existing axes.
+
+    The axes should already be styled, e.g. using :func:`style_axes`, and
+    the rc settings from :func:`get_rc_params` should be in effect.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axes.
+        layout (bapt.layout.Layout): The layout, as returned by
+            :func:`bapt.layout.get_layout`.
+        resolution (int): The number of pixel rows used to sample the
+            gradients, as for :func:`gbars`.
+
+    Returns:
+        A dict of the artists drawn: the bar image or collection
+        (``'bars'``), the lists of border and fade collections (``'edges'``
+        and ``'fades'``), the ``(line, start_head, end_head)`` of each arrow
+        (``'arrows'``) and the label text artists (``'labels'``), in the
+        order of the layout.
+    """
+    from matplotlib.ticker import MaxNLocator, MultipleLocator
+    from .profiling import mark
+
+    # all bars are drawn in bulk before the annotations that sit on top
+    artists = {}
+    bars = layout.bars.tolist()
+    if layout.gradients:
+        artists['bars'] = gbars(
+            ax, [b + [f] for b, f in zip(bars, layout.bar_fills)],
+            bar_width=layout.bar_width, resolution=resolution)
+    else:
+        artists['bars'] = cbars(
+            ax, [b + [f] for b, f in zip(bars, layout.bar_fills)],
+            bar_width=layout.bar_width)
+    artists['edges'] = bar_edges(ax, [b + [c, z] for b, c, z in zip(
+        bars, layout.edge_colours, layout.edge_zorders.tolist())],
+        bar_width=layout.bar_width)
+    mark('plot:bars')
+
+    artists['arrows'] = [
+        dashed_arrow(ax, x, y, dx, dy, colour='k', line_width=_linewidth,
+                     start_head=start_head, end_head=end_head)
+        for (x, y, dx, dy), (start_head, end_head) in zip(
+            layout.arrows.tolist(), layout.arrow_heads.tolist())]
+    artists['labels'] = [
+        ax.text(x, y, text, ha=ha, va=va, size=layout.label_size,
+                color=colour, zorder=zorder)
+        for (x, y, zorder), text, (ha, va, colour) in zip(
+            layout.labels.tolist(), layout.label_text, layout.label_style)]
+    artists['fades'] = fadebars(ax, layout.fades.tolist(),
+                                bar_width=layout.bar_width)
+    mark('plot:labels')
+
+    ax.set_ylim(layout.ylim)
+    ax.set_xlim(layout.xlim)
+    if len(layout.hlines):
+        ax.hlines(layout.hlines, *layout.xlim, colors='#808080', zorder=0,
+                  linewidths=1, linestyles='dotted')
+    ax.set_xticks([])
+
+    label_size = layout.label_size
+    if layout.show_axis:
+        ax.set_ylabel("Energy (eV)", size=label_size)
+        for spine in ax.spines.values():
+            spine.set_zorder(5)
+        if layout.kind == 'vacuum':
+            ax.yaxis.set_major_locator(MaxNLocator(5))
+        else:
+            ax.yaxis.set_major_locator(MultipleLocator(1))
+            ax.tick_params(which='major', width=_linewidth)
+            ax.tick_params(which='minor', right='on')
+            ax.yaxis.set_minor_locator(MultipleLocator(0.5))
+    else:
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        ax.yaxis.set_visible(False)
+
+    ax.set_title(layout.title, size=label_size)
+    ax.set_xlabel(layout.xlabel, size=label_size)
+    mark('plot:axes')
+    return artists
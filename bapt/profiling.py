@@ -0,0 +1,244 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Per-stage timings and artist counts for renders.
+
+A :class:`Profiler` is made active with :func:`profile`. While it is active,
+the plotting functions mark the end of each of their stages, so the time
+taken by each stage and the number of artists created can be reported::
+
+    from bapt.profiling import profile
+
+    with profile() as profiler:
+        data, settings = read_config('config.yaml')
+        profiler.mark('parse')
+        plt = get_alignment_plot(data, **settings)
+        profiler.save(plt.gcf(), 'alignment.png', dpi=400)
+    print(profiler.to_json())
+
+Marking stages is free when no profiler is active.
+"""
+
+import io
+import os
+import json
+import time
+import threading
+import contextlib
+
+_local = threading.local()
+
+
+def mark(stage):
+    """Mark the end of a stage in the active profiler, if any.
+
+    Args:
+        stage (str): The stage name.
+    """
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is not None:
+        profiler.mark(stage)
+
+
+@contextlib.contextmanager
+def profile(profiler=None):
+    """Activate a profiler in the current thread.
+
+    Args:
+        profiler (Profiler): The profiler. Defaults to a new profiler.
+
+    Yields:
+        The active profiler.
+    """
+    profiler = profiler if profiler else Profiler()
+    previous = getattr(_local, 'profiler', None)
+    _local.profiler = profiler
+    profiler.restart()
+    try:
+        yield profiler
+    finally:
+        _local.profiler = previous
+
+
+def count_artists(fig):
+    """Count the artists in a figure by type.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure.
+
+    Returns:
+        A dict of the number of images, patches, arrows, collections (and
+        the paths they contain), lines and texts. Empty texts, such as
+        unused titles, are not counted.
+    """
+    from matplotlib.collections import Collection
+    from matplotlib.image import _ImageBase
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import FancyArrow, Patch
+    from matplotlib.text import Text
+
+    counts = dict((k, 0) for k in ('images', 'patches', 'arrows',
+                                   'collections', 'collection_paths',
+                                   'lines', 'texts'))
+    for ax in fig.axes:
+        for artist in ax.get_children():
+            if artist is ax.patch or not artist.get_visible():
+                continue
+            if isinstance(artist, _ImageBase):
+                counts['images'] += 1
+            elif isinstance(artist, FancyArrow):
+                counts['arrows'] += 1
+            elif isinstance(artist, Patch) and artist not in \
+                    ax.spines.values():
+                counts['patches'] += 1
+            elif isinstance(artist, Collection):
+                counts['collections'] += 1
+                counts['collection_paths'] += len(artist.get_paths())
+            elif isinstance(artist, Line2D):
+                counts['lines'] += 1
+            elif isinstance(artist, Text) and artist.get_text():
+                counts['texts'] += 1
+        for axis in (ax.xaxis, ax.yaxis):
+            if axis.get_visible() and axis.label.get_text():
+                counts['texts'] += 1
+    counts['total'] = sum(v for k, v in counts.items()
+                          if k != 'collection_paths')
+    return counts
+
+
+class Profiler(object):
+    """Records the time taken by each stage of a render.
+
+    Stages are recorded as the time since the previous mark, so consecutive
+    stages cover the whole render without gaps. Repeated stages are summed.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.artists = {}
+        self.outputs = {}
+        self.info = {}
+        self._bbox = self._bbox_figure = None
+        self._last = time.time()
+
+    def restart(self, start=None):
+        """Start timing the next stage from now.
+
+        Args:
+            start (float): Start from this time instead, as returned by
+                :func:`time.time`.
+        """
+        self._last = time.time() if start is None else start
+
+    def mark(self, stage):
+        """Mark the end of a stage.
+
+        Args:
+            stage (str): The stage name.
+        """
+        now = time.time()
+        self.stages[stage] = self.stages.get(stage, 0.) + now - self._last
+        self._last = now
+
+    def count_artists(self, fig):
+        """Record the number of artists in a figure.
+
+        Args:
+            fig (matplotlib.figure.Figure): The figure.
+        """
+        self.artists = count_artists(fig)
+
+    def save(self, fig, output, dpi=400, fmt=None, pad_inches=0.1):
+        """Save a figure, timing the layout and rendering separately.
+
+        The output is the same as ``savefig(..., bbox_inches='tight')``. The
+        tight bounding box is computed once per figure and dpi (the
+        ``layout`` stage) and then used to render the figure (the
+        ``render:<format>`` stage). The artists in the figure are also
+        counted.
+
+        Args:
+            fig (matplotlib.figure.Figure): The figure.
+            output (str or file): The output file name or a file object.
+            dpi (int): Dots-per-inch for raster output.
+            fmt (str): The output format. Defaults to the file extension.
+            pad_inches (float): The padding around the figure in inches.
+        """
+        from .export import get_tight_bbox
+
+        fmt = fmt if fmt else os.path.splitext(output)[1][1:].lower()
+        if self._bbox_figure != (fig, dpi):
+            self._bbox = get_tight_bbox(fig, dpi=dpi, pad_inches=pad_inches)
+            self._bbox_figure = (fig, dpi)
+            self.mark('layout')
+
+        fig.savefig(output, format=fmt, dpi=dpi, bbox_inches=self._bbox)
+        self.mark('render:{}'.format(fmt))
+
+        if isinstance(output, io.BytesIO):
+            size = len(output.getvalue())
+        else:
+            size = os.path.getsize(output)
+        self.outputs[fmt] = {'dpi': dpi, 'bytes': size}
+        if not self.artists:
+            self.count_artists(fig)
+        self.restart()  # don't count the time spent profiling
+
+    def to_dict(self):
+        """Get the profile as a dict.
+
+        Returns:
+            A dict of the stage timings in seconds, the total time, the
+            artist counts, the output formats and sizes, and any extra
+            information in :attr:`info`.
+        """
+        import matplotlib
+        from . import __version__
+
+        profile = {'bapt': __version__, 'matplotlib': matplotlib.__version__,
+                   'backend': matplotlib.get_backend()}
+        profile.update(self.info)
+        profile.update({'stages': dict(self.stages),
+                        'total': sum(self.stages.values()),
+                        'artists': dict(self.artists),
+                        'outputs': dict(self.outputs)})
+        return profile
+
+    def to_json(self):
+        """Get the profile as a JSON string.
+
+        Returns:
+            The profile, as returned by :meth:`to_dict`, in JSON.
+        """
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+
+def profile_render(data, formats=('png', 'pdf', 'svg'), dpi=400, **kwargs):
+    """Profile plotting compounds and rendering them in several formats.
+
+    The figure is plotted and laid out once and then rendered to memory in
+    each format, so the rendering cost of each format can be compared.
+
+    Args:
+        data (list): A list of compound dicts.
+        formats (list): The output formats to render.
+        dpi (int): Dots-per-inch for raster output.
+        **kwargs: Plotting options passed to the plotting function.
+
+    Returns:
+        The profile as a dict, as returned by :meth:`Profiler.to_dict`.
+    """
+    from . import get_alignment_plot
+
+    with profile() as profiler:
+        profiler.info['compounds'] = len(data)
+        plt = get_alignment_plot(data, **kwargs)
+        fig = plt.gcf()
+        try:
+            for fmt in formats:
+                profiler.save(fig, io.BytesIO(), dpi=dpi, fmt=fmt)
+        finally:
+            plt.close(fig)
+    return profiler.to_dict()
@@ -0,0 +1,311 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Screening of heterojunctions between every pair of compounds.
+
+Plots only show the offsets between neighbouring compounds. For screening,
+the valence and conduction band offsets of every ordered pair of compounds,
+and the type of alignment they form, are computed as ``N x N`` matrices with
+NumPy broadcasting. The matrices are computed in blocks of rows, so memory
+stays bounded for thousands of compounds::
+
+    pairs = screen_pairs(data, kind='staggered', min_cbo=0.3, top=20)
+    groups = get_pair_groups(data, pairs)
+
+The offsets of a pair ``(a, b)`` are the band edges of ``b`` less those of
+``a``, as in the plots. The alignment types are:
+
+- ``'straddling'`` (type I): the band gap of one compound lies within that
+  of the other.
+- ``'staggered'`` (type II): the band gaps overlap, but the band edges of
+  one compound are both above those of the other.
+- ``'broken'`` (type III): the band gaps do not overlap.
+"""
+
+alignment_types = ('straddling', 'staggered', 'broken')
+_type_aliases = {'i': 0, 'type-i': 0, 'ii': 1, 'type-ii': 1, 'iii': 2,
+                 'type-iii': 2, 'broken-gap': 2}
+
+# the number of matrix elements computed at once
+default_chunk_size = 2 ** 20
+
+
+def get_alignment_type(kind):
+    """Get the index of an alignment type in :data:`alignment_types`.
+
+    Args:
+        kind (str): The alignment type, e.g. ``'staggered'``, ``'II'`` or
+            ``'type-II'``.
+
+    Returns:
+        The index of the type.
+    """
+    key = str(kind).strip().lower()
+    if key in alignment_types:
+        return alignment_types.index(key)
+    if key in _type_aliases:
+        return _type_aliases[key]
+    raise ValueError('unknown alignment type: {}'.format(kind))
+
+
+def get_band_edges(data):
+    """Get the energies of the band edges of each compound.
+
+    Args:
+        data (list): A list of compound dicts, aligned to the vacuum level
+            (``ip`` and ``ea``) or by their offsets (``vbo`` and
+            ``band_gap``, as filled in by :func:`bapt.add_band_offsets`).
+
+    Returns:
+        The valence and conduction band edges as a tuple of ``(vb, cb)``
+        arrays.
+    """
+    import numpy as np
+
+    if not data:
+        raise ValueError('there are no compounds to screen')
+    if 'vbo' in data[0]:
+        vb = np.array([d['vbo'] for d in data], dtype=float)
+        cb = vb + np.array([d['band_gap'] for d in data], dtype=float)
+    else:
+        vb = -np.array([d['ip'] for d in data], dtype=float)
+        cb = -np.array([d['ea'] for d in data], dtype=float)
+    return vb, cb
+
+
+def get_offset_block(vb, cb, start=0, stop=None):
+    """Get the offsets and alignment types of a block of rows.
+
+    Args:
+        vb (numpy.ndarray): The valence band edge of each compound.
+        cb (numpy.ndarray): The conduction band edge of each compound.
+        start (int): The first row, i.e. first compound ``a`` of the pairs.
+        stop (int): The row after the last. Defaults to the last compound.
+
+    Returns:
+        The ``(vbo, cbo, types)`` matrices of the pairs ``(a, b)``, with one
+        row for each compound ``a`` and one column for each compound ``b``.
+        The types are indices into :data:`alignment_types`.
+    """
+    return _get_offsets(vb[start:stop, None], cb[start:stop, None],
+                        vb[None, :], cb[None, :])
+
+
+def _get_offsets(vb_a, cb_a, vb_b, cb_b):
+    import numpy as np
+
+    vbo = vb_b - vb_a
+    cbo = cb_b - cb_a
+
+    # one gap lies within the other when the band edges move in opposite
+    # directions, and the gaps don't overlap when either valence band is
+    # above the other conduction band
+    types = (vbo * cbo > 0).view(np.int8)
+    types[(vb_b >= cb_a) | (vb_a >= cb_b)] = 2
+    return vbo, cbo, types
+
+
+def iter_offset_blocks(vb, cb, chunk_size=default_chunk_size):
+    """Iterate over the offset matrices in blocks of rows.
+
+    Args:
+        vb (numpy.ndarray): The valence band edge of each compound.
+        cb (numpy.ndarray): The conduction band edge of each compound.
+        chunk_size (int): The number of matrix elements in each block.
+
+    Yields:
+        The ``(start, vbo, cbo, types)`` of each block, where start is the
+        index of its first row. See :func:`get_offset_block`.
+    """
+    rows = max(chunk_size // max(len(vb), 1), 1)
+    for start in range(0, len(vb), rows):
+        yield (start,) + get_offset_block(vb, cb, start, start + rows)
+
+
+def get_offset_matrices(data):
+    """Get the band offsets and alignment types of every pair of compounds.
+
+    The full matrices are held in memory. Use :func:`iter_offset_blocks` or
+    :func:`save_offset_matrix` for thousands of compounds.
+
+    Args:
+        data (list): A list of compound dicts.
+
+    Returns:
+        The ``(vbo, cbo, types)`` matrices. See :func:`get_offset_block`.
+    """
+    return get_offset_block(*get_band_edges(data))
+
+
+def screen_pairs(data, kind=None, min_vbo=None, max_vbo=None, min_cbo=None,
+                 max_cbo=None, top=None, sort_by='cbo', ascending=False,
+                 ordered=True, chunk_size=default_chunk_size):
+    """Find the pairs of compounds that match a query.
+
+    Args:
+        data (list): A list of compound dicts.
+        kind (str): Only include pairs with this alignment type, e.g.
+            ``'staggered'`` or ``'II'``.
+        min_vbo (float): The minimum valence band offset.
+        max_vbo (float): The maximum valence band offset.
+        min_cbo (float): The minimum conduction band offset.
+        max_cbo (float): The maximum conduction band offset.
+        top (int): Only return this many pairs, with the largest (or, if
+            ``ascending``, smallest) ``sort_by`` offsets.
+        sort_by (str): The offset to sort the pairs by, ``'vbo'`` or
+            ``'cbo'``.
+        ascending (bool): Sort from the smallest offset.
+        ordered (bool): Include both ``(a, b)`` and ``(b, a)``, whose offsets
+            have opposite signs. Otherwise only pairs with ``a`` before ``b``
+            are included.
+        chunk_size (int): The number of pairs screened at once.
+
+    Returns:
+        A list of pair dicts, with the indices (``i`` and ``j``) and names
+        (``a`` and ``b``) of the compounds, their ``vbo`` and ``cbo``, and the
+        alignment ``type``, sorted by ``sort_by``.
+    """
+    import numpy as np
+
+    if sort_by not in ('vbo', 'cbo'):
+        raise ValueError('pairs can only be sorted by vbo or cbo')
+    type_index = None if kind is None else get_alignment_type(kind)
+    sign = 1. if ascending else -1.
+
+    vb, cb = get_band_edges(data)
+    rows, columns, keys = [], [], []
+    bound = None
+    for start, vbo, cbo, types in iter_offset_blocks(vb, cb,
+                                                     chunk_size=chunk_size):
+        i = np.arange(start, start + len(vbo))[:, None]
+        j = np.arange(len(vb))[None, :]
+        mask = (j != i) if ordered else (j > i)
+        if type_index is not None:
+            mask &= types == type_index
+        for values, low, high in ((vbo, min_vbo, max_vbo),
+                                  (cbo, min_cbo, max_cbo)):
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        block_keys = sign * (vbo if sort_by == 'vbo' else cbo)
+        if bound is not None:
+            mask &= block_keys <= bound
+
+        block_rows, block_columns = np.nonzero(mask)
+        rows.append(block_rows + start)
+        columns.append(block_columns)
+        keys.append(block_keys[mask])
+
+        # only the best pairs found so far are kept when a number of pairs
+        # is requested, and later pairs must be at least as good as these
+        if top is not None and sum(len(k) for k in keys) > top:
+            rows, columns, keys = [np.concatenate(a) for a in
+                                   (rows, columns, keys)]
+            best = np.argpartition(keys, top)[:top]
+            rows, columns, keys = [[a[best]] for a in (rows, columns, keys)]
+            bound = keys[0].max() if top else -np.inf
+
+    rows, columns, keys = [np.concatenate(a) if a else np.zeros(0, dtype=int)
+                           for a in (rows, columns, keys)]
+    order = np.lexsort((columns, rows, keys))
+    rows, columns = rows[order], columns[order]
+    vbo, cbo, types = _get_offsets(vb[rows], cb[rows], vb[columns],
+                                   cb[columns])
+    return [{'i': i, 'j': j, 'a': data[i].get('name', ''),
+             'b': data[j].get('name', ''), 'vbo': pair_vbo, 'cbo': pair_cbo,
+             'type': alignment_types[pair_type]}
+            for i, j, pair_vbo, pair_cbo, pair_type in zip(
+                rows.tolist(), columns.tolist(), vbo.tolist(), cbo.tolist(),
+                types.tolist())]
+
+
+def get_pair_groups(data, pairs):
+    """Get the compounds of each pair, for plotting.
+
+    Each pair can be drawn as a panel of a :class:`bapt.grid.AlignmentGrid`,
+    which then shows the offsets between the two compounds.
+
+    Args:
+        data (list): A list of compound dicts.
+        pairs (list): A list of pair dicts, as returned by
+            :func:`screen_pairs`.
+
+    Returns:
+        A list of ``(group, data)`` tuples, one per pair, where group is the
+        name of the pair.
+    """
+    return [(u'{} / {}'.format(pair['a'], pair['b']),
+             [dict(data[pair['i']]), dict(data[pair['j']])])
+            for pair in pairs]
+
+
+def save_pairs(pairs, filename):
+    """Write pairs of compounds as a CSV table.
+
+    Args:
+        pairs (list): A list of pair dicts, as returned by
+            :func:`screen_pairs`.
+        filename (str): The output file name.
+    """
+    import csv
+
+    with open(filename, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['a', 'b', 'vbo', 'cbo', 'type'])
+        for pair in pairs:
+            writer.writerow([pair['a'], pair['b'], '{:.4f}'.format(
+                pair['vbo']), '{:.4f}'.format(pair['cbo']), pair['type']])
+
+
+def save_offset_matrix(data, filename, quantity='cbo',
+                       chunk_size=default_chunk_size):
+    """Write the matrix of an offset or the alignment types of every pair.
+
+    The matrix is written block by block, so it is never held in memory as
+    a whole. Row ``a`` and column ``b`` hold the value for the pair ``(a,
+    b)``.
+
+    Args:
+        data (list): A list of compound dicts.
+        filename (str): The output file name. NumPy ``.npy`` files are
+            written as binary arrays, and any other file as a CSV table with
+            the compound names in the first row and column.
+        quantity (str): ``'vbo'``, ``'cbo'`` or ``'type'``. Types are written
+            as indices into :data:`alignment_types` in ``.npy`` files and as
+            names in CSV files.
+        chunk_size (int): The number of matrix elements computed at once.
+    """
+    import csv
+    import numpy as np
+
+    quantities = ('vbo', 'cbo', 'type')
+    if quantity not in quantities:
+        raise ValueError('unknown quantity: {}'.format(quantity))
+    index = quantities.index(quantity)
+
+    vb, cb = get_band_edges(data)
+    blocks = iter_offset_blocks(vb, cb, chunk_size=chunk_size)
+    if filename.lower().endswith('.npy'):
+        matrix = np.lib.format.open_memmap(
+            filename, mode='w+', shape=(len(vb), len(vb)),
+            dtype=np.int8 if quantity == 'type' else float)
+        for block in blocks:
+            matrix[block[0]:block[0] + len(block[1])] = block[index + 1]
+        matrix.flush()
+        del matrix
+        return
+
+    names = [d.get('name', '') for d in data]
+    with open(filename, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow([''] + names)
+        for block in blocks:
+            for name, row in zip(names[block[0]:], block[index + 1].tolist()):
+                if quantity == 'type':
+                    row = [alignment_types[t] for t in row]
+                else:
+                    row = ['{:.4f}'.format(v) for v in row]
+                writer.writerow([name] + row)
@@ -0,0 +1,348 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+A local HTTP server that renders band alignment figures from JSON.
+
+The server accepts POST requests to ``/render`` with a JSON body in the same
+format as a config file::
+
+    {"compounds": [{"name": "ZnO", "ip": 7.7, "ea": 4.4}, ...],
+     "gradients": [...], "settings": {"show_ea": true},
+     "format": "png", "dpi": 400}
+
+and returns the figure. Requests are rendered by a bounded pool of worker
+processes that keep matplotlib loaded. Statistics are available from
+``/stats``.
+"""
+
+import os
+import json
+import time
+import threading
+import collections
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing import Pool, TimeoutError, cpu_count
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+content_types = {'png': 'image/png', 'svg': 'image/svg+xml',
+                 'pdf': 'application/pdf'}
+
+# the default limits on the dpi and the width and height (in inches) of the
+# figures requested
+default_max_dpi = 600
+default_max_size = 50
+
+
+def render_bytes(config, fmt='png', dpi=400):
+    """Render a config to an image in memory.
+
+    Args:
+        config (dict): The config, with ``compounds`` and optionally
+            ``gradients`` and ``settings`` keys.
+        fmt (str): The image format.
+        dpi (int): Dots-per-inch for raster output.
+
+    Returns:
+        The image as bytes.
+    """
+    from . import parse_config, add_band_offsets
+    from .figure import render_alignment
+
+    data, settings = parse_config(config)
+    add_band_offsets(data)
+    return render_alignment(data, fmt=fmt, dpi=dpi, **settings)
+
+
+def _render_request(job):
+    config, fmt, dpi = job
+    try:
+        return render_bytes(config, fmt=fmt, dpi=dpi), None
+    except Exception as e:
+        return None, '{}: {}'.format(type(e).__name__, e)
+
+
+class ServerBusy(Exception):
+    """Raised when too many requests are already waiting to be rendered."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a figure is not rendered within the request timeout."""
+
+
+class RenderError(Exception):
+    """Raised when the figure could not be rendered from the request."""
+
+
+class RenderService(object):
+    """A bounded pool of warm worker processes for rendering figures.
+
+    Args:
+        processes (int): Number of worker processes. Defaults to the number
+            of cores.
+        timeout (float): Maximum time to wait for a figure, in seconds.
+        max_pending (int): Maximum number of requests being rendered or
+            waiting for a worker. Further requests are rejected. Defaults to
+            four per worker. Requests that time out count towards this
+            until their worker has finished with them.
+        max_dpi (float): Maximum dpi of the figures. Larger requests are
+            rendered at this dpi.
+        max_size (float): Maximum width and height of the figures in inches.
+            Larger requests are rendered at this size.
+    """
+
+    def __init__(self, processes=None, timeout=30, max_pending=None,
+                 max_dpi=default_max_dpi, max_size=default_max_size):
+        from .batch import _init_worker
+
+        self.processes = processes if processes else cpu_count()
+        self.timeout = timeout
+        self.max_pending = max_pending if max_pending else 4 * self.processes
+        self.max_dpi = max_dpi
+        self.max_size = max_size
+        self._pool = Pool(self.processes, initializer=_init_worker)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+        self._lock = threading.Lock()
+        self._start_time = time.time()
+        self._latencies = collections.deque(maxlen=1000)
+        self._counts = collections.Counter()
+        self._in_flight = 0
+
+    def render(self, config, fmt='png', dpi=400):
+        """Render a config using the worker pool.
+
+        The dpi and figure size are limited to ``max_dpi`` and
+        ``max_size``.
+
+        Args:
+            config (dict): The config to render.
+            fmt (str): The image format.
+            dpi (int): Dots-per-inch for raster output.
+
+        Returns:
+            The image as bytes.
+        """
+        config, dpi = self._limit(config, dpi)
+        if not self._slots.acquire(False):
+            self._count('rejected')
+            raise ServerBusy('{} requests already pending'.format(
+                self.max_pending))
+
+        start = time.time()
+        with self._lock:
+            self._in_flight += 1
+
+        def release(_):
+            # the slot is held until the worker is done with the request,
+            # even if it has timed out, so that stuck renders still count
+            # towards max_pending
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        try:
+            result = self._pool.apply_async(
+                _render_request, ((config, fmt, dpi),), callback=release,
+                error_callback=release)
+        except Exception:
+            release(None)
+            raise
+
+        try:
+            image, error = result.get(self.timeout)
+        except TimeoutError:
+            self._count('timed_out')
+            raise RenderTimeout('rendering took longer than {} s'.format(
+                self.timeout))
+
+        if error:
+            self._count('failed')
+            raise RenderError(error)
+
+        with self._lock:
+            self._counts['completed'] += 1
+            self._latencies.append(time.time() - start)
+        return image
+
+    def _limit(self, config, dpi):
+        # clamps the dpi and the width and height of the figure, which
+        # otherwise defaults to a width that grows with the compounds
+        from .layout import _default_width
+
+        dpi = float(dpi)
+        if dpi <= 0:
+            raise ValueError('dpi must be positive')
+        settings = dict(config.get('settings') or {})
+        width = settings.get('width') or _default_width(
+            len(config['compounds']), settings.get('bar_width', 3),
+            settings.get('gap', 0.5))
+        settings['width'] = min(float(width), self.max_size)
+        settings['height'] = min(float(settings.get('height', 5)),
+                                 self.max_size)
+        return dict(config, settings=settings), min(dpi, self.max_dpi)
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        """Get the latency and throughput statistics.
+
+        Returns:
+            A dict of statistics. Latencies are in seconds and are computed
+            over the last 1000 completed requests.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self._counts)
+            in_flight = self._in_flight
+        uptime = time.time() - self._start_time
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1,
+                                 int(p / 100. * len(latencies)))]
+
+        completed = counts.get('completed', 0)
+        return {'uptime': uptime, 'processes': self.processes,
+                'max_pending': self.max_pending, 'in_flight': in_flight,
+                'completed': completed, 'failed': counts.get('failed', 0),
+                'rejected': counts.get('rejected', 0),
+                'timed_out': counts.get('timed_out', 0),
+                'throughput': completed / uptime if uptime else 0.,
+                'latency': {
+                    'mean': (sum(latencies) / len(latencies)
+                             if latencies else None),
+                    'p50': percentile(50), 'p95': percentile(95),
+                    'p99': percentile(99)}}
+
+    def close(self):
+        """Stop the worker processes."""
+        self._pool.terminate()
+        self._pool.join()
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Handles requests to the render server."""
+
+    max_body_size = 64 * 1024 * 1024
+
+    def address_string(self):
+        # unix socket connections don't have a client address
+        return self.client_address[0] if self.client_address else 'local'
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/stats':
+            self._send_json(200, self.server.service.stats())
+        elif path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/render':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > self.max_body_size:
+                self._send_json(413, {'error': 'request too large'})
+                return
+            config = json.loads(self.rfile.read(length).decode('utf-8'))
+            fmt = str(config.pop('format', 'png')).lower()
+            dpi = float(config.pop('dpi', 400))
+            if fmt not in content_types:
+                raise ValueError('unsupported format: {}'.format(fmt))
+            if 'compounds' not in config or not config['compounds']:
+                raise ValueError('no compounds specified')
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        service = self.server.service
+        try:
+            image = service.render(config, fmt=fmt, dpi=dpi)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+        except ServerBusy as e:
+            self._send_json(503, {'error': str(e)},
+                            headers={'Retry-After': '1'})
+        except RenderTimeout as e:
+            self._send_json(504, {'error': str(e)})
+        except RenderError as e:
+            self._send_json(422, {'error': str(e)})
+        else:
+            self._send(200, image, content_types[fmt])
+
+    def _send_json(self, code, obj, headers=None):
+        self._send(code, json.dumps(obj).encode('utf-8'), 'application/json',
+                   headers=headers)
+
+    def _send(self, code, body, content_type, headers=None):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def serve(host='127.0.0.1', port=8000, socket_path=None, processes=None,
+          timeout=30, max_pending=None, max_dpi=default_max_dpi,
+          max_size=default_max_size):
+    """Run the render server until interrupted.
+
+    Args:
+        host (str): The address to listen on. Defaults to localhost only.
+        port (int): The port to listen on.
+        socket_path (str): Listen on this unix socket instead of a port.
+        processes (int): Number of worker processes.
+        timeout (float): Maximum time to render a figure, in seconds.
+        max_pending (int): Maximum number of pending requests.
+        max_dpi (float): Maximum dpi of the figures.
+        max_size (float): Maximum width and height of the figures in inches.
+    """
+    service = RenderService(processes=processes, timeout=timeout,
+                            max_pending=max_pending, max_dpi=max_dpi,
+                            max_size=max_size)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _ThreadingUnixHTTPServer(socket_path, RenderRequestHandler)
+        address = socket_path
+    else:
+        server = _ThreadingHTTPServer((host, port), RenderRequestHandler)
+        address = 'http://{}:{}'.format(host, server.server_port)
+    server.service = service
+
+    print("Serving band alignment plots on {} (Ctrl-C to stop).".format(
+        address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,461 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Write flat (no gradient) band alignment plots directly as SVG.
+
+Without gradients a plot is only made up of rectangles, dashed arrows, lines
+and text, so it can be written without building a matplotlib figure. The
+geometry is the same as that of :func:`bapt.get_plot` and
+:func:`bapt.get_plot_novac` saved with ``bbox_inches='tight'``: the ticks and
+the extents of the figure are taken from the layout, as they are when the
+plot is drawn by matplotlib. Labels are written as SVG text, rather than
+glyph outlines, and are aligned using the font metrics.
+"""
+
+import re
+
+from xml.sax.saxutils import escape, quoteattr
+
+from .layout import (get_extents, subplot as _subplot, _get_yticks,
+                     _get_minor_yticks)
+from .plotting import (default_fonts, _linewidth, _ticksize, _ticklabelsize,
+                       _text_metrics, _arrow_head_length, _arrow_head_width,
+                       _arrow_overhang, _arrow_dashes)
+
+# the padding of labels and titles in points
+_pad_inches = 0.1
+_title_pad = 6.
+_label_pad = 4.
+_tick_pad = 4.
+
+_dotted = (1., 1.65)
+
+
+def _f(value):
+    # compact number formatting for the svg attributes
+    text = ('%.3f' % value).rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+def _math_to_tspans(string):
+    # renders the simple mathtext used in labels (super- and subscripts)
+    parts = string.split('$')
+    if len(parts) < 3:
+        return escape(string.replace(r'\$', '$'))
+
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            out.append(escape(part))
+            continue
+        for token in re.findall(r'[\^_](?:\{[^}]*\}|.)|[^\^_]+', part):
+            if token[0] in '^_':
+                shift = 'super' if token[0] == '^' else 'sub'
+                text = token[1:].strip('{}')
+                out.append('<tspan baseline-shift="{}" font-size="70%">{}'
+                           '</tspan>'.format(shift, escape(text)))
+            else:
+                out.append(escape(token))
+    return ''.join(out)
+
+
+class SVGFigure(object):
+    """A figure with a single set of axes that is written as SVG.
+
+    Elements are positioned in data coordinates, which are mapped to points
+    using the default matplotlib axes layout. All coordinates in the output
+    are in points, with y increasing downwards.
+
+    Args:
+        width (float): Width of the figure in inches.
+        height (float): Height of the figure in inches.
+        xlim (tuple): The ``(xmin, xmax)`` data limits of the axes.
+        ylim (tuple): The ``(ymin, ymax)`` data limits of the axes.
+        fonts (list): A list of preferred fonts.
+    """
+
+    def __init__(self, width, height, xlim, ylim, fonts=None):
+        self.width = width * 72.
+        self.height = height * 72.
+        self.xlim = xlim
+        self.ylim = ylim
+        self.fonts = fonts if fonts else default_fonts
+        self.axes = (_subplot['left'] * self.width,
+                     (1 - _subplot['top']) * self.height,
+                     _subplot['right'] * self.width,
+                     (1 - _subplot['bottom']) * self.height)
+        self._elements = []
+        self._measure_fonts = self.fonts + ['sans-serif']
+
+    def transform(self, x, y):
+        """Convert data coordinates to points.
+
+        Args:
+            x (float): The x coordinate.
+            y (float): The y coordinate.
+
+        Returns:
+            The position in the figure as an ``(x, y)`` tuple of points.
+        """
+        left, top, right, bottom = self.axes
+        return (left + (x - self.xlim[0]) * (right - left) /
+                (self.xlim[1] - self.xlim[0]),
+                bottom - (y - self.ylim[0]) * (bottom - top) /
+                (self.ylim[1] - self.ylim[0]))
+
+    def _add(self, zorder, element):
+        self._elements.append((zorder, len(self._elements), element))
+
+    def rect(self, left, top, width, bottom, fill='none', edge='none',
+             line_width=_linewidth, alpha=None, zorder=1, join='round'):
+        """Add a rectangle, given in data coordinates.
+
+        Args:
+            left (float): The left of the rectangle.
+            top (float): The top of the rectangle.
+            width (float): The width of the rectangle.
+            bottom (float): The bottom of the rectangle.
+            fill (str): The fill colour.
+            edge (str): The edge colour.
+            line_width (float): The edge width in points.
+            alpha (float): The opacity of the fill and edge.
+            zorder (float): The drawing order.
+            join (str): The SVG line join style of the edge.
+        """
+        x0, y0 = self.transform(left, top)
+        x1, y1 = self.transform(left + width, bottom)
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        attrs = 'fill={}'.format(quoteattr(_colour(fill)))
+        if edge != 'none':
+            attrs += (' stroke={} stroke-width="{}" '
+                      'stroke-linejoin="{}"'.format(
+                          quoteattr(_colour(edge)), _f(line_width), join))
+        if alpha is not None:
+            # like matplotlib, the fill and edge are made transparent
+            # separately rather than as a group
+            attrs += ' fill-opacity="{0}" stroke-opacity="{0}"'.format(
+                _f(alpha))
+        self._add(zorder, '<rect x="{}" y="{}" width="{}" height="{}" '
+                          '{}/>'.format(_f(x0), _f(y0), _f(x1 - x0),
+                                        _f(y1 - y0), attrs))
+
+    def line(self, xs, ys, colour='k', line_width=_linewidth, dashes=None,
+             zorder=2):
+        """Add a line, given in data coordinates, clipped to the axes.
+
+        Args:
+            xs (list): The x coordinates.
+            ys (list): The y coordinates.
+            colour (str): The line colour.
+            line_width (float): The line width in points.
+            dashes (tuple): The dash pattern in points. Defaults to solid.
+            zorder (float): The drawing order.
+        """
+        points = ' '.join('{},{}'.format(*map(_f, self.transform(x, y)))
+                          for x, y in zip(xs, ys))
+        attrs = ''
+        if dashes:
+            attrs = ' stroke-dasharray="{}"'.format(
+                ','.join(_f(d * line_width) for d in dashes))
+        self._add(zorder, '<polyline points="{}" fill="none" stroke={} '
+                          'stroke-width="{}"{} '
+                          'clip-path="url(#axes)"/>'.format(
+                              points, quoteattr(_colour(colour)),
+                              _f(line_width), attrs))
+
+    def polygon(self, xs, ys, colour='k', line_width=_linewidth, zorder=1):
+        """Add a filled polygon in data coordinates, clipped to the axes.
+
+        Args:
+            xs (list): The x coordinates.
+            ys (list): The y coordinates.
+            colour (str): The fill and edge colour.
+            line_width (float): The edge width in points.
+            zorder (float): The drawing order.
+        """
+        points = ' '.join('{},{}'.format(*map(_f, self.transform(x, y)))
+                          for x, y in zip(xs, ys))
+        colour = quoteattr(_colour(colour))
+        self._add(zorder, '<polygon points="{}" fill={} stroke={} '
+                          'stroke-width="{}" clip-path="url(#axes)"/>'.format(
+                              points, colour, colour, _f(line_width)))
+
+    def text(self, x, y, string, size, colour='k', ha='left', va='baseline',
+             zorder=3, rotation=0, data=True):
+        """Add a single line of text.
+
+        Text is aligned like matplotlib text, with ``rotation_mode='anchor'``
+        for rotated text.
+
+        Args:
+            x (float): The x position of the anchor.
+            y (float): The y position of the anchor.
+            string (str): The text, which can contain simple mathtext.
+            size (float): The font size in points.
+            colour (str): The text colour.
+            ha (str): The horizontal alignment.
+            va (str): The vertical alignment. One of ``'top'``,
+                ``'bottom'``, ``'center'``, ``'baseline'`` and
+                ``'center_baseline'``.
+            zorder (float): The drawing order.
+            rotation (float): The counter-clockwise rotation in degrees,
+                either 0 or 90.
+            data (bool): Whether the anchor is in data coordinates, otherwise
+                it is in points.
+
+        Returns:
+            The extent of the text as a ``(left, top, right, bottom)`` tuple
+            in points.
+        """
+        if data:
+            x, y = self.transform(x, y)
+        width, ascent, descent = _text_metrics([string], size,
+                                               fonts=self._measure_fonts)[0]
+        baseline = {'top': ascent, 'bottom': -descent,
+                    'center': (ascent - descent) / 2., 'baseline': 0,
+                    'center_baseline': ascent / 2.}[va]
+        start = {'left': 0, 'center': -width / 2., 'right': -width}[ha]
+        anchor = {'left': 'start', 'center': 'middle', 'right': 'end'}[ha]
+
+        if rotation:
+            attrs = ' transform="rotate(-90 {} {})"'.format(_f(x), _f(y))
+            extent = (x + baseline - ascent, y - start - width,
+                      x + baseline + descent, y - start)
+        else:
+            attrs = ''
+            extent = (x + start, y + baseline - ascent, x + start + width,
+                      y + baseline + descent)
+
+        self._add(zorder, '<text x="{}" y="{}" font-size="{}" fill={} '
+                          'text-anchor="{}"{}>{}</text>'.format(
+                              _f(x), _f(y + baseline), _f(size),
+                              quoteattr(_colour(colour)), anchor, attrs,
+                              _math_to_tspans(string)))
+        return extent
+
+    def to_string(self, extents=None):
+        """Write the figure as SVG.
+
+        Args:
+            extents (tuple): The ``(left, top, right, bottom)`` of the area of
+                the figure to write, in points. Defaults to the whole figure.
+
+        Returns:
+            The SVG document as a string.
+        """
+        x0, y0, x1, y1 = extents if extents else (0, 0, self.width,
+                                                   self.height)
+        width, height = x1 - x0, y1 - y0
+
+        left, top, right, bottom = self.axes
+        fonts = ', '.join("'{}'".format(f) for f in self.fonts)
+        lines = [
+            '<?xml version="1.0" encoding="utf-8" standalone="no"?>',
+            '<svg xmlns="http://www.w3.org/2000/svg" width="{0}pt" '
+            'height="{1}pt" viewBox="{2} {3} {0} {1}" version="1.1">'.format(
+                _f(width), _f(height), _f(x0), _f(y0)),
+            '<defs><clipPath id="axes"><rect x="{}" y="{}" width="{}" '
+            'height="{}"/></clipPath></defs>'.format(
+                _f(left), _f(top), _f(right - left), _f(bottom - top)),
+            '<rect x="{}" y="{}" width="{}" height="{}" fill="#ffffff"/>'
+            .format(_f(x0), _f(y0), _f(width), _f(height)),
+            '<g font-family="{}, sans-serif" stroke-linecap="butt">'.format(
+                escape(fonts))]
+        lines.extend(e for _, _, e in sorted(self._elements))
+        lines.extend(['</g>', '</svg>', ''])
+        return '\n'.join(lines)
+
+
+def _colour(colour):
+    # the single letter colour names used by matplotlib; other colours are
+    # either strings or RGB(A) tuples, such as the fills of faded bars
+    if not isinstance(colour, str):
+        from matplotlib.colors import to_hex, to_rgba
+
+        return to_hex(colour, keep_alpha=to_rgba(colour)[3] < 1)
+    return {'k': '#000000', 'w': '#ffffff', 'r': '#ff0000', 'g': '#008000',
+            'b': '#0000ff'}.get(colour, colour)
+
+
+def _dashed_arrow(fig, x, y, dx, dy, colour='k', line_width=_linewidth,
+                  start_head=True, end_head=True):
+    # the vertical dashed arrows drawn by bapt.plotting.dashed_arrow
+    length = _arrow_head_length
+    width = _arrow_head_width
+    overhang = _arrow_overhang
+    stem = 0.001  # the default width of the stem of a FancyArrow
+
+    fig.line([x, x + dx], [y, y + dy], colour=colour, line_width=line_width,
+             dashes=_arrow_dashes)
+
+    # the outline of the arrow drawn by matplotlib's FancyArrow, pointing
+    # along +y from its tip
+    half = [(0, 0), (-width / 2, -length),
+            (-stem / 2, -length * (1 - overhang)), (-stem / 2, -length)]
+    outline = half + [(-u, v) for u, v in half[::-1]]
+    if start_head:
+        fig.polygon([x + u for u, _ in outline], [y - v for _, v in outline],
+                    colour=colour, line_width=line_width)
+    if end_head:
+        fig.polygon([x + dx + u for u, _ in outline],
+                    [y + dy + v for _, v in outline], colour=colour,
+                    line_width=line_width)
+
+
+def _draw_axis(fig, layout):
+    # the spines, ticks and labels of the y axis
+    left, top, right, bottom = fig.axes
+    fig.rect(fig.xlim[0], fig.ylim[1], fig.xlim[1] - fig.xlim[0],
+             fig.ylim[0], edge='#000000', zorder=5, join='miter')
+
+    major, labels = _get_yticks(layout)
+    minor = _get_minor_yticks(layout)
+    for ticks, size in ((major, _ticksize), (minor, _ticksize / 2.)):
+        for tick in ticks:
+            _, y = fig.transform(0, tick)
+            for x0, x1 in ((left, left + size), (right, right - size)):
+                fig._add(1.5, '<line x1="{}" y1="{}" x2="{}" y2="{}" '
+                              'stroke="#000000" stroke-width="{}"/>'.format(
+                                  _f(x0), _f(y), _f(x1), _f(y),
+                                  _f(_linewidth)))
+
+    label_left = left
+    for tick, label in zip(major, labels):
+        _, y = fig.transform(0, tick)
+        extent = fig.text(left - _tick_pad, y, label, _ticklabelsize,
+                          ha='right', va='center_baseline', zorder=1.5,
+                          data=False)
+        label_left = min(label_left, extent[0])
+
+    fig.text(label_left - _label_pad, (top + bottom) / 2., 'Energy (eV)',
+             layout.label_size, ha='center', va='bottom', rotation=90, zorder=1.5,
+             data=False)
+
+
+def _draw_titles(fig, title, xlabel, label_size):
+    left, top, right, bottom = fig.axes
+    fig.text((left + right) / 2., top - _title_pad, title, label_size,
+             ha='center', va='baseline', data=False)
+    fig.text((left + right) / 2., bottom + _label_pad, xlabel, label_size,
+             ha='center', va='top', zorder=1.5, data=False)
+
+
+def layout_to_svg(layout):
+    """Write a plot layout without gradients as SVG.
+
+    Args:
+        layout (bapt.layout.Layout): The layout, as returned by
+            :func:`bapt.layout.get_layout`.
+
+    Returns:
+        The SVG document as a string.
+    """
+    if layout.gradients:
+        raise ValueError("only plots without gradients can be written "
+                         "directly as svg")
+
+    fig = SVGFigure(layout.width, layout.height, layout.xlim, layout.ylim,
+                    fonts=layout.fonts)
+    bar_width = layout.bar_width
+    bars = layout.bars.tolist()
+    for (left, top, bottom), fill in zip(bars, layout.bar_fills):
+        fig.rect(left, top, bar_width, bottom, fill=fill)
+    for (left, top, bottom), colour, zorder in zip(
+            bars, layout.edge_colours, layout.edge_zorders.tolist()):
+        fig.rect(left, top, bar_width, bottom, edge=colour, zorder=zorder)
+
+    for (x, y, dx, dy), (start_head, end_head) in zip(
+            layout.arrows.tolist(), layout.arrow_heads.tolist()):
+        _dashed_arrow(fig, x, y, dx, dy, start_head=start_head,
+                      end_head=end_head)
+    for (x, y, zorder), text, (ha, va, colour) in zip(
+            layout.labels.tolist(), layout.label_text, layout.label_style):
+        fig.text(x, y, text, layout.label_size, colour=colour, ha=ha, va=va,
+                 zorder=zorder)
+    for left, top, bottom, zorder in layout.fades.tolist():
+        fig.rect(left, top, bar_width, bottom, fill='#ffffff',
+                 edge='#ffffff', alpha=0.5, zorder=zorder)
+
+    for energy in layout.hlines.tolist():
+        fig.line(layout.xlim, [energy, energy], colour='#808080',
+                 dashes=_dotted, zorder=0)
+
+    if layout.show_axis:
+        _draw_axis(fig, layout)
+
+    _draw_titles(fig, layout.title, layout.xlabel, layout.label_size)
+
+    # cropped like the figure saved with bbox_inches='tight'
+    x0, y0, x1, y1 = get_extents(layout, pad_inches=_pad_inches)
+    return fig.to_string((x0 * 72., (layout.height - y1) * 72., x1 * 72.,
+                          (layout.height - y0) * 72.))
+
+
+def get_svg_vacuum(data, gradients=False, **kwargs):
+    """Write a vacuum aligned plot as SVG.
+
+    The arguments are the same as those of :func:`bapt.get_plot`.
+
+    Returns:
+        The SVG document as a string.
+    """
+    from .layout import get_vacuum_layout
+
+    if gradients:
+        raise ValueError("only plots without gradients can be written "
+                         "directly as svg")
+    return layout_to_svg(get_vacuum_layout(data, gradients=False, **kwargs))
+
+
+def get_svg_novac(data, gradients=False, **kwargs):
+    """Write a plot of band offsets, without vacuum alignment, as SVG.
+
+    The arguments are the same as those of :func:`bapt.get_plot_novac`.
+
+    Returns:
+        The SVG document as a string.
+    """
+    from .layout import get_novac_layout
+
+    if gradients:
+        raise ValueError("only plots without gradients can be written "
+                         "directly as svg")
+    return layout_to_svg(get_novac_layout(data, gradients=False, **kwargs))
+
+
+def get_svg(data, **kwargs):
+    """Write a flat band alignment plot as SVG without using matplotlib.
+
+    Compounds with valence band offsets are plotted without vacuum alignment,
+    like :func:`bapt.get_alignment_plot`. Keyword arguments that do not apply
+    to the type of plot are discarded.
+
+    Args:
+        data (list): A list of compound dicts.
+        **kwargs: Plotting options. Gradients are not supported.
+
+    Returns:
+        The SVG document as a string.
+    """
+    if 'vbo' in data[0]:
+        [kwargs.pop(key, None) for key in ['photocat_hlines', 'photocat']]
+        return get_svg_novac(data, **kwargs)
+    else:
+        [kwargs.pop(key, None) for key in ['hide_cbo', 'hide_vbo']]
+        return get_svg_vacuum(data, **kwargs)
+
+
+def save_svg(data, filename, **kwargs):
+    """Write a flat band alignment plot to an SVG file without matplotlib.
+
+    Args:
+        data (list): A list of compound dicts.
+        filename (str): The output file name.
+        **kwargs: Plotting options, as for :func:`get_svg`.
+    """
+    svg = get_svg(data, **kwargs)
+    with open(filename, 'w') as f:
+        f.write(svg)
@@ -0,0 +1,309 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Load compound data from CSV, JSON lines and Parquet tables.
+
+The tables are read in chunks of rows into typed NumPy column arrays and the
+band edges are derived with vectorised operations, making this much faster
+than yaml config files for large data sets. Each row is one compound, with
+columns named like the config file keys (``name``, ``ip``, ``ea``,
+``band_gap``, ``vbo``, ``cbo``, ``fade``, ``vb_colour`` and ``cb_colour``).
+"""
+
+import os
+import csv
+import json
+
+tabular_formats = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+                   '.parquet': 'parquet', '.pq': 'parquet'}
+
+energy_columns = ('ip', 'ea', 'band_gap', 'vbo', 'cbo')
+bool_columns = ('fade',)
+
+
+def is_tabular(filename):
+    """Check whether a file is a table that can be read by :func:`read_table`.
+
+    Args:
+        filename (str): Path to the file.
+
+    Returns:
+        True if the file extension is a supported table format.
+    """
+    return os.path.splitext(filename)[1].lower() in tabular_formats
+
+
+def _parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes', '1', 't', 'y')
+    return bool(value)
+
+
+def _empty_column(key, nrows):
+    # the column of a key missing from part of a table
+    import numpy as np
+
+    if key in energy_columns:
+        return np.full(nrows, np.nan)
+    elif key in bool_columns:
+        return np.zeros(nrows, dtype=bool)
+    return np.full(nrows, '', dtype=object)
+
+
+def _to_columns(raw):
+    import numpy as np
+
+    columns = {}
+    for key, values in raw.items():
+        if key in energy_columns:
+            columns[key] = np.array(
+                [np.nan if v is None or v == '' else v for v in values],
+                dtype=float)
+        elif key in bool_columns:
+            columns[key] = np.array(
+                [False if v is None or v == '' else _parse_bool(v)
+                 for v in values], dtype=bool)
+        else:
+            columns[key] = np.array(['' if v is None else str(v)
+                                     for v in values], dtype=object)
+    return columns
+
+
+def _concatenate(chunks):
+    # joins the column arrays of each chunk of rows, in which columns may
+    # be missing
+    import numpy as np
+
+    keys = []
+    for columns, _ in chunks:
+        keys.extend(k for k in columns if k not in keys)
+    return dict((key, np.concatenate(
+        [columns[key] if key in columns else _empty_column(key, nrows)
+         for columns, nrows in chunks])) for key in keys)
+
+
+def _iter_csv(filename, chunk_size):
+    with open(filename, 'r') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        raw = dict((h, []) for h in header)
+        lists = [raw[h] for h in header]
+        nrows = 0
+        empty = True
+        for row in reader:
+            if not row:
+                continue
+            for values, value in zip(lists, row):
+                values.append(value.strip())
+            for values in lists[len(row):]:
+                values.append('')
+            nrows += 1
+            if nrows == chunk_size:
+                yield raw, nrows
+                raw = dict((h, []) for h in header)
+                lists = [raw[h] for h in header]
+                nrows = 0
+                empty = False
+        if nrows or empty:
+            yield raw, nrows
+
+
+def _iter_jsonl(filename, chunk_size):
+    raw = {}
+    nrows = 0
+    empty = True
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            for key in row:
+                if key not in raw:
+                    raw[key] = [None] * nrows
+            for key, values in raw.items():
+                values.append(row.get(key))
+            nrows += 1
+            if nrows == chunk_size:
+                yield raw, nrows
+                raw = {}
+                nrows = 0
+                empty = False
+    if nrows or empty:
+        yield raw, nrows
+
+
+def _iter_parquet(filename, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required to read parquet files.")
+
+    table = pq.ParquetFile(filename)
+    for batch in table.iter_batches(batch_size=chunk_size):
+        yield (dict((name, batch.column(i).to_pylist())
+                    for i, name in enumerate(batch.schema.names)),
+               batch.num_rows)
+
+
+def read_table(filename, chunk_size=65536):
+    """Read a table of compounds into column arrays.
+
+    The table is read in chunks of rows, each of which is converted to typed
+    arrays before the next is read.
+
+    Args:
+        filename (str): Path to a ``.csv``, ``.jsonl`` or ``.parquet`` file.
+            Reading parquet files requires pyarrow.
+        chunk_size (int): The number of rows read at a time.
+
+    Returns:
+        A dict of column name to NumPy array. Energy columns are floats with
+        NaN for missing values.
+    """
+    fmt = tabular_formats[os.path.splitext(filename)[1].lower()]
+    readers = {'csv': _iter_csv, 'jsonl': _iter_jsonl,
+               'parquet': _iter_parquet}
+    return _concatenate([(_to_columns(raw), nrows) for raw, nrows in
+                         readers[fmt](filename, chunk_size)])
+
+
+def _rows(mask):
+    import numpy as np
+
+    rows = np.nonzero(mask)[0]
+    text = ', '.join(str(r + 1) for r in rows[:10])
+    return text + (', ...' if len(rows) > 10 else '')
+
+
+def derive_band_edges(columns, tolerance=1e-6):
+    """Derive and validate the band edges of all compounds at once.
+
+    For vacuum aligned data, any one of the ionisation potential, electron
+    affinity or band gap can be derived from the other two. For offset data,
+    the valence and conduction band offsets (relative to the first compound)
+    are derived from each other using the band gaps.
+
+    Args:
+        columns (dict): A dict of column name to NumPy array, as returned by
+            :func:`read_table`. Modified in place.
+        tolerance (float): Tolerance for consistency checks, in eV.
+
+    Returns:
+        The columns, with the derived energy columns filled in.
+
+    Raises:
+        ValueError: If values are missing or inconsistent. All offending rows
+            (numbered from 1) are listed in the error message.
+    """
+    import numpy as np
+
+    if 'name' not in columns:
+        raise ValueError("no name column found")
+    names = columns['name']
+    nrows = len(names)
+    if nrows == 0:
+        raise ValueError("no compounds found")
+
+    errors = []
+    missing_names = names == ''
+    if missing_names.any():
+        errors.append("missing name in rows " + _rows(missing_names))
+
+    nan = np.full(nrows, np.nan)
+    ip, ea, gap, vbo, cbo = [columns.get(c, nan) for c in energy_columns]
+
+    if not (np.isnan(vbo).all() and np.isnan(cbo).all()):
+        missing = np.isnan(gap)
+        if missing.any():
+            errors.append("missing band_gap in rows " + _rows(missing))
+        missing = np.isnan(vbo) & np.isnan(cbo)
+        if missing.any():
+            errors.append("missing vbo or cbo in rows " + _rows(missing))
+
+        derived_vbo = gap[0] - gap + cbo
+        derived_cbo = -gap[0] + gap + vbo
+        # rows with a missing band gap are only reported as missing
+        bad = np.abs(vbo - derived_vbo) > tolerance
+        if bad.any():
+            errors.append("inconsistent vbo and cbo in rows " + _rows(bad))
+
+        columns['vbo'] = np.where(np.isnan(vbo), derived_vbo, vbo)
+        columns['cbo'] = np.where(np.isnan(cbo), derived_cbo, cbo)
+        columns['band_gap'] = gap
+    else:
+        # only checked where all three are given, otherwise the missing one
+        # is derived below
+        bad = np.abs(gap - (ip - ea)) > tolerance
+        if bad.any():
+            errors.append("inconsistent ip, ea and band_gap in rows " +
+                          _rows(bad))
+
+        ip = np.where(np.isnan(ip), ea + gap, ip)
+        ea = np.where(np.isnan(ea), ip - gap, ea)
+        missing = np.isnan(ip) | np.isnan(ea)
+        if missing.any():
+            errors.append("missing ip or ea in rows " + _rows(missing))
+        negative = ip < ea
+        if negative.any():
+            errors.append("ip smaller than ea in rows " + _rows(negative))
+
+        columns['ip'] = ip
+        columns['ea'] = ea
+        columns['band_gap'] = ip - ea
+        columns.pop('vbo', None)
+        columns.pop('cbo', None)
+
+    if errors:
+        raise ValueError('; '.join(errors))
+    return columns
+
+
+def columns_to_data(columns):
+    """Convert column arrays to the list of compound dicts used for plotting.
+
+    Args:
+        columns (dict): A dict of column name to NumPy array, as returned by
+            :func:`derive_band_edges`.
+
+    Returns:
+        A list of compound dicts.
+    """
+    import numpy as np
+
+    offsets = 'vbo' in columns
+    keys = ['name'] + (['band_gap', 'vbo', 'cbo'] if offsets else
+                       ['ip', 'ea'])
+    keys += [k for k in ('vb_colour', 'cb_colour') if k in columns]
+
+    lists = [columns[k].tolist() for k in keys]
+    data = [dict(zip(keys, values)) for values in zip(*lists)]
+
+    if 'fade' in columns:
+        for i in np.nonzero(columns['fade'])[0]:
+            data[i]['fade'] = True
+
+    # blank colours fall back to the defaults
+    for key in ('vb_colour', 'cb_colour'):
+        if key in columns:
+            for i in np.nonzero(columns[key] == '')[0]:
+                del data[i][key]
+    return data
+
+
+def read_tabular(filename):
+    """Read compound data from a table.
+
+    Args:
+        filename (str): Path to a ``.csv``, ``.jsonl`` or ``.parquet`` file.
+
+    Returns:
+        The compound data and settings as a tuple of ``(data, settings)``.
+        Tables do not contain settings, so the settings are always empty.
+        The band offsets are already filled in, so the data need not be
+        passed to :func:`bapt.add_band_offsets`.
+    """
+    columns = derive_band_edges(read_table(filename))
+    return columns_to_data(columns), {}
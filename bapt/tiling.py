@@ -0,0 +1,695 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Tiled rasterization of poster-size plots to PNG.
+
+Plots are as wide as the number of compounds, so a plot of hundreds of
+compounds at 400 dpi needs gigabytes for a single Agg canvas, which is also
+limited to 65535 pixels a side and is rasterized on one core. Instead, the
+image is split into bands of rows, each of which is rendered by a worker
+process in tiles no larger than ``tile_size`` pixels. The bands are
+compressed by the workers and written to the PNG file as they arrive::
+
+    layout = get_layout(data, width=400)
+    save_tiled_png(layout, 'poster.png', dpi=400)
+
+Each tile is cropped from the figure on whole pixels of the image, so the
+stitched image is the same, pixel for pixel, as the image rasterized on one
+canvas by :func:`bapt.export.render_rgba`. Memory use is bounded by the size
+of a band in each worker.
+
+Bands are only split into several tiles for images wider than Agg allows, or
+if a smaller ``tile_size`` is requested. Points that fall exactly half way
+between two pixels may then be rounded to a different pixel in the frame of
+a tile, which can move an edge by one pixel at a vertical seam.
+
+Matplotlib draws some artists differently when they are cut by the edge of
+a canvas, so the fills and dash offsets of these are changed while a tile is
+drawn. Images are also resampled over the whole of their axes, on a pixel
+grid that depends on the canvas, so only the part of each image on a tile is
+resampled instead, on the same grid as the full image. This uses private
+matplotlib internals. If these are missing, as checked by
+:func:`check_matplotlib`, the plot is saved on one canvas instead.
+"""
+
+import io
+import struct
+import zlib
+import functools
+
+# the largest canvas Agg can draw on
+max_tile_size = 2 ** 16 - 1
+
+# the default size of the bands of rows in bytes of RGBA pixels
+default_band_bytes = 2 ** 25
+
+# the number of pixels of an image resampled at once
+_strip_pixels = 2 ** 20
+
+_adler_base = 65521
+
+_matplotlib_checked = []
+
+
+def check_matplotlib():
+    """Check that matplotlib has the private internals used to clip images.
+
+    Only the part of each image that is on a tile is resampled, on the same
+    pixel grid as the full image, so that the tiles match the full image and
+    the memory used by a tile is bounded by its size. This replaces the
+    ``make_image`` method of the images with one that uses private
+    internals of :class:`matplotlib.image.AxesImage` and
+    :class:`matplotlib.image.PcolorImage`.
+
+    Returns:
+        bool: Whether the internals are available.
+    """
+    if _matplotlib_checked:
+        return _matplotlib_checked[0]
+
+    import inspect
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.image import AxesImage, PcolorImage
+
+    axes = Figure().add_subplot(1, 1, 1)
+    pcolor = PcolorImage(axes, np.arange(3.), np.arange(3.),
+                         np.zeros((2, 2)))
+    supported = (hasattr(AxesImage, '_make_image') and
+                 all(hasattr(pcolor, attr)
+                     for attr in ('_A', '_Ax', '_Ay', '_imcache')))
+    if supported:
+        parameters = list(inspect.signature(
+            AxesImage._make_image).parameters)[1:7]
+        supported = parameters == ['A', 'in_bbox', 'out_bbox', 'clip_bbox',
+                                   'magnification', 'unsampled']
+    _matplotlib_checked.append(supported)
+    return supported
+
+
+def get_image_bbox(figure, dpi=400, pad_inches=0.1):
+    """Get the region of a figure included in its image, and the image size.
+
+    This is the tight bounding box used by :func:`bapt.export.render_rgba`.
+    The text is measured without allocating a canvas for the whole figure.
+
+    Args:
+        figure (matplotlib.figure.Figure): The figure.
+        dpi (int): Dots-per-inch of the image.
+        pad_inches (float): The padding around the figure in inches.
+
+    Returns:
+        The bounding box in inches, as a :obj:`matplotlib.transforms.Bbox`,
+        and the ``(width, height)`` of the image in pixels.
+    """
+    from matplotlib.backends.backend_agg import RendererAgg
+    from .export import get_image_size
+
+    figure_dpi = figure.dpi
+    figure.dpi = dpi
+    try:
+        bbox = figure.get_tightbbox(RendererAgg(1, 1, dpi))
+    finally:
+        figure.dpi = figure_dpi
+    bbox = bbox.padded(pad_inches)
+    return bbox, get_image_size(bbox, dpi=dpi)
+
+
+def get_bands(width, height, band_height, tile_size=max_tile_size):
+    """Split an image into bands of rows and each band into tiles.
+
+    Args:
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+        band_height (int): The number of rows in each band.
+        tile_size (int): The maximum width of a tile in pixels.
+
+    Returns:
+        A list of bands from the top of the image, each a list of ``(x, y,
+        width, height)`` tiles in pixels from the top left of the image.
+    """
+    band_height = max(1, min(band_height, tile_size))
+    tile_size = max(1, tile_size)
+    return [[(x, y, min(tile_size, width - x), min(band_height, height - y))
+             for x in range(0, width, tile_size)]
+            for y in range(0, height, band_height)]
+
+
+def get_overhangs(figure, bbox, dpi=400):
+    """Get the extents of the shapes that are cut where a tile is cropped.
+
+    Agg rounds the points at which the outline of a shape is clipped to the
+    canvas, which slightly changes the pixels along any slanted edges, e.g.
+    of arrow heads or of the joins at the corners of bars. Tiles are grown to
+    include these shapes so that they are drawn whole.
+
+    Args:
+        figure (matplotlib.figure.Figure): The figure.
+        bbox (matplotlib.transforms.Bbox): The region of the figure included
+            in the image, as returned by :func:`get_image_bbox`.
+        dpi (int): Dots-per-inch of the image.
+
+    Returns:
+        An ``(N, 4)`` array of the ``(x0, y0, x1, y1)`` extents of the shapes,
+        in pixels from the top left of the image.
+    """
+    import numpy as np
+    from matplotlib.patches import Patch
+    from matplotlib.collections import Collection
+
+    def get_paths(artist):
+        if isinstance(artist, Patch):
+            return [artist.get_path()], [artist.get_linewidth()]
+        widths = artist.get_linewidths()
+        if not len(artist.get_edgecolors()):
+            widths = [0]
+        return artist.get_paths(), widths
+
+    figure_dpi = figure.dpi
+    figure.dpi = dpi
+    extents = []
+    try:
+        for artist in figure.findobj(lambda a: isinstance(
+                a, (Patch, Collection)) and a.get_visible()):
+            transform = artist.get_transform()
+            paths, widths = get_paths(artist)
+            for i, path in enumerate(paths):
+                vertices = transform.transform(path.vertices) - bbox.p0 * dpi
+                vertices[:, 1] = bbox.height * dpi - vertices[:, 1]
+                pad = widths[i % len(widths)] * dpi / 72. + 2
+                steps = np.abs(np.diff(vertices, axis=0))
+                if (steps.min(axis=1) >= 1e-4).any():
+                    # the whole of any shape with slanted edges
+                    vertices = np.array([vertices.min(axis=0),
+                                         vertices.max(axis=0)])
+                elif pad <= 2:
+                    continue
+                # otherwise the corners of the outline
+                extents.append(np.hstack([vertices - pad, vertices + pad]))
+    finally:
+        figure.dpi = figure_dpi
+    return np.vstack(extents) if extents else np.zeros((0, 4))
+
+
+def _grow_tile(tile, overhangs, width, height):
+    # only the shapes that overlap the tile need to be drawn whole, as any
+    # others cut by the larger canvas are cropped from the tile anyway
+    import numpy as np
+
+    x0, y0 = tile[:2]
+    x1, y1 = x0 + tile[2], y0 + tile[3]
+    cut = overhangs[(overhangs[:, 0] < x1) & (overhangs[:, 2] > x0) &
+                    (overhangs[:, 1] < y1) & (overhangs[:, 3] > y0)]
+    if len(cut):
+        x0 = max(min(x0, int(np.floor(cut[:, 0].min()))), 0)
+        y0 = max(min(y0, int(np.floor(cut[:, 1].min()))), 0)
+        x1 = min(max(x1, int(np.ceil(cut[:, 2].max()))), width)
+        y1 = min(max(y1, int(np.ceil(cut[:, 3].max()))), height)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def render_tile(figure, bbox, tile, dpi=400, overhangs=None):
+    """Rasterize a tile of the image of a figure.
+
+    Images are only drawn as in the full image if :func:`check_matplotlib`
+    passes.
+
+    Args:
+        figure (matplotlib.figure.Figure): The figure.
+        bbox (matplotlib.transforms.Bbox): The region of the figure included
+            in the image, in inches, as returned by :func:`get_image_bbox`.
+        tile (tuple): The ``(x, y, width, height)`` of the tile in pixels from
+            the top left of the image.
+        dpi (int): Dots-per-inch of the image.
+        overhangs (numpy.ndarray): The extents of the patches that must be
+            drawn whole, as returned by :func:`get_overhangs`. Computed if
+            not given.
+
+    Returns:
+        An ``(height, width, 4)`` array of RGBA pixels.
+    """
+    from matplotlib.transforms import Bbox
+    from .export import get_image_size
+
+    if overhangs is None:
+        overhangs = get_overhangs(figure, bbox, dpi=dpi)
+    image_width, image_height = get_image_size(bbox, dpi=dpi)
+    x, y, width, height = _grow_tile(tile, overhangs, image_width,
+                                     image_height)
+
+    # the canvas size is truncated to whole pixels, so the extra half pixel
+    # makes sure that rounding errors don't lose a row or column, and the
+    # image rows are counted down from the top of the truncated image
+    x0 = bbox.x0 + float(x) / dpi
+    y0 = bbox.y0 + float(image_height - y - height) / dpi
+    region = Bbox.from_bounds(x0, y0, (width + 0.5) / dpi,
+                              (height + 0.5) / dpi)
+
+    undo = _prepare_tile(figure, x0 * dpi, y0 * dpi, width, height, dpi)
+    try:
+        buf = _PixelBuffer(width, height)
+        figure.savefig(buf, format='rgba', dpi=dpi, bbox_inches=region)
+    finally:
+        for restore in undo:
+            restore()
+    return buf.pixels[tile[1] - y:tile[1] - y + tile[3],
+                      tile[0] - x:tile[0] - x + tile[2]]
+
+
+class _PixelBuffer(io.RawIOBase):
+    # a file object that the pixels of a canvas are saved straight into,
+    # rather than being copied out of an in-memory file
+
+    def __init__(self, width, height):
+        import numpy as np
+
+        super(_PixelBuffer, self).__init__()
+        self.pixels = np.empty((height, width, 4), dtype=np.uint8)
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        import numpy as np
+
+        data = np.frombuffer(data, dtype=np.uint8)
+        self.pixels.reshape(-1)[self._size:self._size + len(data)] = data
+        self._size += len(data)
+        return len(data)
+
+
+def _prepare_tile(figure, x0, y0, width, height, dpi):
+    # matplotlib draws some artists differently when they are cut by the
+    # edge of the canvas. These are changed so that they are drawn as in the
+    # full image, and a list of functions to restore them is returned
+    undo = _clip_images(figure) if check_matplotlib() else []
+    return (undo + _fill_edges(figure) +
+            _shift_dashes(figure, x0, y0, width, height, dpi))
+
+
+def _fill_edges(figure):
+    # outlines without a fill are clipped to the canvas before they are
+    # stroked, which leaves gaps at their corners. A transparent fill, which
+    # doesn't change any pixels, stops them from being clipped
+    from matplotlib.collections import PatchCollection
+
+    undo = []
+    for collection in figure.findobj(PatchCollection):
+        # the colours are reset when first drawn, so they are set up first
+        collection.update_scalarmappable()
+        if len(collection.get_facecolor()) == 0:
+            undo.append(functools.partial(collection.set_facecolor, 'none'))
+            collection.set_facecolor((0, 0, 0, 0))
+    return undo
+
+
+def _clip_images(figure):
+    # matplotlib resamples images over the whole of their axes, however small
+    # the canvas, so a tile would need as much memory as the full image. Only
+    # the part of each image on the canvas is resampled instead, on the same
+    # pixel grid as the full image
+    import numpy as np
+    from matplotlib.colors import to_rgba
+    from matplotlib.image import AxesImage, PcolorImage
+    from matplotlib.transforms import Bbox, IdentityTransform, TransformedBbox
+
+    def clip_axes_image(image, renderer, magnification=1.0,
+                        unsampled=False):
+        x1, x2, y1, y2 = image.get_extent()
+        bbox = Bbox(np.array([[x1, y1], [x2, y2]]))
+        out_bbox = TransformedBbox(bbox, image.get_transform())
+        clip = Bbox.intersection(
+            image.get_clip_box() or image.axes.bbox,
+            Bbox.from_bounds(0, 0, renderer.width, renderer.height))
+        if clip is None:
+            return None, 0, 0, None
+        if unsampled:
+            return image._make_image(image._A, bbox, out_bbox, clip,
+                                     magnification, unsampled=True)
+
+        # resampling needs several times the memory of the resampled image,
+        # so it is resampled in strips of whole pixels, which are rounded to
+        # the same pixel borders as the image as a whole
+        step = max(1, _strip_pixels // max(int(clip.height), 1))
+        strips = []
+        for x in range(int(clip.x0), int(np.ceil(clip.x1)), step):
+            strip = image._make_image(
+                image._A, bbox, out_bbox, Bbox.from_extents(
+                    max(x, clip.x0), clip.y0, min(x + step, clip.x1),
+                    clip.y1), magnification)
+            if strip[0] is not None:
+                strips.append(strip)
+        if len(strips) < 2:
+            return strips[0] if strips else (None, 0, 0, None)
+        return ((np.concatenate([strip[0] for strip in strips], axis=1),) +
+                strips[0][1:])
+
+    def clip_pcolor_image(image, renderer, magnification=1.0,
+                          unsampled=False):
+        if image._imcache is None:
+            image._imcache = np.pad(image.to_rgba(image._A, bytes=True),
+                                    [(1, 1), (1, 1), (0, 0)], 'constant')
+        padded = image._imcache
+        bg = np.array(to_rgba(image.axes.patch.get_facecolor(), 0)) * 255
+        bg = bg.astype(np.uint8)
+        if (padded[0, 0] != bg).all():
+            padded[[0, -1], :] = padded[:, [0, -1]] = bg
+
+        # the axes are rounded to whole pixels, as by PcolorImage, and the
+        # pixel centres are sampled from the same grid as the full image
+        l, b, r, t = np.floor(image.axes.bbox.extents * magnification +
+                              0.5).astype(int)
+        x_edges = np.linspace(image.axes.viewLim.x0, image.axes.viewLim.x1,
+                              r - l + 1)
+        y_edges = np.linspace(image.axes.viewLim.y0, image.axes.viewLim.y1,
+                              t - b + 1)
+        i0, i1 = max(-l, 0), min(r, renderer.width) - l
+        j0, j1 = max(-b, 0), min(t, renderer.height) - b
+        if i1 <= i0 or j1 <= j0:
+            return None, 0, 0, None
+        x_int = image._Ax.searchsorted(
+            (x_edges[i0:i1] + x_edges[i0 + 1:i1 + 1]) / 2)
+        y_int = image._Ay.searchsorted(
+            (y_edges[j0:j1] + y_edges[j0 + 1:j1 + 1]) / 2)
+        im = padded.view(np.uint32).ravel()[
+            np.add.outer(y_int * padded.shape[1], x_int)]
+        im = im.view(np.uint8).reshape((j1 - j0, i1 - i0, 4))
+        return (im, (l + i0) / magnification, (b + j0) / magnification,
+                IdentityTransform())
+
+    undo = []
+    for image in figure.findobj(lambda a: type(a) in (AxesImage,
+                                                      PcolorImage)):
+        if 'make_image' in vars(image) or (
+                isinstance(image, AxesImage) and not image.get_clip_on()):
+            continue
+        clip = (clip_pcolor_image if isinstance(image, PcolorImage)
+                else clip_axes_image)
+        image.make_image = functools.partial(clip, image)
+        undo.append(functools.partial(delattr, image, 'make_image'))
+    return undo
+
+
+def _shift_dashes(figure, x0, y0, width, height, dpi):
+    # Agg clips lines to the canvas before dashing them, so the dashes of a
+    # line that starts outside of a tile would start again at its edge. The
+    # dash offset of each line is shifted by the length that is clipped off,
+    # as measured by Agg, which snaps straight lines to the pixel grid
+    import numpy as np
+    from matplotlib import rcParams
+    from matplotlib.lines import Line2D
+    from matplotlib.collections import LineCollection
+    from .plotting import _arrow_dashes
+
+    def clipped_length(vertices, line_width):
+        (ax, ay), (bx, by) = vertices[:2]
+        ay, by = height - (ay - y0), height - (by - y0)
+        ax, bx = ax - x0, bx - x0
+
+        # the start of the first segment inside the clipping rectangle
+        start, end = 0., 1.
+        for p, q in ((ax + 1, bx - ax), (width + 1 - ax, ax - bx),
+                     (ay + 1, by - ay), (height + 1 - ay, ay - by)):
+            if q == 0:
+                if p < 0:
+                    return 0.
+            elif q > 0:
+                start = max(start, -p / q)
+            else:
+                end = min(end, -p / q)
+        if start <= 0 or start > end:
+            return 0.
+        cx, cy = ax + start * (bx - ax), ay + start * (by - ay)
+
+        if ax == bx or ay == by:
+            snap = 0.5 if int(round(line_width)) % 2 else 0.
+            ax, ay, cx, cy = [np.floor(v + 0.5) + snap
+                              for v in (ax, ay, cx, cy)]
+        return np.hypot(cx - ax, cy - ay) * 72. / dpi
+
+    def unscaled(offset, dashes, line_width):
+        # the line styles are set in points per unit of line width
+        if not rcParams['lines.scale_dashes'] or not line_width:
+            return offset, dashes
+        return offset / line_width, [d / line_width for d in dashes]
+
+    figure_dpi = figure.dpi
+    figure.dpi = dpi
+    undo = []
+    try:
+        # the only dashed lines are the stems of arrows drawn by
+        # bapt.plotting.dashed_arrow
+        for line in figure.findobj(Line2D):
+            if not line.is_dashed() or len(line.get_xydata()) < 2:
+                continue
+            vertices = line.get_transform().transform(line.get_xydata())
+            length = clipped_length(
+                vertices, line.get_linewidth() * dpi / 72.)
+            if length:
+                undo.append(functools.partial(line.set_dashes,
+                                              _arrow_dashes))
+                line.set_linestyle(unscaled(length, _arrow_dashes,
+                                            line.get_linewidth()))
+
+        for collection in figure.findobj(LineCollection):
+            styles = collection.get_linestyle()
+            paths = collection.get_paths()
+            if all(dashes is None for _, dashes in styles) or not paths:
+                continue
+            widths = collection.get_linewidths()
+            transform = collection.get_transform()
+            original, shifted = [], []
+            for i, path in enumerate(paths):
+                offset, dashes = styles[i % len(styles)]
+                width = widths[i % len(widths)]
+                length = 0.
+                if dashes is not None and len(path.vertices) > 1:
+                    length = clipped_length(transform.transform(path.vertices),
+                                            width * dpi / 72.)
+                if dashes is None:
+                    original.append((offset, dashes))
+                    shifted.append((offset, dashes))
+                else:
+                    original.append(unscaled(offset, dashes, width))
+                    shifted.append(unscaled(offset + length, dashes, width))
+            undo.append(functools.partial(collection.set_linestyle,
+                                          original))
+            collection.set_linestyle(shifted)
+    finally:
+        figure.dpi = figure_dpi
+    return undo
+
+
+def encode_rows(image):
+    """Filter and compress rows of an RGBA image for a PNG data stream.
+
+    Each row uses the PNG "sub" filter, which only depends on the row itself,
+    so bands of rows can be encoded independently. The compressed data is
+    flushed to a byte boundary, so that the bands can be concatenated.
+
+    Args:
+        image (numpy.ndarray): An ``(height, width, 4)`` array of RGBA
+            pixels.
+
+    Returns:
+        The compressed rows as raw deflate data, the Adler-32 checksum of the
+        filtered rows and their length in bytes.
+    """
+    import numpy as np
+
+    height, width = image.shape[:2]
+    rows = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 0] = 1
+    rows[:, 1:5] = image[:, 0]
+    np.subtract(image[:, 1:], image[:, :-1],
+                out=rows[:, 5:].reshape(height, width - 1, 4))
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(rows) + compressor.flush(
+        zlib.Z_SYNC_FLUSH)
+    return compressed, zlib.adler32(rows) & 0xffffffff, rows.nbytes
+
+
+def _adler32_combine(adler1, adler2, length2):
+    # the checksum of two blocks of data from the checksum of each, as
+    # adler32_combine in zlib
+    rem = length2 % _adler_base
+    sum1 = adler1 & 0xffff
+    sum2 = (rem * sum1) % _adler_base
+    sum1 = (sum1 + (adler2 & 0xffff) + _adler_base - 1) % _adler_base
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + _adler_base -
+            rem) % _adler_base
+    return sum1 | (sum2 << 16)
+
+
+class PNGWriter(object):
+    """Write an RGBA PNG file one band of rows at a time.
+
+    Args:
+        f (file): A file object opened for writing bytes.
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+        dpi (int): The dots-per-inch stored in the file.
+    """
+
+    def __init__(self, f, width, height, dpi=None):
+        self.f = f
+        self.rows = 0
+        self._height = height
+        self._adler = 1
+
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8,
+                                               6, 0, 0, 0))
+        if dpi:
+            ppm = int(round(dpi / 0.0254))
+            self._write_chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1))
+        # the zlib header for the default compression level
+        self._write_chunk(b'IDAT', b'\x78\x9c')
+
+    def _write_chunk(self, tag, data):
+        self.f.write(struct.pack('>I', len(data)))
+        self.f.write(tag)
+        self.f.write(data)
+        self.f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) &
+                                 0xffffffff))
+
+    def write_rows(self, rows, encoded):
+        """Write a band of rows.
+
+        Args:
+            rows (int): The number of rows in the band.
+            encoded (tuple): The rows as returned by :func:`encode_rows`.
+        """
+        compressed, adler, length = encoded
+        self._write_chunk(b'IDAT', compressed)
+        self._adler = _adler32_combine(self._adler, adler, length)
+        self.rows += rows
+
+    def close(self):
+        """Finish the file. All rows must have been written."""
+        if self.rows != self._height:
+            raise ValueError('{} of {} rows were written'.format(
+                self.rows, self._height))
+        # an empty final block followed by the checksum of all the rows
+        self._write_chunk(b'IDAT', b'\x03\x00' +
+                          struct.pack('>I', self._adler))
+        self._write_chunk(b'IEND', b'')
+
+
+_worker = {}
+
+
+def _set_figure(layout, dpi, pad_inches):
+    from .figure import AlignmentFigure
+    from .plotting import style_context
+
+    figure = AlignmentFigure.from_layout(layout, dpi=dpi)
+    with style_context(figure._fonts):
+        bbox, _ = get_image_bbox(figure.figure, dpi=dpi,
+                                 pad_inches=pad_inches)
+        _worker['overhangs'] = get_overhangs(figure.figure, bbox, dpi=dpi)
+    _worker['figure'] = figure
+    _worker['bbox'] = bbox
+
+
+def _init_worker(layout, dpi, pad_inches):
+    import signal
+
+    # Ctrl-C is handled by the parent process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _set_figure(layout, dpi, pad_inches)
+
+
+def _render_band(band):
+    import numpy as np
+    from .plotting import style_context
+
+    figure = _worker['figure']
+    height = band[0][3]
+    tiles = (render_tile(figure.figure, _worker['bbox'], tile,
+                         dpi=figure.dpi, overhangs=_worker['overhangs'])
+             for tile in band)
+    with style_context(figure._fonts):
+        if len(band) == 1:
+            image = next(tiles)
+        else:
+            image = np.empty((height, sum(tile[2] for tile in band), 4),
+                             dtype=np.uint8)
+            for tile, pixels in zip(band, tiles):
+                image[:, tile[0]:tile[0] + tile[2]] = pixels
+    return height, encode_rows(image)
+
+
+def save_tiled_png(layout, filename, dpi=400, pad_inches=0.1,
+                   band_height=None, tile_size=max_tile_size,
+                   processes=None):
+    """Rasterize a plot to a PNG file in tiles, using several processes.
+
+    Args:
+        layout (bapt.layout.Layout): The layout of the plot, as returned by
+            :func:`bapt.layout.get_layout`.
+        filename (str): The output file name.
+        dpi (int): Dots-per-inch.
+        pad_inches (float): The padding around the plot in inches.
+        band_height (int): The number of rows rendered by a worker at once.
+            Defaults to bands of about 32 MB of pixels.
+        tile_size (int): The maximum width of each tile in pixels.
+        processes (int): The number of worker processes. Defaults to the
+            number of cores. Use 1 to render in this process.
+
+    Returns:
+        The ``(width, height)`` of the image in pixels.
+    """
+    from multiprocessing import Pool, cpu_count
+    from .figure import AlignmentFigure
+    from .plotting import style_context
+
+    # each worker draws the figure and measures it in the same way
+    with AlignmentFigure.from_layout(layout, dpi=dpi) as figure:
+        with style_context(figure._fonts):
+            _, (width, height) = get_image_bbox(
+                figure.figure, dpi=dpi, pad_inches=pad_inches)
+        if not check_matplotlib():
+            import warnings
+            import matplotlib
+
+            warnings.warn("tiles are not supported with matplotlib {}, so "
+                          "the plot is saved on one canvas".format(
+                              matplotlib.__version__))
+            figure.save(filename, dpi=dpi, pad_inches=pad_inches)
+            return width, height
+
+    if not band_height:
+        band_height = max(1, default_band_bytes // (4 * width))
+    bands = get_bands(width, height, band_height, tile_size=tile_size)
+
+    processes = processes if processes else cpu_count()
+    processes = max(1, min(processes, len(bands)))
+    pool = None
+    if processes > 1:
+        pool = Pool(processes, initializer=_init_worker,
+                    initargs=(layout, dpi, pad_inches))
+        results = pool.imap(_render_band, bands)
+    else:
+        _set_figure(layout, dpi, pad_inches)
+        results = (_render_band(band) for band in bands)
+
+    try:
+        with open(filename, 'wb') as f:
+            writer = PNGWriter(f, width, height, dpi=dpi)
+            for rows, encoded in results:
+                writer.write_rows(rows, encoded)
+            writer.close()
+        if pool:
+            pool.close()
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+        else:
+            _worker.pop('figure').close()
+    return width, height
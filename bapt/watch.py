@@ -0,0 +1,79 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Re-render a config file whenever its contents change.
+"""
+
+import os
+import sys
+import time
+import hashlib
+
+
+def _file_state(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def _file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def watch(filename, output_file, properties=None, dpi=400, interval=0.25,
+          max_renders=None):
+    """Watch a config file and re-render it each time its contents change.
+
+    The file is polled for changes to its modification time and size. The
+    config is only reparsed and redrawn if the file contents have actually
+    changed, so touching or re-saving an unchanged file is free. Errors in
+    the config are reported and watching continues.
+
+    Args:
+        filename (str): Path to the config file.
+        output_file (str): Path to the output image.
+        properties (dict): Default plotting options. Options in the settings
+            section of the config file take precedence.
+        dpi (int): Dots-per-inch for file output.
+        interval (float): Time between checks for changes, in seconds.
+        max_renders (int): Stop after this many renders. Defaults to watching
+            until interrupted.
+    """
+    from .batch import render_file
+
+    last_state = None
+    last_hash = None
+    nrenders = 0
+    try:
+        while max_renders is None or nrenders < max_renders:
+            state = _file_state(filename)
+            if state is None or state == last_state:
+                time.sleep(interval)
+                continue
+            last_state = state
+
+            try:
+                content_hash = _file_hash(filename)
+            except (IOError, OSError):
+                continue
+            if content_hash == last_hash:
+                continue
+            last_hash = content_hash
+
+            start = time.time()
+            try:
+                render_file(filename, output_file, properties=properties,
+                            dpi=dpi)
+                print("Rendered {} -> {} ({:.2f} s)".format(
+                    filename, output_file, time.time() - start))
+            except Exception as e:
+                print("ERROR: {}: {}".format(type(e).__name__, e))
+            sys.stdout.flush()
+            nrenders += 1
+    except KeyboardInterrupt:
+        pass
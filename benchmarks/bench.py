@@ -0,0 +1,337 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+"""
+Benchmarks for config parsing, plotting, saving and the command-line.
+
+Each benchmark case is run in a fresh python process using synthetic
+compound sets, so that the peak memory of one case does not include that of
+another. The wall time of each stage (parsing, plotting and saving) and the
+peak memory are written as JSON, and can be compared against a stored
+baseline to find regressions. Usually run through invoke::
+
+    invoke benchmark
+    invoke benchmark --sizes 5,50 --save-baseline
+
+or directly::
+
+    python benchmarks/bench.py --sizes 5,50,500 --baseline baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+default_sizes = (5, 50, 500, 5000)
+
+# raster output of thousands of compounds at full width would not fit in
+# memory, so saved figures are capped in width and use a lower dpi
+max_width = 60
+save_dpi = 100
+
+
+def make_compounds(n, offsets=False, fade=False, seed=0):
+    """Generate a reproducible set of synthetic compounds.
+
+    Args:
+        n (int): The number of compounds.
+        offsets (bool): Give band gaps and valence band offsets instead of
+            ionisation potentials and electron affinities.
+        fade (bool): Fade every other compound.
+        seed (int): The random seed.
+
+    Returns:
+        A list of compound dicts, as found in a config file.
+    """
+    rand = random.Random(seed)
+    compounds = []
+    for i in range(n):
+        compound = {'name': 'C{}'.format(i)}
+        if offsets:
+            compound['band_gap'] = round(rand.uniform(1, 4), 3)
+            compound['vbo'] = round(rand.uniform(-1.5, 1.5), 3) if i else 0.
+        else:
+            ip = rand.uniform(5, 8)
+            compound['ip'] = round(ip, 3)
+            compound['ea'] = round(ip - rand.uniform(1, 4), 3)
+        if fade and i % 2:
+            compound['fade'] = True
+        compounds.append(compound)
+    return compounds
+
+
+def get_cases(sizes=default_sizes):
+    """Get the benchmark cases.
+
+    Every size is benchmarked for gradient and flat bars, with and without
+    vacuum alignment, saved as PNG. The plotting options and other output
+    formats are benchmarked at a single, moderate size. The command-line is
+    benchmarked end to end at every size, in each format, rendering at the
+    same width and dpi as the plotting cases.
+
+    Args:
+        sizes (list): The numbers of compounds to benchmark.
+
+    Returns:
+        A list of case dicts.
+    """
+    cases = []
+
+    def add(kind, n, mode='vacuum', gradients=True, fmt='png', **options):
+        name = [kind, mode]
+        if kind != 'parse':
+            name.append('gradient' if gradients else 'flat')
+        name += sorted(k for k, v in options.items() if v)
+        name += [fmt, 'n{}'.format(n)]
+        cases.append({'name': '-'.join(name), 'kind': kind, 'n': n,
+                      'mode': mode, 'gradients': gradients, 'format': fmt,
+                      'options': options})
+
+    for n in sizes:
+        add('parse', n, fmt='yaml')
+        add('parse', n, mode='offset', fmt='yaml')
+        for mode in ('vacuum', 'offset'):
+            for gradients in (True, False):
+                add('plot', n, mode=mode, gradients=gradients)
+
+    n = 50 if 50 in sizes else sorted(sizes)[len(sizes) // 2]
+    for option in ('show_ea', 'fade', 'photocat'):
+        add('plot', n, **{option: True})
+    for fmt in ('pdf', 'svg'):
+        for gradients in (True, False):
+            add('plot', n, gradients=gradients, fmt=fmt)
+
+    for n in sizes:
+        for fmt in ('png', 'pdf', 'svg'):
+            add('cli', n, fmt=fmt)
+    return cases
+
+
+def _peak_memory(children=False):
+    # the peak resident memory in MB, or None where it can't be measured
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # reported in bytes on macOS and in kB elsewhere
+    return peak / 1024. ** (2 if sys.platform == 'darwin' else 1)
+
+
+def _write_config(case, directory):
+    import yaml
+
+    compounds = make_compounds(case['n'], offsets=case['mode'] == 'offset',
+                               fade=case['options'].get('fade', False))
+    settings = {'gradients': case['gradients']}
+    settings.update((k, v) for k, v in case['options'].items()
+                    if k != 'fade')
+    if case['kind'] in ('plot', 'cli'):
+        settings['width'] = min(case['n'] * 1.75, max_width)
+
+    filename = os.path.join(directory, 'config.yaml')
+    with open(filename, 'w') as f:
+        yaml.safe_dump({'compounds': compounds, 'settings': settings}, f)
+    return filename
+
+
+def run_case(case, repeat=3):
+    """Run a benchmark case in this process.
+
+    Args:
+        case (dict): The benchmark case, as returned by :func:`get_cases`.
+        repeat (int): The number of times to run the case. The fastest time
+            of each stage is reported.
+
+    Returns:
+        A dict of the time taken by each stage in seconds and the peak
+        memory in MB.
+    """
+    directory = tempfile.mkdtemp(prefix='bapt-bench-')
+    config_file = _write_config(case, directory)
+    output_file = os.path.join(directory, 'plot.' + case['format'])
+    stages = {}
+
+    def record(stage, elapsed):
+        stages[stage] = min(stages.get(stage, elapsed), elapsed)
+
+    if case['kind'] == 'cli':
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [repo_dir] + [p for p in [env.get('PYTHONPATH')] if p])
+        with open(os.devnull, 'w') as devnull:
+            for _ in range(repeat):
+                start = time.time()
+                subprocess.check_call([sys.executable, '-m', 'bapt.cli', '-f',
+                                       config_file, '-o', output_file,
+                                       '--dpi', str(save_dpi)],
+                                      env=env, stdout=devnull, stderr=devnull)
+                record('cli', time.time() - start)
+        peak = _peak_memory(children=True)
+    else:
+        import matplotlib
+        matplotlib.use('pdf' if case['format'] == 'pdf' else 'agg')
+        import matplotlib.pyplot as plt
+        from bapt import read_config, add_band_offsets, get_alignment_plot
+
+        for _ in range(repeat):
+            start = time.time()
+            data, settings = read_config(config_file)
+            add_band_offsets(data)
+            record('parse', time.time() - start)
+            if case['kind'] == 'parse':
+                continue
+
+            start = time.time()
+            get_alignment_plot(data, **settings)
+            record('plot', time.time() - start)
+
+            start = time.time()
+            plt.savefig(output_file, dpi=save_dpi, bbox_inches='tight')
+            record('save', time.time() - start)
+            plt.close('all')
+        peak = _peak_memory()
+
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    stages['total'] = sum(stages.values())
+    return {'time': stages, 'peak_memory': peak}
+
+
+def run_suite(cases, repeat=3, verbose=True):
+    """Run benchmark cases, each in a new python process.
+
+    Args:
+        cases (list): The benchmark cases.
+        repeat (int): The number of times to run each case.
+        verbose (bool): Print the results as they are measured.
+
+    Returns:
+        A dict of the results and the versions of the software used.
+    """
+    import matplotlib
+
+    sys.path.insert(0, repo_dir)
+    from bapt import __version__
+
+    results = {}
+    devnull = open(os.devnull, 'w')
+    for case in cases:
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--run-case',
+             json.dumps(case), '--repeat', str(repeat)], stderr=devnull)
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        results[case['name']] = result
+        if verbose:
+            print('{:<45} {:9.3f} s {:9.1f} MB'.format(
+                case['name'], result['time']['total'],
+                result['peak_memory'] or 0))
+            sys.stdout.flush()
+    devnull.close()
+
+    return {'bapt': __version__, 'matplotlib': matplotlib.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(), 'repeat': repeat,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+
+def compare(results, baseline, threshold=0.1):
+    """Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): The benchmark results, as returned by
+            :func:`run_suite`.
+        baseline (dict): The baseline results.
+        threshold (float): The fractional increase in time or memory counted
+            as a regression.
+
+    Returns:
+        A list of ``(case, quantity, baseline, result)`` tuples for each
+        regression.
+    """
+    regressions = []
+    print('{:<45} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}'.format(
+        'case', 'time (s)', 'baseline', 'change', 'mem (MB)', 'baseline',
+        'change'))
+    for name, result in sorted(results['results'].items()):
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]
+        row = [name]
+        for quantity, new, old in [
+                ('time', result['time']['total'], base['time']['total']),
+                ('peak_memory', result['peak_memory'], base['peak_memory'])]:
+            if not new or not old:
+                row += [new or 0, old or 0, '']
+                continue
+            change = new / old - 1
+            row += [new, old, '{:+.0%}'.format(change)]
+            if change > threshold:
+                regressions.append((name, quantity, old, new))
+        print('{:<45} {:10.3f} {:10.3f} {:>8} {:10.1f} {:10.1f} {:>8}'.format(
+            *row))
+
+    for name, quantity, old, new in regressions:
+        print('REGRESSION: {} {} {:.3f} -> {:.3f}'.format(name, quantity, old,
+                                                          new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bapt.')
+    parser.add_argument('--sizes', default=','.join(map(str, default_sizes)),
+                        help='Comma separated numbers of compounds.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of times each case is run.')
+    parser.add_argument('--filter', default=None,
+                        help='Only run cases with names containing this.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', default=None,
+                        help='Compare against the results in this file.')
+    parser.add_argument('--save-baseline', dest='save_baseline',
+                        default=None,
+                        help='Also write the results to this baseline file.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Fractional slowdown counted as a regression.')
+    parser.add_argument('--run-case', dest='run_case', default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        sys.path.insert(0, repo_dir)
+        print(json.dumps(run_case(json.loads(args.run_case),
+                                  repeat=args.repeat)))
+        return
+
+    cases = get_cases([int(n) for n in args.sizes.split(',')])
+    if args.filter:
+        cases = [c for c in cases if args.filter in c['name']]
+    results = run_suite(cases, repeat=args.repeat)
+
+    for filename in (args.output, args.save_baseline):
+        if filename:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, threshold=args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -24,16 +24,20 @@ Get yourself some nice band alignment diagrams
         'Intended Audience :: Science/Research',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Scientific/Engineering :: Chemistry',
         'Topic :: Scientific/Engineering :: Physics'
         ],
     keywords='chemistry dft band alignment ionisation potential electron',
-    packages=find_packages(),
-    install_requires=['matplotlib', 'PyYAML>=5.1'],
+    packages=find_packages(exclude=['tests', 'tests.*']),
+    python_requires='>=3.7',
+    install_requires=['matplotlib', 'numpy', 'PyYAML>=5.1'],
+    extras_require={'parquet': ['pyarrow']},
     entry_points={'console_scripts': ['bapt = bapt.cli:main']}
 )
@@ -45,3 +45,16 @@ def release(ctx):
         data=json.dumps(payload),
         headers={"Authorization": "token " + os.environ["GITHUB_TOKEN"]})
     print(response.text)
+
+
+@task
+def benchmark(ctx, sizes="5,50,500,5000", repeat=3,
+              output="benchmarks/results.json",
+              baseline="benchmarks/baseline.json", save_baseline=False):
+    cmd = "python benchmarks/bench.py --sizes {} --repeat {} -o {}".format(
+        sizes, repeat, output)
+    if save_baseline:
+        cmd += " --save-baseline {}".format(baseline)
+    elif os.path.exists(baseline):
+        cmd += " --baseline {}".format(baseline)
+    ctx.run(cmd)
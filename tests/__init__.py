@@ -0,0 +1,24 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+
+examples_dir = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'examples')
+
+
+def get_example(name):
+    """Load the compounds and settings of one of the example config files.
+
+    Args:
+        name (str): The name of the example, e.g. ``'gradients'``.
+
+    Returns:
+        The compound data and settings as a tuple of ``(data, settings)``.
+    """
+    from bapt import read_config, add_band_offsets
+
+    data, settings = read_config(os.path.join(examples_dir, name + '.yaml'))
+    add_band_offsets(data)
+    return data, settings
@@ -0,0 +1,99 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from bapt.animation import AlignmentSweep, get_sweep_frames
+
+from . import get_example
+
+
+class GetSweepFramesTest(unittest.TestCase):
+
+    data = [{'name': 'A', 'ip': 7., 'ea': 4.}, {'name': 'B', 'ip': 6.,
+                                                'ea': 3.}]
+
+    def test_frames(self):
+        # values are given per compound, or shared by all compounds
+        frames = get_sweep_frames(self.data, ip=[[7., 6.5], [7.5, 6.]],
+                                  ea=[3.5, 3.])
+        self.assertEqual(frames, [
+            [{'name': 'A', 'ip': 7., 'ea': 3.5},
+             {'name': 'B', 'ip': 6.5, 'ea': 3.5}],
+            [{'name': 'A', 'ip': 7.5, 'ea': 3.},
+             {'name': 'B', 'ip': 6., 'ea': 3.}]])
+        self.assertEqual(self.data[0]['ip'], 7.)
+
+    def test_mismatched_frames(self):
+        with self.assertRaises(ValueError):
+            get_sweep_frames(self.data, ip=[7., 7.5], ea=[3., 3.5, 4.])
+
+
+class AlignmentSweepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        data, self.settings = get_example('gradients')
+        self.frames = get_sweep_frames(
+            data, ip=[[d['ip'] + shift for d in data]
+                      for shift in (0, 0.5, 1.5)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_frames(self):
+        # each frame is drawn as if its plot was drawn from scratch, on the
+        # same energy scale
+        import numpy as np
+        from PIL import Image
+        from bapt.figure import AlignmentFigure
+        from bapt.plotting import style_context
+
+        pattern = os.path.join(self.directory, 'frame_{:02d}.png')
+        with AlignmentSweep(self.frames, dpi=30, **self.settings) as sweep:
+            self.assertEqual(len(sweep), 3)
+            self.assertEqual(len(set(layout.ylim for layout in
+                                     sweep.layouts)), 1)
+            files = sweep.save_frames(pattern)
+            self.assertEqual(sweep.frame, 0)
+            with style_context(sweep._fonts):
+                bbox = sweep._get_bbox(0.1)
+
+        self.assertEqual(files, [pattern.format(i) for i in range(3)])
+        for filename, layout in zip(files, sweep.layouts):
+            expected = os.path.join(self.directory, 'expected.png')
+            with AlignmentFigure.from_layout(layout, dpi=30) as figure:
+                with style_context(figure._fonts):
+                    figure.figure.savefig(expected, dpi=30, bbox_inches=bbox)
+            with Image.open(filename) as image, \
+                    Image.open(expected) as other:
+                np.testing.assert_array_equal(np.asarray(image),
+                                              np.asarray(other), filename)
+
+    def test_animation(self):
+        from PIL import Image
+
+        filename = os.path.join(self.directory, 'sweep.gif')
+        with AlignmentSweep(self.frames, dpi=30, **self.settings) as sweep:
+            sweep.save_animation(filename, fps=5)
+            with self.assertRaises(ValueError):
+                sweep.save_animation(os.path.join(self.directory, 'a.pdf'))
+            frame = sweep.save_frames(os.path.join(self.directory,
+                                                   'frame_{}.png'))[0]
+
+        with Image.open(filename) as image, Image.open(frame) as first:
+            self.assertEqual(image.n_frames, 3)
+            self.assertEqual(image.size, first.size)
+            self.assertEqual(image.info['duration'], 200)
+
+    def test_incompatible_frames(self):
+        frames = [self.frames[0], [dict(d, fade=True)
+                                   for d in self.frames[1]]]
+        with self.assertRaises(ValueError):
+            AlignmentSweep(frames, dpi=30, **self.settings)
+        with self.assertRaises(ValueError):
+            AlignmentSweep([], dpi=30)
@@ -0,0 +1,90 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from bapt.batch import expand_files, get_output_filename, render_batch
+
+from . import examples_dir
+
+
+class ExpandFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_patterns(self):
+        jobs = expand_files([os.path.join(examples_dir, 'f*.yaml'),
+                             'missing.yaml'])
+        self.assertEqual(jobs, [
+            (os.path.join(examples_dir, 'fade.yaml'), None),
+            (os.path.join(examples_dir, 'flat.yaml'), None),
+            ('missing.yaml', None)])
+
+    def test_manifest(self):
+        # config files are relative to the manifest, output files are not
+        manifest = os.path.join(self.directory, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('# configs\n\nbasic.yaml  out/basic.png\nflat.yaml\n')
+        jobs = expand_files(['fade.yaml'], manifest=manifest)
+        self.assertEqual(jobs, [
+            ('fade.yaml', None),
+            (os.path.join(self.directory, 'basic.yaml'), 'out/basic.png'),
+            (os.path.join(self.directory, 'flat.yaml'), None)])
+
+    def test_output_filename(self):
+        self.assertEqual(get_output_filename('configs/basic.yaml', fmt='png'),
+                         os.path.join('configs', 'basic.png'))
+        self.assertEqual(get_output_filename('configs/basic.yaml',
+                                             output_dir='plots'),
+                         os.path.join('plots', 'basic.pdf'))
+
+
+class RenderBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_render_batch(self):
+        from PIL import Image
+
+        broken = os.path.join(self.directory, 'broken.yaml')
+        with open(broken, 'w') as f:
+            f.write('compounds:\n    - name: ZnO\n')
+        manifest = os.path.join(self.directory, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('{} {}\n'.format(os.path.join(examples_dir, 'basic.yaml'),
+                                     os.path.join(self.directory, 'a.png')))
+            f.write('{} {}\n'.format(os.path.join(examples_dir, 'flat.yaml'),
+                                     os.path.join(self.directory, 'b.png')))
+            f.write('broken.yaml {}\n'.format(
+                os.path.join(self.directory, 'broken.png')))
+
+        # each job can have its own dpi
+        jobs = [job + (dpi,) for job, dpi in zip(
+            expand_files(None, manifest=manifest), (50, 100, 50))]
+        results = dict((filename, (output, error)) for filename, output,
+                       error, _ in render_batch(jobs, processes=1))
+
+        self.assertEqual(len(results), 3)
+        self.assertIsNotNone(results[broken][1])
+        self.assertFalse(os.path.exists(results[broken][0]))
+        sizes = []
+        for _, (output, error) in sorted(results.items()):
+            if output.endswith('broken.png'):
+                continue
+            self.assertIsNone(error, output)
+            with Image.open(output) as image:
+                sizes.append((os.path.basename(output),
+                              round(image.info['dpi'][0])))
+        self.assertEqual(sorted(sizes), [('a.png', 50), ('b.png', 100)])
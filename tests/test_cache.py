@@ -0,0 +1,97 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from bapt.cache import RenderCache, get_cache_key
+
+
+class GetCacheKeyTest(unittest.TestCase):
+
+    data = [{'name': 'ZnO', 'ip': 7.7, 'ea': 4.4},
+            {'name': 'MOF-5', 'ip': 7.3, 'ea': 2.7}]
+    properties = {'height': 5, 'show_ea': True}
+
+    def test_same_inputs(self):
+        self.assertEqual(
+            get_cache_key(self.data, self.properties, 'png'),
+            get_cache_key([dict(d) for d in self.data],
+                          dict(self.properties), 'PNG'))
+
+    def test_changed_inputs(self):
+        key = get_cache_key(self.data, self.properties, 'png')
+        changed = [dict(self.data[0], ip=7.8), self.data[1]]
+        self.assertNotEqual(
+            key, get_cache_key(changed, self.properties, 'png'))
+        self.assertNotEqual(
+            key, get_cache_key(self.data, {'height': 5}, 'png'))
+        self.assertNotEqual(
+            key, get_cache_key(self.data, self.properties, 'pdf'))
+        self.assertNotEqual(
+            key, get_cache_key(self.data, self.properties, 'png', dpi=100))
+
+
+class RenderCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = RenderCache(os.path.join(self.directory, 'cache'),
+                                 max_size=2500 / (1024. * 1024.))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'wb') as f:
+            f.write(content)
+        return filename
+
+    def _read(self, filename):
+        with open(filename, 'rb') as f:
+            return f.read()
+
+    def test_miss(self):
+        output = os.path.join(self.directory, 'out.png')
+        self.assertFalse(self.cache.get('missing', output))
+        self.assertFalse(os.path.exists(output))
+
+    def test_hit(self):
+        self.cache.put('a', self._write('figure.png', b'a' * 100))
+        output = os.path.join(self.directory, 'out.png')
+        self.assertTrue(self.cache.get('a', output))
+        self.assertEqual(self._read(output), b'a' * 100)
+
+        # figures are keyed on their format as well
+        self.assertFalse(self.cache.get(
+            'a', os.path.join(self.directory, 'out.pdf')))
+
+    def test_output_is_a_copy(self):
+        self.cache.put('a', self._write('figure.png', b'a' * 100))
+        output = os.path.join(self.directory, 'out.png')
+        self.cache.get('a', output)
+        self.assertEqual(os.stat(output).st_nlink, 1)
+
+        # writing over the output must not change the cached figure
+        with open(output, 'wb') as f:
+            f.write(b'draft')
+        self.assertTrue(self.cache.get('a', output))
+        self.assertEqual(self._read(output), b'a' * 100)
+
+    def test_eviction(self):
+        for i, key in enumerate('ab'):
+            self.cache.put(key, self._write(key + '.png', key.encode() * 1000))
+            os.utime(self.cache._path(key, 'png'), (1000 * i, 1000 * i))
+
+        # a was stored first, but used more recently than b
+        output = os.path.join(self.directory, 'out.png')
+        self.assertTrue(self.cache.get('a', output))
+        self.cache.put('c', self._write('c.png', b'c' * 1000))
+
+        self.assertTrue(self.cache.get('a', output))
+        self.assertTrue(self.cache.get('c', output))
+        self.assertFalse(self.cache.get('b', output))
@@ -0,0 +1,61 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import subprocess
+import sys
+import unittest
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        # matplotlib and numpy are only imported once something is plotted
+        code = ('import sys, bapt, bapt.cli; print(sorted(m for m in '
+                'sys.modules if m.split(".")[0] in ("matplotlib", '
+                '"numpy")))')
+        env = dict(os.environ, PYTHONPATH=package_dir)
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         env=env, cwd=package_dir)
+        self.assertEqual(output.strip(), b'[]')
+
+
+class ArgumentsTest(unittest.TestCase):
+
+    def assertRejected(self, args, message):
+        import io
+        from contextlib import redirect_stdout
+        from unittest import mock
+        from bapt.cli import main
+
+        out = io.StringIO()
+        with mock.patch('sys.argv', ['bapt'] + args.split()), \
+                redirect_stdout(out):
+            with self.assertRaises(SystemExit):
+                main()
+        self.assertEqual(out.getvalue().strip(), message)
+
+    def test_ignored_flags(self):
+        # flags that would otherwise be silently ignored are rejected
+        for args, message in (
+                ('-f a.yaml --tiled --page-size 5',
+                 'ERROR: --page-size and --tiled cannot be used together.'),
+                ('-f a.yaml --preview --direct-svg',
+                 'ERROR: --preview and --direct-svg cannot be used '
+                 'together.'),
+                ('-f a.yaml --tiled --cache-dir cache',
+                 'ERROR: --cache-dir cannot be used with --tiled.'),
+                ('-f a.yaml --watch --group-by family',
+                 'ERROR: --watch and --group-by cannot be used together.'),
+                ('--batch a.yaml --preview',
+                 'ERROR: --preview cannot be used with --batch.'),
+                ('-f a.yaml --screen --page-size 5',
+                 'ERROR: --page-size cannot be used with --screen.'),
+                ('--manifest jobs.txt --formats png,pdf',
+                 'ERROR: --formats cannot be used with --manifest.'),
+                ('-f a.yaml --watch --cache-dir cache',
+                 'ERROR: --cache-dir cannot be used with --watch.')):
+            self.assertRejected(args, message)
@@ -0,0 +1,168 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from bapt.config import ConfigCache, load_config, load_yaml
+
+# documents built from the parser events, rather than by PyYAML
+documents = [
+    """
+    compounds:
+        - {name: ZnO, ip: 7.7, ea: 4.4, fade: true}
+        - name: 'MOF-5'
+          ip: 9
+          ea: .27e1
+          band_gap: ~
+    settings: {height: 5, colours: [red, '#ff0000'], title: "a: b"}
+    """,
+    """
+    base: &base {ip: 7.7, ea: 4.4, fade: no}
+    other: &other {ip: 1, colour: r}
+    compounds:
+        - <<: *base
+          name: ZnO
+        - name: SnO2
+          ea: 4.5
+          <<: [*other, *base]
+        - &name TiO2
+        - *name
+    dates: [2017-10-19, 0x1f, 017, -.inf, .nan, 1_000]
+    """,
+    "[1, [2, [3, {a: [4]}]]]",
+    "just a string",
+    "",
+]
+
+# documents left to PyYAML
+unsupported = [
+    "!!set {a, b}",
+    "? [1, 2]\n: 3",
+    "a: &a [1]\nb:\n    <<: *a",
+    "--- 1\n--- 2",
+]
+
+
+class LoadYAMLTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, text):
+        import textwrap
+
+        filename = os.path.join(self.directory, 'config.yaml')
+        with open(filename, 'w') as f:
+            f.write(textwrap.dedent(text))
+        return filename
+
+    def _safe_load(self, filename):
+        import yaml
+
+        with open(filename) as f:
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                return type(e)
+
+    def test_documents(self):
+        import math
+
+        for text in documents:
+            filename = self._write(text)
+            with mock.patch('yaml.load', side_effect=AssertionError):
+                loaded = load_yaml(filename)
+            expected = self._safe_load(filename)
+            if isinstance(expected, dict) and 'dates' in expected:
+                # nan is not equal to itself
+                self.assertTrue(math.isnan(loaded['dates'].pop(4)))
+                self.assertTrue(math.isnan(expected['dates'].pop(4)))
+            self.assertEqual(loaded, expected, text)
+
+    def test_anchors(self):
+        # aliases refer to the same object, as with PyYAML
+        filename = self._write("a: &a [1]\nb: *a")
+        loaded = load_yaml(filename)
+        self.assertIs(loaded['a'], loaded['b'])
+
+    def test_unsupported(self):
+        import yaml
+
+        for text in unsupported:
+            filename = self._write(text)
+            expected = self._safe_load(filename)
+            if isinstance(expected, type):
+                with self.assertRaises(expected, msg=text):
+                    load_yaml(filename)
+            else:
+                self.assertEqual(load_yaml(filename), expected, text)
+        self.assertTrue(issubclass(self._safe_load(self._write(
+            unsupported[1])), yaml.constructor.ConstructorError))
+
+
+class ConfigCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.filename = os.path.join(self.directory, 'config.yaml')
+        self._write('a: 1\n', 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, content, mtime):
+        with open(self.filename, 'w') as f:
+            f.write(content)
+        os.utime(self.filename, (mtime, mtime))
+
+    def _load(self):
+        # the config and whether it was parsed rather than taken from the
+        # cache
+        with mock.patch('bapt.config.load_yaml',
+                        side_effect=load_yaml) as parse:
+            config = load_config(self.filename, cache_dir=self.cache_dir)
+        return config, parse.called
+
+    def test_unchanged(self):
+        self.assertEqual(self._load(), ({'a': 1}, True))
+        self.assertEqual(self._load(), ({'a': 1}, False))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_touched(self):
+        # the contents are hashed when the modification time changes
+        self._load()
+        self._write('a: 1\n', 10)
+        self.assertEqual(self._load(), ({'a': 1}, False))
+
+    def test_changed(self):
+        # a change that keeps the size and modification time is missed
+        self._load()
+        self._write('a: 2\n', 0)
+        self.assertEqual(self._load(), ({'a': 1}, False))
+        self._write('a: 2\n', 10)
+        self.assertEqual(self._load(), ({'a': 2}, True))
+        self.assertEqual(self._load(), ({'a': 2}, False))
+
+    def test_version(self):
+        self._load()
+        with mock.patch('bapt.__version__', 'other'):
+            self.assertEqual(self._load(), ({'a': 1}, True))
+
+    def test_corrupt(self):
+        self._load()
+        cache = ConfigCache(self.cache_dir)
+        with open(cache._path(self.filename), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(self._load(), ({'a': 1}, True))
+        self.assertEqual(os.listdir(self.cache_dir),
+                         [os.path.basename(cache._path(self.filename))])
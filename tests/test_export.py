@@ -0,0 +1,85 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from bapt.export import get_format, get_output_files, get_save_dpi
+
+from . import get_example
+
+
+class OutputFilesTest(unittest.TestCase):
+
+    def test_format(self):
+        self.assertEqual(get_format('plots/alignment.PNG'), 'png')
+        self.assertEqual(get_format('alignment'), '')
+
+    def test_output_files(self):
+        self.assertEqual(get_output_files('alignment.pdf'), ['alignment.pdf'])
+        self.assertEqual(
+            get_output_files('plots/alignment.pdf', ['png', ' .SVG', 'png']),
+            ['plots/alignment.png', 'plots/alignment.svg'])
+
+    def test_save_dpi(self):
+        self.assertEqual(get_save_dpi('png', dpi=300, raster_dpi=100), 300)
+        self.assertEqual(get_save_dpi('pdf', dpi=300, raster_dpi=100), 100)
+        self.assertEqual(get_save_dpi('svg', dpi=300), 300)
+
+
+class SaveFigureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _svg_image_width(self, filename):
+        # the width in pixels of the rasterized bars embedded in an svg
+        import base64
+        import io
+        from PIL import Image
+
+        with open(filename) as f:
+            data = re.search(r'data:image/png;base64,([^"]*)', f.read())
+        with Image.open(io.BytesIO(base64.b64decode(data.group(1)))) as image:
+            return image.size[0]
+
+    def test_formats(self):
+        # the plot is drawn once and saved as if each format was saved
+        # separately
+        import numpy as np
+        from PIL import Image
+        from bapt.figure import AlignmentFigure
+        from bapt.plotting import style_context
+
+        data, settings = get_example('gradients')
+        files = [os.path.join(self.directory, 'alignment.' + fmt)
+                 for fmt in ('png', 'jpg', 'pdf', 'svg')]
+        with AlignmentFigure(data, dpi=60, **settings) as figure:
+            self.assertEqual(figure.save(files, raster_dpi=20), files)
+            expected = os.path.join(self.directory, 'expected')
+            with style_context(figure._fonts):
+                figure.figure.savefig(expected + '.png', dpi=60,
+                                      bbox_inches='tight')
+                figure.figure.savefig(expected + '.svg', dpi=60,
+                                      bbox_inches='tight')
+
+        for filename in files:
+            self.assertGreater(os.path.getsize(filename), 0, filename)
+        with Image.open(files[0]) as image, \
+                Image.open(files[1]) as jpeg, \
+                Image.open(expected + '.png') as other:
+            np.testing.assert_array_equal(np.asarray(image),
+                                          np.asarray(other))
+            self.assertEqual(jpeg.size, image.size)
+
+        # the bars in vector formats are rasterized at raster_dpi
+        self.assertAlmostEqual(
+            self._svg_image_width(files[3]) * 3,
+            self._svg_image_width(expected + '.svg'), delta=3)
@@ -0,0 +1,92 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from bapt.figure import AlignmentFigure, render_alignment
+
+from . import get_example
+
+
+class AlignmentFigureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data, self.settings = get_example('basic')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_not_pyplot(self):
+        import matplotlib.pyplot as plt
+
+        figures = plt.get_fignums()
+        with AlignmentFigure(self.data, dpi=50, **self.settings):
+            self.assertEqual(plt.get_fignums(), figures)
+
+    def test_style_scope(self):
+        # the plot style is only in effect while the figure is drawn and
+        # saved
+        from matplotlib import RcParams, rcParams
+        from bapt.plotting import get_rc_params
+
+        # validated, as the settings are stored
+        style = dict(RcParams(get_rc_params()))
+        before = dict((key, rcParams[key]) for key in style)
+        self.assertNotEqual(before, style)
+
+        saved = []
+        with AlignmentFigure(self.data, dpi=50, **self.settings) as figure:
+            self.assertEqual(before, dict((key, rcParams[key])
+                                          for key in style))
+            savefig = figure.figure.savefig
+
+            def record(*args, **kwargs):
+                saved.append(dict((key, rcParams[key]) for key in style))
+                return savefig(*args, **kwargs)
+
+            with mock.patch.object(figure.figure, 'savefig',
+                                   side_effect=record):
+                figure.save(os.path.join(self.directory, 'plot.pdf'))
+
+        self.assertEqual(saved, [style])
+        self.assertEqual(before, dict((key, rcParams[key]) for key in style))
+
+    def test_close(self):
+        filename = os.path.join(self.directory, 'plot.png')
+        with AlignmentFigure(self.data, dpi=50, **self.settings) as figure:
+            self.assertEqual(figure.save(filename), [filename])
+        self.assertIsNone(figure.figure)
+        self.assertIsNone(figure.axes)
+        with self.assertRaises(ValueError):
+            figure.save(filename)
+        with self.assertRaises(ValueError):
+            figure.to_bytes()
+        figure.close()
+
+    def test_draft(self):
+        # drafts are cropped to the extents computed from the layout, which
+        # are close to those found by drawing the figure
+        from PIL import Image
+
+        sizes = []
+        for draft in (False, True):
+            filename = os.path.join(self.directory, 'plot.png')
+            with AlignmentFigure(self.data, dpi=100, draft=draft,
+                                 **self.settings) as figure:
+                figure.save(filename)
+            with Image.open(filename) as image:
+                sizes.append(image.size)
+        for full, draft in zip(*sizes):
+            self.assertAlmostEqual(full, draft, delta=5)
+
+    def test_render_alignment(self):
+        image = render_alignment(self.data, fmt='png', dpi=50,
+                                 **self.settings)
+        self.assertTrue(image.startswith(b'\x89PNG'))
@@ -0,0 +1,72 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import unittest
+
+from bapt.gradients import GradientCache, texture_size
+
+
+class GradientCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = GradientCache(max_size=2)
+
+    def test_colormap_hits(self):
+        # colours are keyed on their value, not how they are written
+        cmap = self.cache.get_colormap('r', '#0000ff')
+        self.assertIs(self.cache.get_colormap((1, 0, 0), 'b'), cmap)
+        self.assertIsNot(self.cache.get_colormap('r', 'b', N=100), cmap)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['colormap_hits'], 1)
+        self.assertEqual(stats['colormap_misses'], 2)
+        self.assertEqual(stats['colormaps'], 2)
+
+    def test_colormap_eviction(self):
+        # the least recently used colormap is evicted
+        red = self.cache.get_colormap('r', 'w')
+        green = self.cache.get_colormap('g', 'w')
+        self.cache.get_colormap('r', 'w')
+        self.cache.get_colormap('b', 'w')
+
+        self.assertEqual(self.cache.stats()['colormaps'], 2)
+        self.assertIs(self.cache.get_colormap('r', 'w'), red)
+        self.assertIsNot(self.cache.get_colormap('g', 'w'), green)
+        self.assertEqual(self.cache.stats()['colormap_misses'], 4)
+
+    def test_textures(self):
+        cmap = self.cache.get_colormap('r', 'w')
+        texture = self.cache.get_texture(cmap)
+        self.assertEqual(texture.shape, (texture_size, 4))
+        self.assertFalse(texture.flags.writeable)
+        self.assertIs(self.cache.get_texture(cmap), texture)
+
+        for colour in ('g', 'b'):
+            self.cache.get_texture(self.cache.get_colormap(colour, 'w'))
+        self.assertEqual(self.cache.stats()['textures'], 2)
+        self.assertIsNot(self.cache.get_texture(
+            self.cache.get_colormap('r', 'w')), texture)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['texture_hits'], 1)
+        self.assertEqual(stats['texture_misses'], 4)
+
+    def test_uncached_texture(self):
+        # colormaps made outside of the cache are sampled every time
+        from matplotlib.colors import LinearSegmentedColormap
+
+        cmap = LinearSegmentedColormap.from_list('rw', ['r', 'w'])
+        self.assertEqual(self.cache.get_texture(cmap).tolist(),
+                         self.cache.get_texture(
+                             self.cache.get_colormap('r', 'w', N=256))
+                         .tolist())
+        self.assertEqual(self.cache.stats()['texture_uncached'], 1)
+
+        with self.assertRaises(ValueError):
+            self.cache.get_texture(cmap, interpolation='nearest')
+
+    def test_clear(self):
+        self.cache.get_texture(self.cache.get_colormap('r', 'w'))
+        self.cache.clear()
+        self.assertEqual(set(self.cache.stats().values()), {0})
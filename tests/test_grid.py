@@ -0,0 +1,125 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from bapt.grid import AlignmentGrid, get_grid_layouts, get_groups, read_groups
+
+from . import get_example
+
+
+def _groups():
+    # the compounds of the basic example, in groups of two
+    data, _ = get_example('basic')
+    return get_groups([dict(d, group='G{}'.format(i // 2))
+                       for i, d in enumerate(data)])
+
+
+class GetGroupsTest(unittest.TestCase):
+
+    def test_groups(self):
+        data = [{'name': 'A', 'family': 'oxides'},
+                {'name': 'B', 'family': 'MOFs'},
+                {'name': 'C', 'family': 'oxides'}]
+        self.assertEqual(get_groups(data, key='family'), [
+            ('oxides', [data[0], data[2]]), ('MOFs', [data[1]])])
+
+    def test_missing(self):
+        with self.assertRaises(ValueError):
+            get_groups([{'name': 'A', 'group': 1}, {'name': 'B'}])
+
+    def test_read_groups(self):
+        # band offsets are relative to the first compound of each group
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'groups.yaml')
+            with open(filename, 'w') as f:
+                f.write('compounds:\n'
+                        '    - {name: A, band_gap: 3, vbo: 0, group: x}\n'
+                        '    - {name: B, band_gap: 2, vbo: 0, group: y}\n'
+                        '    - {name: C, band_gap: 3, vbo: 1, group: y}\n'
+                        'settings: {show_axis: true}\n')
+            groups, settings = read_groups(filename)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(settings, {'show_axis': True})
+        self.assertEqual([(g, [(d['name'], d['cbo']) for d in data])
+                          for g, data in groups],
+                         [('x', [('A', 0)]), ('y', [('B', 0), ('C', 2)])])
+
+
+class GetGridLayoutsTest(unittest.TestCase):
+
+    def test_share_energy(self):
+        groups = _groups()
+        ylims = [layout.ylim for layout in get_grid_layouts(groups)]
+        self.assertGreater(len(set(ylims)), 1)
+        ylims = [layout.ylim for layout in get_grid_layouts(
+            groups, share_energy=True)]
+        self.assertEqual(len(set(ylims)), 1)
+
+    def test_mixed_alignment(self):
+        groups = _groups()
+        offsets = [{'name': 'A', 'vbo': 0, 'band_gap': 3}]
+        with self.assertRaises(ValueError):
+            get_grid_layouts(groups + [('offsets', offsets)],
+                             share_energy=True)
+
+
+class AlignmentGridTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_panels(self):
+        # three panels are laid out in a grid of two columns, and only the
+        # first panel in each row has energy labels
+        groups = _groups()
+        with AlignmentGrid(groups, share_energy=True, show_axis=True,
+                           dpi=30) as grid:
+            self.assertEqual(len(grid.axes), 3)
+            positions = [ax.get_position() for ax in grid.axes]
+            self.assertLess(positions[0].x1, positions[1].x0)
+            self.assertAlmostEqual(positions[0].y0, positions[1].y0)
+            self.assertLess(positions[2].x1, positions[1].x0)
+            self.assertLess(positions[2].y1, positions[0].y0)
+
+            labelled = [any(label.get_visible() and label.get_text()
+                            for label in ax.get_yticklabels())
+                        for ax in grid.axes]
+            self.assertEqual(labelled, [True, False, True])
+            self.assertEqual(
+                [[text.get_text() for text in ax.texts
+                  if text.get_text().startswith('G')] for ax in grid.axes],
+                [['G0'], ['G1'], ['G2']])
+
+    def test_save(self):
+        # the grid is cropped like a figure saved with bbox_inches='tight'
+        from PIL import Image
+        from bapt.plotting import style_context
+
+        files = [os.path.join(self.directory, 'grid.' + fmt)
+                 for fmt in ('png', 'pdf')]
+        expected = os.path.join(self.directory, 'expected.png')
+        with AlignmentGrid(_groups(), columns=3, dpi=30) as grid:
+            self.assertEqual(grid.save(files), files)
+            with style_context(grid._fonts):
+                grid.figure.savefig(expected, dpi=30, bbox_inches='tight')
+            self.assertTrue(grid.to_bytes('png').startswith(b'\x89PNG'))
+
+        with Image.open(files[0]) as image, Image.open(expected) as other:
+            for size, expected_size in zip(image.size, other.size):
+                self.assertAlmostEqual(size, expected_size, delta=2)
+        self.assertGreater(os.path.getsize(files[1]), 0)
+
+    def test_no_groups(self):
+        with self.assertRaises(ValueError):
+            AlignmentGrid([])
@@ -0,0 +1,120 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import json
+import pickle
+import unittest
+
+from bapt.layout import (Layout, default_detail, get_detail, get_extents,
+                         get_layout)
+
+from . import get_example
+
+examples = ('basic', 'fade', 'flat', 'gradients', 'offset')
+
+
+class LayoutSerializationTest(unittest.TestCase):
+
+    def test_dict_round_trip(self):
+        for name in examples:
+            data, settings = get_example(name)
+            layout = get_layout(data, **settings)
+            d = json.loads(json.dumps(layout.to_dict()))
+            self.assertEqual(Layout.from_dict(d).to_dict(), layout.to_dict(),
+                             name)
+
+    def test_pickle_round_trip(self):
+        for name in examples:
+            data, settings = get_example(name)
+            layout = get_layout(data, **settings)
+            loaded = pickle.loads(pickle.dumps(layout))
+            self.assertEqual(loaded.to_dict(), layout.to_dict(), name)
+            for array in Layout._arrays:
+                self.assertEqual(getattr(loaded, array).dtype,
+                                 getattr(layout, array).dtype)
+
+
+class GetExtentsTest(unittest.TestCase):
+
+    def test_tight_bbox(self):
+        # the extents are measured from font metrics rather than a renderer,
+        # so are within a few pixels of the bounding box of the figure
+        from bapt.export import get_tight_bbox
+        from bapt.figure import AlignmentFigure
+        from bapt.plotting import style_context
+
+        for name in examples:
+            data, settings = get_example(name)
+            for options in ({}, {'show_axis': True}):
+                layout = get_layout(data, **dict(settings, **options))
+                with AlignmentFigure.from_layout(layout, dpi=100) as figure:
+                    with style_context(figure._fonts):
+                        bbox = get_tight_bbox(figure.figure, dpi=100)
+                for extent, tight in zip(get_extents(layout), bbox.extents):
+                    self.assertAlmostEqual(extent, tight, delta=0.05,
+                                           msg=(name, options))
+
+
+def _dense(n, offsets=False):
+    # many faded compounds, too narrow for their labels to be read
+    if offsets:
+        return [{'name': 'C{}'.format(i), 'vbo': (i % 5) / 5.,
+                 'band_gap': 3 + (i % 3) / 3., 'fade': True}
+                for i in range(n)]
+    return [{'name': 'C{}'.format(i), 'ip': 6 + (i % 7) / 7.,
+             'ea': 3 + (i % 5) / 5., 'fade': True} for i in range(n)]
+
+
+class DetailTest(unittest.TestCase):
+
+    def test_get_detail(self):
+        self.assertEqual(get_detail(), default_detail)
+        self.assertEqual(set(get_detail(False).values()), {0})
+        self.assertEqual(get_detail({'names': 1})['names'], 1)
+        with self.assertRaises(ValueError):
+            get_detail({'colour': 1})
+
+    def test_dense(self):
+        # nothing but the bars and their edges are drawn
+        from bapt import add_band_offsets
+
+        for offsets in (False, True):
+            data = add_band_offsets(_dense(300, offsets=offsets))
+            layout = get_layout(data, width=10, show_ea=True)
+            self.assertFalse(layout.gradients)
+            self.assertEqual(len(layout.arrows), 0)
+            self.assertEqual(len(layout.labels), 0)
+            self.assertEqual(len(layout.fades), 0)
+            self.assertEqual(len(layout.bars), 2 * len(data))
+
+            full = get_layout(data, width=10, show_ea=True, detail=False)
+            self.assertTrue(full.gradients)
+            self.assertGreater(len(full.arrows), 0)
+            self.assertGreater(len(full.labels), len(data))
+
+            # the fades are merged into the fills of the bars
+            faded = get_layout(data, width=10, detail={'fades': 0})
+            self.assertGreater(len(faded.fades), 0)
+            self.assertNotEqual(faded.bar_fills, layout.bar_fills)
+
+    def test_thresholds(self):
+        # each detail is only drawn if the bars are at least as wide as its
+        # threshold, in inches
+        from bapt.layout import subplot
+
+        data, settings = get_example('flat')
+        layout = get_layout(data, **settings)
+        bar_inches = (layout.bar_width / (layout.xlim[1] - layout.xlim[0]) *
+                      (subplot['right'] - subplot['left']) * layout.width)
+        shown = get_layout(data, detail={'values': bar_inches * 1.01},
+                           **settings)
+        self.assertEqual(len(shown.arrows), len(layout.arrows))
+        self.assertEqual([t for t in shown.label_text if t.endswith(' eV')],
+                         [])
+        for compound in data:
+            self.assertIn(compound['name'], shown.label_text)
+
+        shown = get_layout(data, detail={'values': bar_inches * 0.99},
+                           **settings)
+        self.assertEqual(shown.to_dict(), layout.to_dict())
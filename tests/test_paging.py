@@ -0,0 +1,63 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from bapt.paging import get_energy_range, get_page_filename, save_pages
+
+from . import get_example
+
+
+class GetEnergyRangeTest(unittest.TestCase):
+
+    def test_vacuum(self):
+        data, _ = get_example('basic')
+        self.assertEqual(get_energy_range(data), {'emin': -11})
+
+    def test_offsets(self):
+        data = [{'name': 'A', 'vbo': 0., 'band_gap': 3.},
+                {'name': 'B', 'vbo': -0.5, 'band_gap': 4.}]
+        self.assertEqual(get_energy_range(data), {'emin': -2.5, 'emax': 5.5})
+
+
+class SavePagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data, _ = get_example('basic')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_page_filename(self):
+        self.assertEqual(get_page_filename('plots/alignment.png', 12),
+                         os.path.join('plots', 'alignment-012.png'))
+
+    def test_numbered_files(self):
+        from PIL import Image
+
+        output = os.path.join(self.directory, 'alignment.png')
+        files = save_pages(self.data, output, page_size=2, dpi=20)
+        self.assertEqual(files, [os.path.join(self.directory, name) for name
+                                 in ('alignment-001.png', 'alignment-002.png',
+                                     'alignment-003.png')])
+        self.assertFalse(os.path.exists(output))
+
+        # the pages share an energy range, so have the same height
+        heights = []
+        for filename in files:
+            with Image.open(filename) as image:
+                heights.append(image.size[1])
+        self.assertEqual(len(set(heights)), 1)
+
+    def test_pdf(self):
+        output = os.path.join(self.directory, 'alignment.pdf')
+        self.assertEqual(save_pages(self.data, output, page_size=2), [output])
+        with open(output, 'rb') as f:
+            pages = re.findall(rb'/Type\s*/Page\b', f.read())
+        self.assertEqual(len(pages), 3)
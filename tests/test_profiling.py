@@ -0,0 +1,57 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import json
+import unittest
+
+from bapt.layout import get_layout
+from bapt.profiling import Profiler, mark, profile, profile_render
+
+from . import get_example
+
+
+class ProfileTest(unittest.TestCase):
+
+    def test_mark(self):
+        # stages are only recorded by the active profiler of the thread
+        mark('ignored')
+        outer = Profiler()
+        with profile(outer):
+            mark('parse')
+            with profile() as inner:
+                mark('plot')
+                mark('plot')
+            mark('save')
+        mark('ignored')
+
+        self.assertEqual(sorted(outer.stages), ['parse', 'save'])
+        self.assertEqual(sorted(inner.stages), ['plot'])
+        for profiler in (outer, inner):
+            for time in profiler.stages.values():
+                self.assertGreaterEqual(time, 0)
+
+    def test_profile_render(self):
+        data, settings = get_example('gradients')
+        profile = profile_render(data, formats=('png', 'svg'), dpi=50,
+                                 **settings)
+        profile = json.loads(json.dumps(profile))
+
+        self.assertEqual(profile['compounds'], len(data))
+        self.assertEqual(sorted(profile['outputs']), ['png', 'svg'])
+        for output in profile['outputs'].values():
+            self.assertEqual(output['dpi'], 50)
+            self.assertGreater(output['bytes'], 0)
+        for stage in ('layout', 'render:png', 'render:svg', 'plot:bars'):
+            self.assertIn(stage, profile['stages'])
+        self.assertAlmostEqual(profile['total'],
+                               sum(profile['stages'].values()))
+
+        # each arrow head is a patch, and each label a text
+        layout = get_layout(data, **settings)
+        artists = profile['artists']
+        self.assertEqual(artists['arrows'], layout.arrow_heads.sum())
+        self.assertGreaterEqual(artists['texts'], len(layout.labels))
+        self.assertEqual(artists['total'], sum(
+            v for k, v in artists.items()
+            if k not in ('total', 'collection_paths')))
@@ -0,0 +1,96 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import random
+import unittest
+
+from bapt.screening import screen_pairs, get_offset_matrices
+
+
+def get_compounds(n, seed=0):
+    rng = random.Random(seed)
+    data = []
+    for i in range(n):
+        ip = rng.uniform(5, 8)
+        data.append({'name': 'C{}'.format(i), 'ip': ip,
+                     'ea': ip - rng.uniform(0.5, 4)})
+    return data
+
+
+def brute_force(data, kind=None, min_cbo=None, max_vbo=None, top=None,
+                sort_by='cbo', ascending=False, ordered=True):
+    pairs = []
+    for i, a in enumerate(data):
+        for j, b in enumerate(data):
+            if i == j or (not ordered and j < i):
+                continue
+            vb_a, cb_a, vb_b, cb_b = -a['ip'], -a['ea'], -b['ip'], -b['ea']
+            if vb_b >= cb_a or vb_a >= cb_b:
+                pair_type = 'broken'
+            elif (vb_a <= vb_b and cb_b <= cb_a) or \
+                    (vb_b <= vb_a and cb_a <= cb_b):
+                pair_type = 'straddling'
+            else:
+                pair_type = 'staggered'
+            pair = {'i': i, 'j': j, 'vbo': vb_b - vb_a, 'cbo': cb_b - cb_a,
+                    'type': pair_type}
+            if kind is not None and pair_type != kind:
+                continue
+            if min_cbo is not None and pair['cbo'] < min_cbo:
+                continue
+            if max_vbo is not None and pair['vbo'] > max_vbo:
+                continue
+            pairs.append(pair)
+    sign = 1 if ascending else -1
+    pairs.sort(key=lambda p: (sign * p[sort_by], p['i'], p['j']))
+    return pairs[:top] if top is not None else pairs
+
+
+class ScreenPairsTest(unittest.TestCase):
+
+    data = get_compounds(60)
+
+    def assertPairsEqual(self, pairs, expected):
+        self.assertEqual([(p['i'], p['j'], p['type']) for p in pairs],
+                         [(p['i'], p['j'], p['type']) for p in expected])
+        for pair, other in zip(pairs, expected):
+            self.assertAlmostEqual(pair['vbo'], other['vbo'])
+            self.assertAlmostEqual(pair['cbo'], other['cbo'])
+
+    def test_all_pairs(self):
+        pairs = screen_pairs(self.data)
+        self.assertEqual(len(pairs), 60 * 59)
+        self.assertPairsEqual(pairs, brute_force(self.data))
+
+    def test_queries(self):
+        for kind in ('straddling', 'staggered', 'broken'):
+            self.assertPairsEqual(
+                screen_pairs(self.data, kind=kind, min_cbo=0.2),
+                brute_force(self.data, kind=kind, min_cbo=0.2))
+        self.assertPairsEqual(
+            screen_pairs(self.data, kind='II', max_vbo=0.5, sort_by='vbo',
+                         ascending=True, ordered=False),
+            brute_force(self.data, kind='staggered', max_vbo=0.5,
+                        sort_by='vbo', ascending=True, ordered=False))
+
+    def test_top_in_chunks(self):
+        # the best pairs are kept across several blocks of rows
+        for top in (0, 1, 7, 100):
+            self.assertPairsEqual(
+                screen_pairs(self.data, top=top, chunk_size=200),
+                brute_force(self.data, top=top))
+
+    def test_matrices(self):
+        vbo, cbo, types = get_offset_matrices(self.data)
+        expected = brute_force(self.data)
+        names = ('straddling', 'staggered', 'broken')
+        for pair in expected:
+            i, j = pair['i'], pair['j']
+            self.assertAlmostEqual(vbo[i, j], pair['vbo'])
+            self.assertAlmostEqual(cbo[i, j], pair['cbo'])
+            self.assertEqual(names[types[i, j]], pair['type'])
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            screen_pairs(self.data, kind='type-IV')
@@ -0,0 +1,70 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import json
+import time
+import unittest
+import multiprocessing
+
+from unittest import mock
+
+from bapt.server import RenderService, RenderTimeout, ServerBusy
+
+
+def _fake_render(config, fmt='png', dpi=400):
+    # stands in for rendering in the workers, taking as long as requested
+    time.sleep(config.get('sleep', 0))
+    return json.dumps({'settings': config['settings'], 'dpi': dpi}).encode()
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == 'fork',
+                     'the workers only see the fake renderer when forked')
+class RenderServiceTest(unittest.TestCase):
+
+    compounds = [{'name': 'ZnO', 'ip': 7.7, 'ea': 4.4}]
+
+    def setUp(self):
+        patcher = mock.patch('bapt.server.render_bytes', _fake_render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = RenderService(processes=1, timeout=10, max_pending=1,
+                                     max_dpi=300, max_size=10)
+        self.addCleanup(self.service.close)
+
+    def render(self, config, dpi=100):
+        return json.loads(self.service.render(config, dpi=dpi).decode())
+
+    def test_limits(self):
+        result = self.render({'compounds': self.compounds,
+                              'settings': {'width': 1000, 'height': 3}},
+                             dpi=5000)
+        self.assertEqual(result['dpi'], 300)
+        self.assertEqual(result['settings']['width'], 10)
+        self.assertEqual(result['settings']['height'], 3)
+
+        # the default width grows with the number of compounds
+        result = self.render({'compounds': self.compounds * 100})
+        self.assertEqual(result['dpi'], 100)
+        self.assertEqual(result['settings']['width'], 10)
+        self.assertEqual(result['settings']['height'], 5)
+
+        with self.assertRaises(ValueError):
+            self.render({'compounds': self.compounds}, dpi=0)
+
+    def test_timed_out_request_holds_slot(self):
+        # once the worker has started up
+        self.render({'compounds': self.compounds})
+        self.service.timeout = 0.2
+        with self.assertRaises(RenderTimeout):
+            self.render({'compounds': self.compounds, 'sleep': 1})
+
+        # the worker is still busy with the request that timed out
+        with self.assertRaises(ServerBusy):
+            self.render({'compounds': self.compounds})
+        self.assertEqual(self.service.stats()['in_flight'], 1)
+
+        time.sleep(1.5)
+        self.assertEqual(self.service.stats()['in_flight'], 0)
+        self.assertEqual(self.render({'compounds': self.compounds})['dpi'],
+                         100)
@@ -0,0 +1,185 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import re
+import unittest
+
+from bapt.layout import get_layout
+from bapt.svg import get_svg, layout_to_svg, _math_to_tspans
+
+from . import get_example
+
+examples = ('basic', 'fade', 'flat', 'gradients', 'offset')
+
+
+class GetSVGTest(unittest.TestCase):
+
+    def test_dense_faded_bars(self):
+        # at this density the faded fills are merged into RGBA colours by
+        # the level of detail pass
+        data = [{'name': 'C{}'.format(i), 'ip': 6 + (i % 7) / 7.,
+                 'ea': 3 + (i % 5) / 5., 'fade': True} for i in range(300)]
+        svg = get_svg(data, width=10)
+        fills = re.findall(r'<rect [^>]*fill="([^"]*)"', svg)
+        self.assertTrue(fills)
+        for fill in fills:
+            self.assertRegex(fill, r'^(none|#[0-9a-f]{6}([0-9a-f]{2})?)$')
+
+
+def _attrs(element):
+    # the attributes of an svg element as a dict
+    return dict(re.findall(r'([\w-]+)="([^"]*)"', element))
+
+
+def _svg_rects(svg):
+    # the rectangles drawn in the figure, as (x0, y0, x1, y1, attrs) tuples
+    body = svg.split('</defs>', 1)[1]
+    rects = []
+    for element in re.findall(r'<rect [^>]*>', body)[1:]:
+        attrs = _attrs(element)
+        x, y = float(attrs['x']), float(attrs['y'])
+        rects.append((x, y, x + float(attrs['width']),
+                      y + float(attrs['height']), attrs))
+    return rects
+
+
+class LayoutToSVGTest(unittest.TestCase):
+    # the svg is checked against the matplotlib figure, with its pixels
+    # scaled to points
+    dpi = 288
+
+    def _layouts(self):
+        for name in examples:
+            data, settings = get_example(name)
+            settings['gradients'] = False
+            for options in ({}, {'show_axis': True}):
+                yield ((name, options),
+                       get_layout(data, **dict(settings, **options)))
+
+    def _figure(self, layout):
+        from bapt.figure import AlignmentFigure
+
+        return AlignmentFigure.from_layout(layout, dpi=self.dpi)
+
+    def assertExtentsEqual(self, extents, expected, delta, msg):
+        self.assertEqual(len(extents), len(expected), msg)
+        for extent, other in zip(extents, expected):
+            for a, b in zip(extent, other):
+                self.assertAlmostEqual(a, b, delta=delta, msg=msg)
+
+    def test_rects(self):
+        for msg, layout in self._layouts():
+            rects = _svg_rects(layout_to_svg(layout))
+            with self._figure(layout) as figure:
+                scale = 72. / self.dpi
+                height = figure.figure.bbox.height
+
+                def extents(collections):
+                    out = []
+                    for collection in collections:
+                        transform = collection.get_transform()
+                        for path in collection.get_paths():
+                            x0, y0, x1, y1 = path.get_extents(
+                                transform).extents
+                            out.append((x0 * scale, (height - y1) * scale,
+                                        x1 * scale, (height - y0) * scale))
+                    return out
+
+                artists = figure._artists
+                bars = extents([artists['bars']])
+                edges = extents(artists['edges'])
+                fades = extents(artists['fades'])
+
+            self.assertExtentsEqual(
+                [r[:4] for r in rects if 'stroke' not in r[4]], bars, 0.01,
+                msg)
+            self.assertExtentsEqual(
+                sorted(r[:4] for r in rects
+                       if r[4].get('stroke-linejoin') == 'round' and
+                       'fill-opacity' not in r[4]),
+                sorted(edges), 0.01, msg)
+            self.assertExtentsEqual(
+                sorted(r[:4] for r in rects if 'fill-opacity' in r[4]),
+                sorted(fades), 0.01, msg)
+
+    def test_arrow_heads(self):
+        for msg, layout in self._layouts():
+            svg = layout_to_svg(layout)
+            heads = []
+            for points in re.findall(r'<polygon points="([^"]*)"', svg):
+                xs, ys = zip(*[map(float, p.split(','))
+                               for p in points.split()])
+                heads.append((min(xs), min(ys), max(xs), max(ys)))
+            with self._figure(layout) as figure:
+                scale = 72. / self.dpi
+                height = figure.figure.bbox.height
+                expected = []
+                for _, start, end in figure._artists['arrows']:
+                    for head in (start, end):
+                        if head is None:
+                            continue
+                        x0, y0, x1, y1 = head.get_path().get_extents(
+                            head.get_transform()).extents
+                        expected.append((x0 * scale, (height - y1) * scale,
+                                         x1 * scale, (height - y0) * scale))
+            self.assertTrue(expected, msg)
+            self.assertExtentsEqual(heads, expected, 0.01, msg)
+
+    def test_labels(self):
+        # the labels are anchored at the same points and have the same size
+        from bapt.plotting import style_context, _text_metrics
+
+        for msg, layout in self._layouts():
+            svg = layout_to_svg(layout)
+            texts = [(_attrs(attrs), text) for attrs, text in
+                     re.findall(r'<text ([^>]*)>(.*?)</text>', svg)]
+            with self._figure(layout) as figure:
+                height = figure.figure.bbox.height
+                renderer = figure.figure.canvas.get_renderer()
+                with style_context(figure._fonts):
+                    bboxes = [label.get_window_extent(renderer).extents
+                              for label in figure._artists['labels']]
+            scale = 72. / self.dpi
+
+            for text, (ha, _, _), bbox in zip(
+                    layout.label_text, layout.label_style, bboxes):
+                x0, y0, x1, y1 = [e * scale for e in bbox]
+                attrs = [a for a, t in texts if t == _math_to_tspans(text)]
+                anchor = {'left': x0, 'center': (x0 + x1) / 2.,
+                          'right': x1}[ha]
+                attrs = min(attrs, key=lambda a: abs(float(a['x']) - anchor))
+                width, ascent, descent = _text_metrics(
+                    [text], layout.label_size, fonts=layout.fonts)[0]
+                # mathtext is laid out by matplotlib at the figure dpi, so
+                # is only measured to within a few points
+                delta = 3 if '$' in text else 0.5
+                self.assertAlmostEqual(float(attrs['x']), anchor,
+                                       delta=delta, msg=msg)
+                self.assertAlmostEqual(width, x1 - x0, delta=delta, msg=msg)
+                self.assertAlmostEqual(float(attrs['y']) - ascent,
+                                       height * scale - y1, delta=delta,
+                                       msg=msg)
+                self.assertAlmostEqual(float(attrs['y']) + descent,
+                                       height * scale - y0, delta=delta,
+                                       msg=msg)
+
+    def test_bbox(self):
+        # the svg is cropped like the figure saved with bbox_inches='tight'
+        from bapt.export import get_tight_bbox
+        from bapt.plotting import style_context
+
+        for msg, layout in self._layouts():
+            svg = layout_to_svg(layout)
+            x0, y0, width, height = map(float, re.search(
+                r'viewBox="([^"]*)"', svg).group(1).split())
+            with self._figure(layout) as figure:
+                with style_context(figure._fonts):
+                    bbox = get_tight_bbox(figure.figure)
+                figure_height = layout.height * 72
+
+            left, bottom, right, top = [e * 72 for e in bbox.extents]
+            for value, expected in ((x0, left), (x0 + width, right),
+                                    (y0, figure_height - top),
+                                    (y0 + height, figure_height - bottom)):
+                self.assertAlmostEqual(value, expected, delta=3, msg=msg)
@@ -0,0 +1,127 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from bapt.tabular import read_table, read_tabular
+
+
+class ReadTabularTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_csv(self, text):
+        filename = os.path.join(self.directory, 'compounds.csv')
+        with open(filename, 'w') as f:
+            f.write(text)
+        return filename
+
+    def _write_jsonl(self, rows):
+        filename = os.path.join(self.directory, 'compounds.jsonl')
+        with open(filename, 'w') as f:
+            f.write('\n'.join(json.dumps(row) for row in rows))
+        return filename
+
+    def assertRaisesRows(self, filename, message):
+        with self.assertRaises(ValueError) as context:
+            read_tabular(filename)
+        self.assertIn(message, str(context.exception))
+
+    def test_vacuum(self):
+        data, settings = read_tabular(self._write_csv(
+            'name,ip,ea,fade\n'
+            'ZnO,7.7,4.4,\n'
+            'MOF-5,7.3,2.7,true\n'))
+        self.assertEqual(settings, {})
+        self.assertEqual([d['name'] for d in data], ['ZnO', 'MOF-5'])
+        self.assertAlmostEqual(data[1]['ea'], 2.7)
+        self.assertTrue(data[1]['fade'])
+        self.assertNotIn('fade', data[0])
+
+    def test_offsets(self):
+        data, _ = read_tabular(self._write_jsonl([
+            {'name': 'ZnO', 'band_gap': 1.774, 'cbo': 0},
+            {'name': 'MOF-5', 'band_gap': 1.366, 'cbo': 0.247},
+            {'name': 'COF-1M', 'band_gap': 1.6, 'vbo': -0.226}]))
+        self.assertAlmostEqual(data[1]['vbo'], 1.774 - 1.366 + 0.247)
+        self.assertAlmostEqual(data[2]['cbo'], -0.4)
+
+    def test_missing_name(self):
+        self.assertRaisesRows(self._write_csv(
+            'name,ip,ea\nZnO,7.7,4.4\n,7.3,2.7\n'),
+            'missing name in rows 2')
+
+    def test_missing_energies(self):
+        self.assertRaisesRows(self._write_csv(
+            'name,ip,ea\nZnO,7.7,4.4\nMOF-5,7.3,\nZIF-8,,\n'),
+            'missing ip or ea in rows 2, 3')
+
+    def test_inconsistent_band_gap(self):
+        self.assertRaisesRows(self._write_csv(
+            'name,ip,ea,band_gap\nZnO,7.7,4.4,3.3\nMOF-5,7.3,2.7,4\n'),
+            'inconsistent ip, ea and band_gap in rows 2')
+
+    def test_ip_below_ea(self):
+        self.assertRaisesRows(self._write_csv(
+            'name,ip,ea\nZnO,7.7,4.4\nMOF-5,2.7,7.3\n'),
+            'ip smaller than ea in rows 2')
+
+    def test_inconsistent_offsets(self):
+        self.assertRaisesRows(self._write_jsonl([
+            {'name': 'ZnO', 'band_gap': 1.774, 'cbo': 0},
+            {'name': 'MOF-5', 'band_gap': 1.366, 'cbo': 0.247, 'vbo': 0}]),
+            'inconsistent vbo and cbo in rows 2')
+
+    def test_all_errors_reported(self):
+        self.assertRaisesRows(self._write_csv(
+            'name,ip,ea\n,7.7,4.4\nMOF-5,2.7,7.3\n'),
+            'missing name in rows 1; ip smaller than ea in rows 2')
+
+    def test_no_name_column(self):
+        self.assertRaisesRows(self._write_csv('ip,ea\n7.7,4.4\n'),
+                              'no name column')
+
+    def test_derived_energies(self):
+        # any one of ip, ea and band_gap is derived from the other two
+        data, _ = read_tabular(self._write_csv(
+            'name,ip,ea,band_gap\n'
+            'ZnO,7.7,4.4,\n'
+            'MOF-5,7.3,,4.6\n'
+            'ZIF-8,,1.9,4.5\n'
+            'COF-1M,6.4,1.9,4.5\n'))
+        self.assertEqual([(d['ip'], d['ea']) for d in data],
+                         [(7.7, 4.4), (7.3, 2.7), (6.4, 1.9), (6.4, 1.9)])
+
+    def test_chunks(self):
+        # columns that only appear in later chunks are filled in before
+        rows = [{'name': 'C{}'.format(i), 'band_gap': 1 + i / 10.,
+                 'cbo': i / 100.} for i in range(10)]
+        rows[7]['fade'] = True
+        rows[8]['vb_colour'] = '#ff0000'
+        filename = self._write_jsonl(rows)
+
+        columns = read_table(filename, chunk_size=3)
+        self.assertEqual(columns['fade'].dtype, bool)
+        self.assertEqual(columns['cbo'].dtype, float)
+        self.assertEqual(columns['fade'].nonzero()[0].tolist(), [7])
+        self.assertEqual(columns['vb_colour'].tolist(),
+                         [''] * 8 + ['#ff0000', ''])
+        expected = read_table(filename)
+        for key, values in expected.items():
+            self.assertEqual(columns[key].tolist(), values.tolist())
+
+        filename = self._write_csv('name,ip,ea\n' + ''.join(
+            'C{},{},{}\n'.format(i, 7 + i / 10., 4) for i in range(10)))
+        columns = read_table(filename, chunk_size=4)
+        self.assertEqual(len(columns['name']), 10)
+        self.assertEqual(columns['ip'].tolist(),
+                         read_table(filename)['ip'].tolist())
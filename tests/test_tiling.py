@@ -0,0 +1,101 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from unittest import mock
+
+from bapt.tiling import (PNGWriter, check_matplotlib, encode_rows,
+                         max_tile_size, save_tiled_png)
+
+from . import get_example
+
+
+def read_png(f):
+    import numpy as np
+    from PIL import Image
+
+    return np.asarray(Image.open(f).convert('RGBA'))
+
+
+class PNGWriterTest(unittest.TestCase):
+
+    def test_bands(self):
+        import numpy as np
+
+        image = np.random.RandomState(0).randint(
+            0, 256, size=(50, 37, 4)).astype(np.uint8)
+        f = io.BytesIO()
+        writer = PNGWriter(f, 37, 50, dpi=300)
+        for start in range(0, 50, 13):
+            band = image[start:start + 13]
+            writer.write_rows(len(band), encode_rows(band))
+        writer.close()
+
+        f.seek(0)
+        np.testing.assert_array_equal(read_png(f), image)
+
+    def test_missing_rows(self):
+        import numpy as np
+
+        writer = PNGWriter(io.BytesIO(), 4, 4)
+        writer.write_rows(2, encode_rows(np.zeros((2, 4, 4), np.uint8)))
+        with self.assertRaises(ValueError):
+            writer.close()
+
+
+class SaveTiledPNGTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matplotlib_internals(self):
+        # the images are only resampled where they are on a tile
+        self.assertTrue(check_matplotlib())
+
+    def assertMatchesImage(self, tile_size):
+        # the tiles are stitched into the same image as the whole figure
+        # rendered on one canvas, or the plot is saved on one canvas
+        from bapt.export import render_rgba
+        from bapt.figure import AlignmentFigure
+        from bapt.layout import get_layout
+        from bapt.plotting import style_context
+
+        filename = os.path.join(self.directory, 'tiled.png')
+        for name in ('flat', 'gradients', 'offset'):
+            data, settings = get_example(name)
+            layout = get_layout(data, **settings)
+            with AlignmentFigure.from_layout(layout, dpi=150) as figure:
+                with style_context(figure._fonts):
+                    expected = render_rgba(figure.figure, dpi=150)
+
+            size = save_tiled_png(layout, filename, dpi=150, band_height=97,
+                                  tile_size=tile_size, processes=1)
+            image = read_png(filename)
+            self.assertEqual(size, image.shape[1::-1])
+            self.assertEqual(image.shape, expected.shape, name)
+            self.assertEqual((image != expected).any(axis=-1).sum(), 0, name)
+
+    def test_bands(self):
+        self.assertMatchesImage(max_tile_size)
+
+    def test_tiles(self):
+        # the images, dashed lines and outlines cut at the vertical seams
+        # are drawn as in the full image
+        self.assertMatchesImage(300)
+
+    def test_unsupported_matplotlib(self):
+        with mock.patch('bapt.tiling.check_matplotlib', return_value=False):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.assertMatchesImage(300)
+        self.assertTrue(any('one canvas' in str(w.message) for w in caught))
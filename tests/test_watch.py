@@ -0,0 +1,75 @@
+# coding: utf-8
+# Copyright (c) Alex Ganose
+# Distributed under the terms of the MIT License.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from contextlib import redirect_stdout
+from unittest import mock
+
+from bapt.watch import watch
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'config.yaml')
+        self.output = os.path.join(self.directory, 'out.png')
+        self._write('compounds: []\n', 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, content, mtime):
+        # the modification times are set, as they may not change between
+        # writes in quick succession
+        with open(self.filename, 'w') as f:
+            f.write(content)
+        os.utime(self.filename, (mtime, mtime))
+
+    def _watch(self, changes, render, max_renders):
+        # each change is made in place of waiting between polls
+        changes = iter(changes)
+
+        def sleep(interval):
+            next(changes, lambda: None)()
+
+        out = io.StringIO()
+        with mock.patch('bapt.batch.render_file', side_effect=render), \
+                mock.patch('bapt.watch.time.sleep', side_effect=sleep), \
+                redirect_stdout(out):
+            watch(self.filename, self.output, max_renders=max_renders)
+        return out.getvalue()
+
+    def test_content_change(self):
+        # touching the file without changing it doesn't re-render it
+        rendered = []
+
+        def render(filename, output_file, **kwargs):
+            with open(filename) as f:
+                rendered.append(f.read())
+
+        self._watch([lambda: os.utime(self.filename, (10, 10)),
+                     lambda: self._write('compounds: [1]\n', 20)],
+                    render, max_renders=2)
+        self.assertEqual(rendered, ['compounds: []\n', 'compounds: [1]\n'])
+
+    def test_error(self):
+        # errors are reported and watching continues
+        results = [ValueError('bad config'), None]
+
+        def render(filename, output_file, **kwargs):
+            result = results.pop(0)
+            if result:
+                raise result
+
+        out = self._watch([lambda: self._write('compounds: [1]\n', 20)],
+                          render, max_renders=2)
+        self.assertIn('ERROR: ValueError: bad config', out)
+        self.assertIn('Rendered', out)
+        self.assertEqual(results, [])